@@ -0,0 +1,264 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Micro-benchmarks for hot code paths (requires pytest-benchmark).
+
+These tests are skipped by default. Run from the project root::
+
+    pytest -m benchmarks tests/benchmark_hot_paths.py --benchmark-autosave
+
+or ``tox -e benchmarks``.
+Results are stored as JSON files (including the commit id) in ``.benchmarks/``
+and can be compared across commits::
+
+    pytest-benchmark compare --group-by=name --columns=min,median,ops
+    pytest -m benchmarks tests/benchmark_hot_paths.py --benchmark-compare
+"""
+
+import shutil
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+from tests.util import create_test_tree
+from wsgidav import util, xml_tools
+from wsgidav.dav_error import HTTP_FORBIDDEN, DAVError
+from wsgidav.lock_man.lock_manager import LockManager
+from wsgidav.lock_man.lock_storage import LockStorageDict
+from wsgidav.prop_man.property_manager import PropertyManager
+from wsgidav.wsgidav_app import WsgiDAVApp
+
+pytest.importorskip("pytest_benchmark")
+webtest = pytest.importorskip("webtest")
+
+pytestmark = pytest.mark.benchmarks
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+
+# ========================================================================
+# XML
+# ========================================================================
+
+
+@pytest.fixture(params=["lxml", "etree"])
+def xml_backend(request, monkeypatch):
+    """Run the test with lxml and with the standard library ElementTree."""
+    if request.param == "lxml":
+        if lxml_etree is None:
+            pytest.skip("lxml is not installed")
+        etree = lxml_etree
+        element_type = lxml_etree._Element
+    else:
+        etree = ElementTree
+        element_type = ElementTree.Element
+    monkeypatch.setattr(xml_tools, "use_lxml", request.param == "lxml")
+    monkeypatch.setattr(xml_tools, "etree", etree)
+    monkeypatch.setattr(xml_tools, "_ElementType", element_type)
+    monkeypatch.setattr(util, "etree", etree)
+    return etree
+
+
+def _make_prop_list(etree, i):
+    """Return a typical list of (name, value) tuples of a file resource."""
+    resource_type = etree.Element("{DAV:}resourcetype")
+    return [
+        ("{DAV:}displayname", f"file_{i:04}.txt"),
+        ("{DAV:}getcontentlength", str(1000 + i)),
+        ("{DAV:}getcontenttype", "text/plain"),
+        ("{DAV:}getetag", f'"{i:08x}-1000"'),
+        ("{DAV:}getlastmodified", "Sun, 30 Jun 2024 10:15:22 GMT"),
+        ("{DAV:}creationdate", "2024-06-30T10:15:22Z"),
+        ("{DAV:}resourcetype", resource_type),
+        ("{DAV:}supportedlock", None),
+        ("{http://example.com/ns}author", "Joe"),
+        ("{DAV:}quota-used-bytes", DAVError(HTTP_FORBIDDEN)),
+    ]
+
+
+def _make_multistatus(prop_lists):
+    multistatus_el = xml_tools.make_multistatus_el()
+    for i, prop_list in enumerate(prop_lists):
+        util.add_property_response(
+            multistatus_el, f"/folder/file_{i:04}.txt", prop_list
+        )
+    return multistatus_el
+
+
+def test_add_property_response(benchmark, xml_backend):
+    prop_lists = [_make_prop_list(xml_backend, i) for i in range(100)]
+    benchmark(_make_multistatus, prop_lists)
+
+
+def test_multistatus_serialization(benchmark, xml_backend):
+    multistatus_el = _make_multistatus(
+        [_make_prop_list(xml_backend, i) for i in range(1000)]
+    )
+    xml = benchmark(xml_tools.xml_to_bytes, multistatus_el, pretty=False)
+    assert xml.count(b"<D:response") == 1000 or xml.count(b"<ns0:response") == 1000
+
+
+@pytest.mark.parametrize("writer_name", ["etree", "fast"])
+def test_multistatus_writer(benchmark, xml_backend, writer_name):
+    def _write(prop_lists):
+        writer = xml_tools.make_multistatus_writer(writer_name)
+        for i, prop_list in enumerate(prop_lists):
+            writer.add_response(f"/folder/file_{i:04}.txt", prop_list)
+        return writer.to_bytes()
+
+    def _setup():
+        # Element values are moved into the tree, so create new ones each round
+        return ([_make_prop_list(xml_backend, i) for i in range(1000)],), {}
+
+    xml = benchmark.pedantic(_write, setup=_setup, rounds=20)
+    assert xml.count(b"<D:response") == 1000 or xml.count(b"<ns0:response") == 1000
+
+
+# ========================================================================
+# HTTP headers
+# ========================================================================
+
+
+@pytest.mark.parametrize(
+    "range_header",
+    ["bytes=0-499", "bytes=-500", "bytes=500-", "bytes=0-99,200-299,400-499,900-"],
+)
+def test_obtain_content_ranges(benchmark, range_header):
+    ranges, total = benchmark(util.obtain_content_ranges, range_header, 100_000)
+    assert ranges and total > 0
+
+
+class _Resource:
+    def support_etag(self):
+        return True
+
+
+IF_HEADER = (
+    "</folder/file_0001.txt> "
+    '(<opaquelocktoken:a515cfa4-5da4-22e1-f5bf-00a0451e6bf7> ["etag-1"]) '
+    "(Not <DAV:no-lock>) "
+    '</folder/file_0002.txt> (["etag-2"])'
+)
+
+
+def test_parse_if_header_dict(benchmark):
+    def _parse():
+        environ = {"HTTP_IF": IF_HEADER}
+        util.parse_if_header_dict(environ)
+        return environ
+
+    environ = benchmark(_parse)
+    assert len(environ["wsgidav.conditions.if"]) == 2
+
+
+def test_test_if_header_dict(benchmark):
+    environ = {"HTTP_IF": IF_HEADER}
+    util.parse_if_header_dict(environ)
+    if_dict = environ["wsgidav.conditions.if"]
+    token = "opaquelocktoken:a515cfa4-5da4-22e1-f5bf-00a0451e6bf7"
+    res = benchmark(
+        util.test_if_header_dict,
+        _Resource(),
+        if_dict,
+        "/folder/file_0001.txt",
+        [token],
+        '"etag-1"',
+    )
+    assert res is True
+
+
+# ========================================================================
+# Lock and property managers
+# ========================================================================
+
+
+@pytest.mark.parametrize("lock_count", [10, 100, 1000])
+def test_check_write_permission(benchmark, lock_count):
+    lock_man = LockManager(LockStorageDict())
+    for i in range(lock_count):
+        lock_man.acquire(
+            url=f"/folder_{i % 10}/file_{i:04}.txt",
+            lock_type="write",
+            lock_scope="exclusive",
+            lock_depth="0",
+            lock_owner=b"<owner/>",
+            timeout=3600,
+            principal="tester",
+            token_list=[],
+        )
+    # An unlocked resource inside a folder that contains locked resources
+    benchmark(
+        lock_man.check_write_permission,
+        url="/folder_1/new_file.txt",
+        depth="0",
+        token_list=[],
+        principal="tester",
+    )
+
+
+PROP_NAME = "{http://example.com/ns}author"
+
+
+@pytest.fixture
+def prop_manager():
+    prop_man = PropertyManager()
+    for i in range(1000):
+        prop_man.write_property(f"/folder/file_{i:04}.txt", PROP_NAME, "Joe")
+    yield prop_man
+    prop_man._close()
+
+
+def test_property_manager_get_properties(benchmark, prop_manager):
+    res = benchmark(prop_manager.get_properties, "/folder/file_0500.txt")
+    assert res == [PROP_NAME]
+
+
+def test_property_manager_write_property(benchmark, prop_manager):
+    benchmark(prop_manager.write_property, "/folder/new.txt", PROP_NAME, "Jane")
+
+
+def test_property_manager_copy_properties(benchmark, prop_manager):
+    benchmark(prop_manager.copy_properties, "/folder/file_0001.txt", "/folder/copy.txt")
+
+
+def test_property_manager_move_properties(benchmark, prop_manager):
+    def _move_and_back():
+        prop_manager.move_properties("/folder", "/moved", with_children=True)
+        prop_manager.move_properties("/moved", "/folder", with_children=True)
+
+    benchmark(_move_and_back)
+
+
+# ========================================================================
+# FilesystemProvider listings
+# ========================================================================
+
+
+@pytest.fixture(scope="module")
+def fs_app():
+    """WebTest app on a generated tree of 111 folders and 1110 files."""
+    root_path = create_test_tree("wsgidav-benchmark-tree", depth=2)
+    config = {
+        "provider_mapping": {"/": root_path},
+        "simple_dc": {"user_mapping": {"*": True}},
+        "logging": {"enable": False},
+        "verbose": 1,
+    }
+    yield webtest.TestApp(WsgiDAVApp(config), lint=False)
+    shutil.rmtree(root_path, ignore_errors=True)
+
+
+@pytest.mark.parametrize("depth", ["0", "1", "infinity"])
+def test_fs_propfind(benchmark, fs_app, depth):
+    def _propfind():
+        return fs_app.request(
+            "/", method="PROPFIND", headers={"Depth": depth}, status=207
+        )
+
+    rounds = 5 if depth == "infinity" else 20
+    res = benchmark.pedantic(_propfind, rounds=rounds, warmup_rounds=1)
+    assert res.body.count(b"<D:response") > 0
@@ -0,0 +1,150 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Micro-benchmarks for wsgidav.rw_lock.ReadWriteLock.
+
+Run from the project root::
+
+    python -m tests.benchmark_rw_lock
+
+Measures
+
+- throughput of uncontended acquire/release pairs (compared to a plain
+  ``threading.Lock`` as baseline),
+- throughput and fairness of mixed reader/writer threads under contention:
+  acquisitions per thread, and mean/max wait time of writers (which should be
+  preferred) and readers.
+"""
+
+import statistics
+import sys
+import threading
+import time
+
+from wsgidav.rw_lock import ReadWriteLock
+
+UNCONTENDED_LOOPS = 200_000
+CONTENTION_DURATION = 1.0  # seconds
+
+
+def _print_rate(name, count, elap):
+    print(f"  {name:<32} {count / elap:>12,.0f} ops/sec")
+
+
+def bench_uncontended(loops=UNCONTENDED_LOOPS):
+    """Acquire/release pairs from a single thread."""
+    print(f"Uncontended ({loops:,} loops):")
+
+    lock = threading.Lock()
+    start = time.perf_counter()
+    for _ in range(loops):
+        lock.acquire()
+        lock.release()
+    _print_rate("threading.Lock (baseline)", loops, time.perf_counter() - start)
+
+    rw_lock = ReadWriteLock()
+    for name, acquire in (
+        ("acquire_read / release", rw_lock.acquire_read),
+        ("acquire_write / release", rw_lock.acquire_write),
+    ):
+        release = rw_lock.release
+        start = time.perf_counter()
+        for _ in range(loops):
+            acquire()
+            release()
+        _print_rate(name, loops, time.perf_counter() - start)
+
+    for name, ctx in (
+        ("with read_locked()", rw_lock.read_locked),
+        ("with write_locked()", rw_lock.write_locked),
+    ):
+        start = time.perf_counter()
+        for _ in range(loops):
+            with ctx():
+                pass
+        _print_rate(name, loops, time.perf_counter() - start)
+
+
+def bench_contention(
+    reader_count, writer_count, *, duration=CONTENTION_DURATION, hold=0.0
+):
+    """Run reader and writer threads for `duration` seconds.
+
+    Every thread loops acquiring its lock, holding it for `hold` seconds.
+    Returns a dict with per-thread acquisition counts and wait times.
+    """
+    rw_lock = ReadWriteLock()
+    stop = threading.Event()
+    barrier = threading.Barrier(reader_count + writer_count + 1)
+    results = {"read": [], "write": []}
+    results_lock = threading.Lock()
+
+    def _worker(kind):
+        acquire = rw_lock.acquire_read if kind == "read" else rw_lock.acquire_write
+        release = rw_lock.release
+        count = 0
+        waits = []
+        barrier.wait()
+        while not stop.is_set():
+            start = time.perf_counter()
+            acquire()
+            waits.append(time.perf_counter() - start)
+            if hold:
+                time.sleep(hold)
+            release()
+            count += 1
+        with results_lock:
+            results[kind].append((count, waits))
+
+    threads = [
+        threading.Thread(target=_worker, args=("read",)) for _ in range(reader_count)
+    ] + [threading.Thread(target=_worker, args=("write",)) for _ in range(writer_count)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return results
+
+
+def _report_contention(reader_count, writer_count, *, hold=0.0):
+    res = bench_contention(reader_count, writer_count, hold=hold)
+    total = sum(c for kind in res.values() for c, _ in kind)
+    print(
+        f"  {reader_count:>2} readers, {writer_count:>2} writers, hold={hold * 1000:.1f}ms: "
+        f"{total / CONTENTION_DURATION:>10,.0f} ops/sec"
+    )
+    for kind in ("read", "write"):
+        if not res[kind]:
+            continue
+        counts = [c for c, _ in res[kind]]
+        waits = [w for _, ws in res[kind] for w in ws]
+        # Fairness: min/max ratio of acquisitions among threads of one kind
+        fairness = min(counts) / max(counts) if max(counts) else 0.0
+        print(
+            f"      {kind:<5}: {sum(counts):>9,} acquired, "
+            f"fairness {fairness:.2f}, "
+            f"wait mean {statistics.mean(waits) * 1e6:>8.1f}us, "
+            f"max {max(waits) * 1e3:>7.2f}ms"
+        )
+
+
+def run_benchmarks():
+    py_version = "{}.{}.{}".format(*sys.version_info)
+    print("#-- ReadWriteLock Benchmark ---------------------------------------")
+    print(f"Python:   {py_version}")
+    bench_uncontended()
+    print(f"Contention ({CONTENTION_DURATION} sec per run):")
+    _report_contention(8, 0)
+    _report_contention(0, 8)
+    _report_contention(8, 1)
+    _report_contention(8, 2)
+    _report_contention(8, 2, hold=0.0005)
+    _report_contention(2, 8, hold=0.0005)
+
+
+if __name__ == "__main__":
+    run_benchmarks()
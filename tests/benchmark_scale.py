@@ -0,0 +1,338 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Scale and memory benchmark on large generated trees.
+
+Run from the project root::
+
+    python -m tests.benchmark_scale
+    python -m tests.benchmark_scale --sizes 10k,100k,1m --unicode-names
+    python -m tests.benchmark_scale --ops propfind_inf,copy --json scale.json
+
+For every size, a tree is generated in the temp folder (see
+:func:`tests.util.make_tree`):
+
+- ``flat/``: one folder with `size` files,
+- ``deep/``: ``--fan-out`` sub folders and files per folder, as many levels as
+  needed for roughly `size` entries.
+
+These operations are then measured by calling a :class:`WsgiDAVApp`
+(FilesystemProvider, property and lock manager) directly:
+
+- ``propfind_1``: PROPFIND Depth 1 on ``flat/``,
+- ``propfind_inf``: PROPFIND Depth infinity on ``deep/``,
+- ``copy``: COPY ``deep/`` to ``copy/``,
+- ``move``: MOVE ``copy/`` to ``moved/``,
+- ``delete``: DELETE ``moved/``.
+
+Every operation runs in a fresh process, so the peak RSS (resident set size,
+minus the size after startup) is not influenced by previous runs.
+The sequence is then repeated with :mod:`tracemalloc` enabled, to record the
+peak of memory allocated by Python (which is slower, so the times of the first
+pass are reported).
+
+The report lists time per entry and the *scaling exponent* between two sizes:
+``log(t2 / t1) / log(n2 / n1)``, which is 1 for linear behavior. Operations with
+an exponent above ``--superlinear`` are marked.
+
+Note: 1M entries need a few GB of disk space (inodes), memory, and time.
+"""
+
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+from tempfile import gettempdir
+
+from tests.util import make_tree
+from wsgidav.wsgidav_app import WsgiDAVApp
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+OPS = ("propfind_1", "propfind_inf", "copy", "move", "delete")
+
+#: op -> (method, path, extra environ)
+REQUESTS = {
+    "propfind_1": ("PROPFIND", "/flat/", {"HTTP_DEPTH": "1"}),
+    "propfind_inf": ("PROPFIND", "/deep/", {"HTTP_DEPTH": "infinity"}),
+    "copy": (
+        "COPY",
+        "/deep/",
+        {"HTTP_DEPTH": "infinity", "HTTP_DESTINATION": "http://localhost/copy/"},
+    ),
+    "move": ("MOVE", "/copy/", {"HTTP_DESTINATION": "http://localhost/moved/"}),
+    "delete": ("DELETE", "/moved/", {}),
+}
+
+#: op -> expected status
+EXPECTED_STATUS = {
+    "propfind_1": "207",
+    "propfind_inf": "207",
+    "copy": "201",
+    "move": "201",
+    "delete": "204",
+}
+
+
+def _parse_size(value):
+    value = value.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    if factor > 1:
+        value = value[:-1]
+    return int(float(value) * factor)
+
+
+def _get_deep_depth(size, fan_out):
+    """Return the number of levels, so that a deep tree has >= `size` entries."""
+    depth = 0
+    while True:
+        folders = sum(fan_out**level for level in range(depth + 1))
+        # All folders (except the root) and `fan_out` files per folder
+        if folders - 1 + folders * fan_out >= size:
+            return depth
+        depth += 1
+
+
+def _get_rss_bytes():
+    """Return the peak resident set size of this process (or None)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kB, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def setup_tree(root_path, size, *, fan_out, name_length, unicode_names):
+    """Create flat/ and deep/ below `root_path` and return (flat, deep) entries."""
+    shutil.rmtree(root_path, ignore_errors=True)
+    os.mkdir(root_path)
+    opts = {"file_size": 0, "name_length": name_length, "unicode_names": unicode_names}
+    flat = make_tree(
+        os.path.join(root_path, "flat"), depth=0, folders=0, files=size, **opts
+    )
+    deep = make_tree(
+        os.path.join(root_path, "deep"),
+        depth=_get_deep_depth(size, fan_out),
+        folders=fan_out,
+        files=fan_out,
+        **opts,
+    )
+    return flat, deep
+
+
+def _run_op(root_path, op, trace, queue):
+    """Run one request in a child process and put the results into `queue`."""
+    config = {
+        "provider_mapping": {"/": root_path},
+        "simple_dc": {"user_mapping": {"*": True}},
+        "property_manager": True,
+        "lock_storage": True,
+        "logging": {"enable": False},
+        "verbose": 1,
+    }
+    app = WsgiDAVApp(config)
+    method, path, extra = REQUESTS[op]
+    environ = {
+        "REQUEST_METHOD": method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "CONTENT_LENGTH": "0",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "wsgi.version": (1, 0),
+        **extra,
+    }
+    status = None
+
+    def _start_response(status_line, headers, exc_info=None):
+        nonlocal status
+        status = status_line[:3]
+
+    rss_start = _get_rss_bytes()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    body_size = 0
+    app_iter = app(environ, _start_response)
+    try:
+        for chunk in app_iter:
+            body_size += len(chunk)
+    finally:
+        if hasattr(app_iter, "close"):
+            app_iter.close()
+    elapsed = time.perf_counter() - start
+    res = {"status": status, "time": elapsed, "body_size": body_size}
+    if trace:
+        res["traced_peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    elif rss_start is not None:
+        res["rss_peak"] = _get_rss_bytes() - rss_start
+    queue.put(res)
+
+
+def run_op(root_path, op, *, trace=False):
+    """Run one operation in a fresh process and return the results."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_op, args=(root_path, op, trace, queue))
+    proc.start()
+    res = queue.get()
+    proc.join()
+    if res["status"] != EXPECTED_STATUS[op]:
+        raise RuntimeError(f"{op} returned {res['status']}")
+    return res
+
+
+def _format_bytes(value):
+    if value is None:
+        return "n.a."
+    return f"{value / (1024 * 1024):,.1f}"
+
+
+def print_report(results, superlinear):
+    print()
+    print(
+        f"{'Operation':<13} {'entries':>9} {'time s':>9} {'µs/entry':>9} "
+        f"{'RSS MB':>8} {'traced MB':>10} {'exp':>5}"
+    )
+    for op, rows in results.items():
+        prev = None
+        for row in rows:
+            entries = row["entries"]
+            exponent = ""
+            if prev and entries > prev["entries"] and prev["time"] > 0:
+                exp = math.log(row["time"] / prev["time"]) / math.log(
+                    entries / prev["entries"]
+                )
+                exponent = f"{exp:5.2f}"
+                if exp > superlinear:
+                    exponent += "  <-- superlinear"
+            print(
+                f"{op:<13} {entries:>9,} {row['time']:>9.3f} "
+                f"{row['time'] / entries * 1e6:>9.1f} "
+                f"{_format_bytes(row.get('rss_peak')):>8} "
+                f"{_format_bytes(row.get('traced_peak')):>10} {exponent:>5}"
+            )
+            prev = row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure how WsgiDAV operations scale with the tree size."
+    )
+    parser.add_argument(
+        "--sizes",
+        default="10k,100k",
+        help="comma separated number of entries (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--ops",
+        default=",".join(OPS),
+        help="comma separated operations (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--fan-out",
+        type=int,
+        default=10,
+        help="sub folders and files per folder of deep/ (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--name-length",
+        type=int,
+        default=0,
+        help="pad names to this length (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--unicode-names",
+        action="store_true",
+        help="use names with non-ASCII characters",
+    )
+    parser.add_argument(
+        "--no-tracemalloc",
+        action="store_true",
+        help="skip the second pass that records allocations",
+    )
+    parser.add_argument(
+        "--superlinear",
+        type=float,
+        default=1.2,
+        help="mark scaling exponents above this value (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--json",
+        help="also write the results to this file",
+    )
+    args = parser.parse_args(argv)
+
+    sizes = sorted(_parse_size(s) for s in args.sizes.split(","))
+    ops = [op.strip() for op in args.ops.split(",")]
+    for op in ops:
+        if op not in OPS:
+            parser.error(f"Unknown operation {op!r} (expected {', '.join(OPS)}).")
+    if "move" in ops and "copy" not in ops or "delete" in ops and "move" not in ops:
+        parser.error("'move' requires 'copy', and 'delete' requires 'move'.")
+    if args.fan_out < 2:
+        parser.error("--fan-out must be 2 or more.")
+
+    root_path = os.path.join(gettempdir(), "wsgidav-scale-test")
+    results = {op: [] for op in ops}
+    try:
+        for size in sizes:
+            print(f"Creating tree with {size:,} entries ...")
+            start = time.perf_counter()
+            flat, deep = setup_tree(
+                root_path,
+                size,
+                fan_out=args.fan_out,
+                name_length=args.name_length,
+                unicode_names=args.unicode_names,
+            )
+            print(
+                f"  flat/: {flat:,}, deep/: {deep:,} entries "
+                f"({time.perf_counter() - start:.1f} sec)"
+            )
+            passes = [False] if args.no_tracemalloc else [False, True]
+            rows = {op: {"entries": flat if op == "propfind_1" else deep} for op in ops}
+            for trace in passes:
+                for op in ops:
+                    print(f"  {op}{' (tracemalloc)' if trace else ''} ...")
+                    res = run_op(root_path, op, trace=trace)
+                    if trace:
+                        rows[op]["traced_peak"] = res["traced_peak"]
+                    else:
+                        rows[op].update(res)
+                # Remove leftovers, if the sequence was incomplete
+                for name in ("copy", "moved"):
+                    shutil.rmtree(os.path.join(root_path, name), ignore_errors=True)
+            for op in ops:
+                results[op].append(rows[op])
+    finally:
+        shutil.rmtree(root_path, ignore_errors=True)
+
+    print_report(results, args.superlinear)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.json!r}.")
+
+
+if __name__ == "__main__":
+    main()
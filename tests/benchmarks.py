@@ -36,16 +36,9 @@ Test cases
   and openwebload
   http://openwebload.sourceforge.net/index.html
 
-- makeTree(roofolderName="/bench", folderCount=10, subfolderCount=10, fileCount=10, fileSize=1024)
-  Big tree with 100 folders and 1000 files
-  bench/
-    folder1/
-    ..
-    folder10/
-      subfolder10-1/
-      ..
-      subfolder10-10/
-        file10-10-1.txt -> 1k
+- Big trees are created by tests.util.make_tree(), see also
+  tests/benchmark_scale.py for PROPFIND, COPY, MOVE, and DELETE on trees with
+  10k to 1M entries.
 """
 
 import datetime
@@ -5,3 +5,15 @@
 
 # sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 # pkg_resources.require("wsgidav")
+
+import pytest
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests marked as 'benchmarks', unless selected with `-m benchmarks`."""
+    if "benchmarks" in (config.getoption("markexpr") or ""):
+        return
+    skip = pytest.mark.skip(reason="run benchmarks with '-m benchmarks'")
+    for item in items:
+        if "benchmarks" in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,555 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""
+End-to-end load test with regression thresholds.
+
+Run from the project root::
+
+    python -m tests.load_test --duration 20 --clients 8
+    python -m tests.load_test --server gunicorn --workers 4
+
+A WsgiDAV server is started in a subprocess (``--server cheroot`` or
+``--server gunicorn`` with ``--workers`` processes), on a generated tree of
+111 folders and 1110 files in the temp folder.
+
+Every client thread uses one persistent connection and replays a weighted mix
+of scenarios until ``--duration`` is over:
+
+- ``explorer``: a Windows Explorer style PROPFIND burst: Depth 0 and 1 on a
+  folder, followed by Depth 0 probes for files like ``desktop.ini`` that
+  usually don't exist,
+- ``get_large`` / ``put_large``: download and upload a large file,
+- ``lock``: LOCK, PUT with lock token, UNLOCK,
+- ``copy``: COPY of a folder with Depth infinity, followed by DELETE.
+
+Throughput and p50/p99 latency are reported per request type.
+Pass ``--save-baseline`` to store the results in ``--baseline`` (default:
+``.benchmarks/load_baseline.json``). Later runs are compared with that file
+and the script exits with code 1 if a request type got slower (or lost
+throughput) by more than ``--tolerance``, or if unexpected responses occurred.
+Baselines depend on the machine, so they should be created locally (or on the
+CI runner) and are not part of the repository.
+
+Note: with ``gunicorn --workers > 1``, each worker has its own lock and
+property manager. This works, because a client keeps its connection (and
+thus its worker) during a LOCK/PUT/UNLOCK sequence.
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from tests.util import create_test_tree
+
+DEFAULT_BASELINE = os.path.join(".benchmarks", "load_baseline.json")
+
+#: Latencies below this value (ms) are never considered a regression
+LATENCY_SLACK_MS = 2.0
+
+EXPLORER_PROBES = ("desktop.ini", "Desktop.ini", "folder.jpg", "folder.gif")
+
+LOCK_BODY = b"""\
+<?xml version="1.0" encoding="utf-8" ?>
+<D:lockinfo xmlns:D="DAV:">
+  <D:lockscope><D:exclusive/></D:lockscope>
+  <D:locktype><D:write/></D:locktype>
+  <D:owner>load_test</D:owner>
+</D:lockinfo>"""
+
+
+# ========================================================================
+# Server
+# ========================================================================
+
+
+def _get_free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class LoadTestServer:
+    """Run WsgiDAV (`wsgidav` command line tool) in a subprocess."""
+
+    def __init__(self, root_path, *, server="cheroot", workers=1, host="127.0.0.1"):
+        self.root_path = root_path
+        self.server = server
+        self.workers = workers
+        self.host = host
+        self.port = _get_free_port(host)
+        self.url = f"http://{host}:{self.port}/"
+        self.proc = None
+        self._config_dir = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self, timeout=20):
+        config = {
+            "host": self.host,
+            "port": self.port,
+            "server": self.server,
+            "provider_mapping": {"/": self.root_path},
+            "http_authenticator": {"accept_basic": False, "accept_digest": False},
+            "simple_dc": {"user_mapping": {"*": True}},
+            "property_manager": True,
+            "lock_storage": True,
+            "dir_browser": {"enable": False},
+            "logging": {"enable_loggers": []},
+            "verbose": 1,
+        }
+        if self.server == "gunicorn":
+            config["server_args"] = {"workers": self.workers}
+        self._config_dir = tempfile.mkdtemp(prefix="wsgidav-load-")
+        config_path = os.path.join(self._config_dir, "wsgidav.json")
+        with open(config_path, "w") as f:
+            json.dump(config, f)
+
+        print(f"Starting {self.server} server on {self.url} ...")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "wsgidav.server.server_cli", "-c", config_path],
+            stdout=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.proc.returncode}")
+            try:
+                with socket.create_connection((self.host, self.port), timeout=0.5):
+                    return self
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"Server did not start within {timeout} seconds")
+
+    def stop(self):
+        if self.proc:
+            self.proc.terminate()
+            try:
+                self.proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+            self.proc = None
+        if self._config_dir:
+            shutil.rmtree(self._config_dir, ignore_errors=True)
+            self._config_dir = None
+
+
+def setup_tree(large_file_size):
+    """Create the test data and return the root path."""
+    root_path = create_test_tree("wsgidav-load-test", depth=2)
+    with open(os.path.join(root_path, "large.bin"), "wb") as f:
+        f.write(os.urandom(large_file_size))
+    return root_path
+
+
+# ========================================================================
+# Client
+# ========================================================================
+
+
+class Client:
+    """One persistent HTTP connection that records request latencies."""
+
+    def __init__(self, url, client_id):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.client_id = client_id
+        self.conn = None
+        #: Request type -> list of latencies (seconds)
+        self.latencies = {}
+        #: Request type -> number of failed requests
+        self.errors = {}
+        self.error_samples = []
+        self.recording = True
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def request(self, name, method, path, *, body=None, headers=None, expect=()):
+        """Send a request, read the response, and return (status, headers)."""
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        start = time.perf_counter()
+        try:
+            self.conn.request(
+                method, self.prefix + path, body=body, headers=headers or {}
+            )
+            res = self.conn.getresponse()
+            res.read()
+            status = res.status
+            res_headers = res.headers
+            if res.will_close:
+                self.close()
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            status, res_headers = None, None
+            error = f"{method} {path}: {e!r}"
+        else:
+            error = None if status in expect else f"{method} {path}: {status}"
+        elapsed = time.perf_counter() - start
+
+        if self.recording:
+            if error:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                if len(self.error_samples) < 10:
+                    self.error_samples.append(error)
+            else:
+                self.latencies.setdefault(name, []).append(elapsed)
+        return status, res_headers
+
+
+# ========================================================================
+# Scenarios
+# ========================================================================
+
+
+def scenario_explorer(client, ctx):
+    folder = f"/folder_{random.randrange(10):04}/folder_{random.randrange(10):04}/"
+    client.request(
+        "explorer.propfind_0", "PROPFIND", folder, headers={"Depth": "0"}, expect=(207,)
+    )
+    client.request(
+        "explorer.propfind_1", "PROPFIND", folder, headers={"Depth": "1"}, expect=(207,)
+    )
+    for name in EXPLORER_PROBES:
+        client.request(
+            "explorer.probe",
+            "PROPFIND",
+            folder + name,
+            headers={"Depth": "0"},
+            expect=(404,),
+        )
+
+
+def scenario_get_large(client, ctx):
+    client.request("get_large", "GET", "/large.bin", expect=(200,))
+
+
+def scenario_put_large(client, ctx):
+    client.request(
+        "put_large",
+        "PUT",
+        f"/upload-{client.client_id}.bin",
+        body=ctx["large_data"],
+        expect=(201, 204),
+    )
+
+
+def scenario_lock(client, ctx):
+    path = f"/lock-{client.client_id}.txt"
+    status, headers = client.request(
+        "lock.lock",
+        "LOCK",
+        path,
+        body=LOCK_BODY,
+        headers={"Content-Type": "application/xml", "Timeout": "Second-60"},
+        expect=(200, 201),
+    )
+    token = headers and headers.get("Lock-Token")
+    if not token:
+        return
+    client.request(
+        "lock.put",
+        "PUT",
+        path,
+        body=b"locked data",
+        headers={"If": f"({token})"},
+        expect=(200, 201, 204),
+    )
+    client.request(
+        "lock.unlock", "UNLOCK", path, headers={"Lock-Token": token}, expect=(204,)
+    )
+
+
+def scenario_copy(client, ctx):
+    dest = f"/copy-{client.client_id}/"
+    client.request(
+        "copy.copy",
+        "COPY",
+        "/folder_0000/",
+        headers={
+            "Destination": f"http://{client.host}:{client.port}{client.prefix}{dest}",
+            "Depth": "infinity",
+            "Overwrite": "T",
+        },
+        expect=(201, 204),
+    )
+    client.request("copy.delete", "DELETE", dest, expect=(204,))
+
+
+#: name -> (function, default weight)
+SCENARIOS = {
+    "explorer": (scenario_explorer, 50),
+    "get_large": (scenario_get_large, 15),
+    "put_large": (scenario_put_large, 10),
+    "lock": (scenario_lock, 15),
+    "copy": (scenario_copy, 10),
+}
+
+
+def run_load(url, *, clients, duration, warmup, scenarios, large_file_size):
+    """Replay the scenario mix with `clients` threads and return the results."""
+    ctx = {"large_data": os.urandom(large_file_size)}
+    funcs = [SCENARIOS[name][0] for name in scenarios]
+    weights = [SCENARIOS[name][1] for name in scenarios]
+    client_list = [Client(url, i) for i in range(clients)]
+    start_event = threading.Event()
+    phase = {"record_start": 0.0, "end": 0.0}
+
+    def _worker(client):
+        start_event.wait()
+        client.recording = False
+        while True:
+            now = time.monotonic()
+            if now >= phase["end"]:
+                break
+            client.recording = now >= phase["record_start"]
+            random.choices(funcs, weights)[0](client, ctx)
+        client.close()
+
+    threads = [threading.Thread(target=_worker, args=(c,)) for c in client_list]
+    for t in threads:
+        t.start()
+    phase["record_start"] = time.monotonic() + warmup
+    phase["end"] = phase["record_start"] + duration
+    start_event.set()
+    for t in threads:
+        t.join()
+    # Scenarios that were started in time may finish late
+    elapsed = max(duration, time.monotonic() - phase["record_start"])
+
+    latencies = {}
+    errors = {}
+    error_samples = []
+    for client in client_list:
+        for name, values in client.latencies.items():
+            latencies.setdefault(name, []).extend(values)
+        for name, count in client.errors.items():
+            errors[name] = errors.get(name, 0) + count
+        error_samples.extend(client.error_samples)
+
+    results = {}
+    for name in sorted(set(latencies) | set(errors)):
+        results[name] = _get_stats(
+            latencies.get(name, []), errors.get(name, 0), elapsed
+        )
+    results["total"] = _get_stats(
+        [v for values in latencies.values() for v in values],
+        sum(errors.values()),
+        elapsed,
+    )
+    return results, error_samples[:10]
+
+
+def _percentile(sorted_values, percent):
+    """Return the nearest-rank percentile of a sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _get_stats(values, errors, elapsed):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2),
+        "p50_ms": round(_percentile(values, 50) * 1000, 2),
+        "p99_ms": round(_percentile(values, 99) * 1000, 2),
+    }
+
+
+# ========================================================================
+# Report and baseline
+# ========================================================================
+
+
+def print_results(results, baseline=None):
+    base = baseline["results"] if baseline else {}
+    print(
+        f"{'Request':<22} {'count':>7} {'errors':>6} {'req/s':>9} "
+        f"{'p50 ms':>9} {'p99 ms':>9}"
+    )
+    for name, stats in results.items():
+        print(
+            f"{name:<22} {stats['count']:>7} {stats['errors']:>6} "
+            f"{stats['rps']:>9.1f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+        if name in base:
+            b = base[name]
+            print(
+                f"{'  (baseline)':<22} {b['count']:>7} {b['errors']:>6} "
+                f"{b['rps']:>9.1f} {b['p50_ms']:>9.2f} {b['p99_ms']:>9.2f}"
+            )
+
+
+def check_regressions(results, baseline, tolerance):
+    """Return a list of regressions compared to a baseline."""
+    problems = []
+    for name, base in baseline["results"].items():
+        stats = results.get(name)
+        if stats is None:
+            continue
+        if stats["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(
+                f"{name}: throughput {stats['rps']:.1f} < {base['rps']:.1f} req/s"
+            )
+        for key in ("p50_ms", "p99_ms"):
+            limit = base[key] * (1 + tolerance)
+            if stats[key] > limit and stats[key] - base[key] > LATENCY_SLACK_MS:
+                problems.append(f"{name}: {key} {stats[key]:.2f} > {base[key]:.2f} ms")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a WsgiDAV load test and compare it to a baseline."
+    )
+    parser.add_argument(
+        "--server",
+        choices=("cheroot", "gunicorn"),
+        default="cheroot",
+        help="server that is started (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="number of gunicorn worker processes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=8,
+        help="number of concurrent client connections (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=20,
+        help="seconds to measure (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=2,
+        help="seconds to run before measuring (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="only run these scenarios (may be repeated; default: all)",
+    )
+    parser.add_argument(
+        "--large-file-size",
+        type=int,
+        default=8 * 1024 * 1024,
+        help="size of the large file in bytes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="baseline file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store the results as new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative regression (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenario or list(SCENARIOS)
+    settings = {
+        "server": args.server,
+        "workers": args.workers if args.server == "gunicorn" else 1,
+        "clients": args.clients,
+        "scenarios": scenarios,
+        "large_file_size": args.large_file_size,
+    }
+
+    root_path = setup_tree(args.large_file_size)
+    server = LoadTestServer(root_path, server=args.server, workers=args.workers)
+    try:
+        server.start()
+        print(
+            f"Running {', '.join(scenarios)} with {args.clients} clients "
+            f"for {args.duration} sec. ..."
+        )
+        results, error_samples = run_load(
+            server.url,
+            clients=args.clients,
+            duration=args.duration,
+            warmup=args.warmup,
+            scenarios=scenarios,
+            large_file_size=args.large_file_size,
+        )
+    finally:
+        server.stop()
+        shutil.rmtree(root_path, ignore_errors=True)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    failed = False
+    if error_samples:
+        failed = True
+        print(f"\n{results['total']['errors']} unexpected responses, e.g.:")
+        for error in error_samples:
+            print(f"  {error}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline!r}.")
+    elif baseline is None:
+        print(f"\nNo baseline found at {args.baseline!r} (use --save-baseline).")
+    else:
+        if baseline.get("settings") != settings:
+            print(f"\nWarning: baseline was created with {baseline.get('settings')}")
+        problems = check_regressions(results, baseline, args.tolerance)
+        if problems:
+            failed = True
+            print(f"\nRegressions (tolerance {args.tolerance:.0%}):")
+            for problem in problems:
+                print(f"  {problem}")
+        else:
+            print(f"\nNo regressions (tolerance {args.tolerance:.0%}).")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""Unit tests for wsgidav.asgi_app, driving the ASGI app with plain asyncio."""
+
+import asyncio
+import os
+import shutil
+import unittest
+
+from tests.util import create_test_folder
+from wsgidav.asgi_app import WsgiDAVAsgiApp
+
+
+def _request(app, method, path, *, body=b"", headers=None, chunk_size=None):
+    """Send a request to the ASGI app and return (status, headers, body, sends)."""
+    headers = list(headers or [])
+    if chunk_size is None:
+        headers.append((b"content-length", str(len(body)).encode()))
+        chunks = [body]
+    else:
+        # Chunked transfer: no Content-Length
+        chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "server": ("127.0.0.1", 8080),
+        "client": ("127.0.0.1", 50000),
+    }
+    messages = [
+        {"type": "http.request", "body": c, "more_body": i < len(chunks) - 1}
+        for i, c in enumerate(chunks or [b""])
+    ]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+
+    assert sent[0]["type"] == "http.response.start"
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    assert sent[-1].get("more_body", False) is False
+    return sent[0]["status"], dict(sent[0]["headers"]), body, sent
+
+
+class AsgiAppTest(unittest.TestCase):
+    def setUp(self):
+        self.root_path = create_test_folder("wsgidav-test-asgi")
+        config = {
+            "provider_mapping": {"/": self.root_path},
+            "simple_dc": {"user_mapping": {"*": True}},
+            "asgi": {"max_workers": 2, "buffer_body_size": 100},
+            # Don't modify the global logging configuration
+            "logging": {"enable": False},
+            "verbose": 1,
+        }
+        self.app = WsgiDAVAsgiApp(config)
+
+    def tearDown(self):
+        self.app.shutdown()
+        shutil.rmtree(self.root_path, ignore_errors=True)
+
+    def testGetPut(self):
+        """Buffered and streamed request bodies, streamed responses."""
+        app = self.app
+        status, _headers, _body, _ = _request(app, "GET", "/file1.txt")
+        assert status == 404
+
+        # Small body: received before the request is dispatched
+        status, _headers, _body, _ = _request(app, "PUT", "/file1.txt", body=b"hello")
+        assert status == 201
+        status, headers, body, _ = _request(app, "GET", "/file1.txt")
+        assert status == 200
+        assert body == b"hello"
+        assert headers[b"content-length"] == b"5"
+
+        # Large chunked body: streamed to wsgi.input
+        data = os.urandom(300 * 1024)
+        status, _headers, _body, _ = _request(
+            app, "PUT", "/file2.bin", body=data, chunk_size=1000
+        )
+        assert status == 201
+        with open(os.path.join(self.root_path, "file2.bin"), "rb") as f:
+            assert f.read() == data
+
+        status, _headers, body, sent = _request(app, "GET", "/file2.bin")
+        assert status == 200
+        assert body == data
+        # Response was sent in multiple chunks
+        assert len(sent) > 3
+
+    def testPropfind(self):
+        """Non-ASCII paths and XML responses."""
+        status, _headers, body, _ = _request(
+            self.app, "PROPFIND", "/", headers=[(b"depth", b"1")]
+        )
+        assert status == 207
+        assert "Lotosblütenstengel".encode() in body
+
+    def testRepeatedHeaders(self):
+        """Repeated headers are combined, cookies with '; '."""
+        scope = {
+            "method": "GET",
+            "path": "/",
+            "headers": [
+                (b"cookie", b"a=1"),
+                (b"cookie", b"b=2"),
+                (b"accept", b"text/html"),
+                (b"accept", b"text/plain"),
+            ],
+        }
+        environ = self.app.make_environ(scope, None)
+        assert environ["HTTP_COOKIE"] == "a=1; b=2"
+        assert environ["HTTP_ACCEPT"] == "text/html,text/plain"
+
+    def testLifespan(self):
+        """Worker threads are stopped on lifespan shutdown."""
+        _request(self.app, "GET", "/")
+        assert self.app._executor is not None
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(self.app({"type": "lifespan"}, receive, send))
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        assert self.app._executor is None
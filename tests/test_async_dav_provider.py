@@ -0,0 +1,213 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""Unit tests for wsgidav.async_dav_provider"""
+
+import asyncio
+import io
+import shutil
+import sys
+import unittest
+
+import pytest
+
+from tests.util import create_test_folder
+from wsgidav.async_dav_provider import (
+    AsyncDAVCollection,
+    AsyncDAVNonCollection,
+    AsyncDAVProvider,
+    AsyncToSyncProvider,
+    SyncToAsyncProvider,
+)
+from wsgidav.fs_dav_provider import FilesystemProvider
+from wsgidav.wsgidav_app import WsgiDAVApp
+
+try:
+    import webtest
+except ImportError:
+    print("Could not import webtest.TestApp: some tests will fail.", file=sys.stderr)
+    raise pytest.skip(
+        "Skip tests that require WebTest", allow_module_level=True
+    ) from None
+
+#: Simulated backend latency (seconds)
+LATENCY = 0.02
+
+
+class _MemoryWriter:
+    def __init__(self, provider, path):
+        self.provider = provider
+        self.path = path
+        self.buffer = io.BytesIO()
+
+    async def write(self, data):
+        self.buffer.write(data)
+
+    async def close(self):
+        await self.provider.backend_call()
+        self.provider.files[self.path] = self.buffer.getvalue()
+
+
+class _MemoryFile(AsyncDAVNonCollection):
+    async def get_content_length(self):
+        await self.provider.backend_call()
+        return len(self.provider.files[self.path])
+
+    async def get_etag(self):
+        return str(hash(self.provider.files[self.path]))
+
+    def support_etag(self):
+        return True
+
+    async def get_content(self):
+        await self.provider.backend_call()
+        return self.provider.files[self.path]
+
+    async def begin_write(self, *, content_type=None):
+        return _MemoryWriter(self.provider, self.path)
+
+    async def delete(self):
+        await self.provider.backend_call()
+        del self.provider.files[self.path]
+
+
+class _MemoryFolder(AsyncDAVCollection):
+    async def get_member_names(self):
+        await self.provider.backend_call()
+        prefix = self.path.rstrip("/") + "/"
+        return sorted(
+            p[len(prefix) :]
+            for p in self.provider.files
+            if p.startswith(prefix) and "/" not in p[len(prefix) :]
+        )
+
+    async def create_empty_resource(self, name):
+        path = self.path.rstrip("/") + "/" + name
+        self.provider.files[path] = b""
+        return _MemoryFile(path, self.environ, provider=self.provider)
+
+
+class MemoryProvider(AsyncDAVProvider):
+    """Flat in-memory store with simulated latency that tracks concurrency."""
+
+    def __init__(self, files):
+        self.files = dict(files)
+        self.active = 0
+        self.max_active = 0
+
+    async def backend_call(self):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(LATENCY)
+        finally:
+            self.active -= 1
+
+    async def get_resource_inst(self, path, environ):
+        await self.backend_call()
+        if path in ("", "/"):
+            return _MemoryFolder("/", environ, provider=self)
+        if path in self.files:
+            return _MemoryFile(path, environ, provider=self)
+        return None
+
+
+class AsyncToSyncTest(unittest.TestCase):
+    def setUp(self):
+        files = {f"/file{i:02}.txt": b"x" * i for i in range(20)}
+        self.async_provider = MemoryProvider(files)
+        config = {
+            "provider_mapping": {"/": self.async_provider},
+            "simple_dc": {"user_mapping": {"*": True}},
+            "logging": {"enable": False},
+            "verbose": 1,
+        }
+        self.wsgi_app = WsgiDAVApp(config)
+        self.app = webtest.TestApp(self.wsgi_app)
+
+    def tearDown(self):
+        self.wsgi_app.provider_map["/"].close()
+
+    def testAdapter(self):
+        """AsyncDAVProvider instances are wrapped automatically."""
+        provider = self.wsgi_app.provider_map["/"]
+        assert isinstance(provider, AsyncToSyncProvider)
+        assert provider.async_provider is self.async_provider
+
+    def testGetPutDelete(self):
+        app = self.app
+        res = app.get("/file05.txt", status=200)
+        assert res.body == b"xxxxx"
+        assert res.headers["Content-Length"] == "5"
+
+        app.put("/new.txt", params=b"hello", status=201)
+        assert self.async_provider.files["/new.txt"] == b"hello"
+        res = app.get("/new.txt", status=200)
+        assert res.body == b"hello"
+
+        app.delete("/new.txt", status=204)
+        assert "/new.txt" not in self.async_provider.files
+        app.get("/new.txt", status=404)
+
+    def testConcurrentPropfind(self):
+        """Members and their live properties are fetched concurrently."""
+        res = self.app.request(
+            "/", method="PROPFIND", headers={"Depth": "1"}, status=207
+        )
+        for i in range(20):
+            assert f"/file{i:02}.txt".encode() in res.body
+        assert b"<D:getcontentlength>19</D:getcontentlength>" in res.body
+        assert self.async_provider.max_active >= 20
+
+
+class SyncToAsyncTest(unittest.TestCase):
+    def setUp(self):
+        self.root_path = create_test_folder("wsgidav-test-async")
+        self.fs_provider = FilesystemProvider(self.root_path, fs_opts={})
+        self.environ = {
+            "wsgidav.provider": self.fs_provider,
+            "wsgidav.config": {},
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.root_path, ignore_errors=True)
+
+    def testAdapter(self):
+        provider = SyncToAsyncProvider(self.fs_provider)
+        environ = self.environ
+
+        async def _run():
+            root = await provider.get_resource_inst("/", environ)
+            assert root.is_collection
+            names = await root.get_member_names()
+            assert "readme.txt" in names
+            members = await root.get_member_list()
+            assert len(members) == len(names)
+
+            res = await provider.get_resource_inst("/readme.txt", environ)
+            assert await res.get_content_length() > 0
+            stream = await res.get_content()
+            data = await stream.read()
+            await stream.close()
+            assert len(data) == await res.get_content_length()
+
+            assert await provider.exists("/not_existing.txt", environ) is False
+
+        asyncio.run(_run())
+
+    def testRoundTrip(self):
+        """A sync provider can be served through both adapters."""
+        provider = AsyncToSyncProvider(SyncToAsyncProvider(self.fs_provider))
+        config = {
+            "provider_mapping": {"/": provider},
+            "simple_dc": {"user_mapping": {"*": True}},
+            "logging": {"enable": False},
+            "verbose": 1,
+        }
+        app = webtest.TestApp(WsgiDAVApp(config))
+        try:
+            res = app.get("/readme.txt", status=200)
+            assert res.body
+            app.request("/", method="PROPFIND", headers={"Depth": "1"}, status=207)
+        finally:
+            provider.close()
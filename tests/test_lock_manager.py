@@ -8,6 +8,7 @@ import sys
 import unittest
 from tempfile import gettempdir
 from time import sleep
+from unittest import mock
 
 from wsgidav.dav_error import DAVError
 from wsgidav.lock_man import lock_manager, lock_storage
@@ -17,6 +18,11 @@ try:
 except ImportError:
     LockStorageRedis = None
 
+try:
+    import fakeredis  # type: ignore
+except ImportError:
+    fakeredis = None
+
 # ========================================================================
 # BasicTest
 # ========================================================================
@@ -420,6 +426,85 @@ class RedisTest(BasicTest):
         self.lm = None
 
 
+class FakeRedisTest(BasicTest):
+    """Run the lock manager tests against an in-process redis stand-in."""
+
+    def setUp(self):
+        if LockStorageRedis is None or fakeredis is None:
+            raise unittest.SkipTest("Test requires redis and fakeredis")
+        storage = LockStorageRedis()
+        with mock.patch("redis.Redis", fakeredis.FakeRedis):
+            self.lm = lock_manager.LockManager(storage)
+        self.lm._verbose = 2
+
+    def tearDown(self):
+        self.lm.storage.clear()
+        self.lm = None
+
+    def _create(self, path, timeout=None):
+        lock = {
+            "type": "write",
+            "scope": "shared",
+            "depth": "infinity",
+            "owner": b"<owner>\xc3\xa4\xff</owner>",
+            "timeout": timeout or self.timeout,
+            "principal": self.principal,
+        }
+        return self.lm.storage.create(path, lock)
+
+    def testStorageLockList(self):
+        """Path index should find locks of a resource and its children."""
+        storage = self.lm.storage
+        tokens = {
+            path: self._create(path)["token"]
+            for path in ("/", "/a", "/a/b", "/a/b/c", "/ab", "/a/ü", "/b")
+        }
+
+        def _paths(path, include_root, include_children):
+            locks = storage.get_lock_list(
+                path,
+                include_root=include_root,
+                include_children=include_children,
+                token_only=False,
+            )
+            return sorted(lock["root"] for lock in locks)
+
+        assert _paths("/a", True, False) == ["/a"]
+        assert _paths("/a/", True, True) == ["/a", "/a/b", "/a/b/c", "/a/ü"]
+        assert _paths("/a", False, True) == ["/a/b", "/a/b/c", "/a/ü"]
+        assert _paths("/", True, False) == ["/"]
+        assert _paths("/", False, True) == ["/a", "/a/b", "/a/b/c", "/a/ü", "/ab", "/b"]
+        assert len(_paths("/", True, True)) == 7
+        assert storage.get_lock_list(
+            "/a/b", include_root=True, include_children=False, token_only=True
+        ) == [tokens["/a/b"]]
+
+        # Locks are stored as JSON, but `owner` is still a bytestring
+        lock = storage.get(tokens["/a/ü"])
+        assert lock["owner"] == b"<owner>\xc3\xa4\xff</owner>"
+        assert lock["root"] == "/a/ü"
+
+        assert storage.delete(tokens["/a/b"])
+        assert not storage.delete(tokens["/a/b"])
+        assert _paths("/a", False, True) == ["/a/b/c", "/a/ü"]
+
+    def testStoragePurgeDangling(self):
+        """Index entries of expired locks should be purged on lookup."""
+        storage = self.lm.storage
+        token = self._create("/a/b")["token"]
+        # Simulate expiration by redis TTL
+        storage._redis.delete(storage._lock_key(token))
+        assert storage._redis.zcard(storage._redis_index_key) == 1
+        assert storage.get(token) is None
+        assert (
+            storage.get_lock_list(
+                "/a", include_root=True, include_children=True, token_only=True
+            )
+            == []
+        )
+        assert storage._redis.zcard(storage._redis_index_key) == 0
+
+
 # ========================================================================
 # suite
 # ========================================================================
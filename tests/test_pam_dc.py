@@ -0,0 +1,138 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""Unit test for pam_dc.py (using a fake `pam` module)."""
+
+import importlib
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+#: Fake python-pam module, also imported by the (spawned) worker processes
+FAKE_PAM = """
+import os
+import time
+
+
+class pam:
+    code = 0
+    reason = "Success"
+
+    def authenticate(
+        self, username, password, service="login", resetcreds=True, encoding="utf-8"
+    ):
+        if password == "hang":
+            time.sleep(60)
+        elif password == "slow":
+            time.sleep(1.5)
+            password = "secret"
+        elif password == "crash":
+            os._exit(1)
+        if password == "secret":
+            self.code, self.reason = 0, "Success"
+            return True
+        self.code, self.reason = 7, "Authentication failure"
+        return False
+"""
+
+
+class PAMDomainControllerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module_path = tempfile.mkdtemp(prefix="wsgidav-test-pam-")
+        Path(cls.module_path, "pam.py").write_text(FAKE_PAM)
+        # Spawned workers inherit sys.path
+        sys.path.insert(0, cls.module_path)
+        sys.modules.pop("pam", None)
+        sys.modules.pop("wsgidav.dc.pam_dc", None)
+        cls.pam_dc = importlib.import_module("wsgidav.dc.pam_dc")
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(cls.module_path)
+        sys.modules.pop("pam", None)
+        sys.modules.pop("wsgidav.dc.pam_dc", None)
+        shutil.rmtree(cls.module_path, ignore_errors=True)
+
+    def _make_dc(self, **pam_opts):
+        config = {"pam_dc": {"timeout": 30, **pam_opts}}
+        return self.pam_dc.PAMDomainController(None, config)
+
+    def testInProcess(self):
+        dc = self._make_dc(workers=0)
+        assert dc._authenticate("joe", "secret") == (True, 0, "Success")
+        assert dc.basic_auth_user("realm", "joe", "wrong", {}) is False
+        assert dc._pool is None
+
+    def testPool(self):
+        dc = self._make_dc(workers=2)
+        try:
+            assert dc.basic_auth_user("realm", "joe", "secret", {}) is True
+            assert dc._authenticate("joe", "wrong") == (
+                False,
+                7,
+                "Authentication failure",
+            )
+            pool = dc._get_pool()
+
+            # A crashed worker breaks the pool, which is replaced
+            is_ok, _code, reason = dc._authenticate("joe", "crash")
+            assert not is_ok and "failed" in reason
+            assert dc._pool is None
+            assert dc.basic_auth_user("realm", "joe", "secret", {}) is True
+            assert dc._get_pool() is not pool
+            pool = dc._get_pool()
+
+            # A hanging worker is killed, and the pool is replaced
+            processes = list(pool._processes.values())
+            dc.pam_timeout = 0.5
+            start = time.monotonic()
+            is_ok, _code, reason = dc._authenticate("joe", "hang")
+            assert not is_ok and "Timeout" in reason
+            assert time.monotonic() - start < 10
+            assert dc._pool is None
+            for process in processes:
+                process.join(5)
+                assert not process.is_alive()
+            dc.pam_timeout = 30
+            assert dc.basic_auth_user("realm", "joe", "secret", {}) is True
+        finally:
+            if dc._pool:
+                dc._discard_pool(dc._pool)
+
+    def testConcurrentTimeout(self):
+        """A hanging login does not fail other logins that are in flight."""
+        dc = self._make_dc(workers=2, timeout=3)
+        results = {}
+
+        def _login(password):
+            results[password] = dc._authenticate("joe", password)
+
+        try:
+            # Start the workers
+            assert dc.basic_auth_user("realm", "joe", "secret", {}) is True
+            pool = dc._get_pool()
+
+            hang = threading.Thread(target=_login, args=("hang",))
+            hang.start()
+            time.sleep(1.5)
+            # Still running, when the hanging worker is killed
+            slow = threading.Thread(target=_login, args=("slow",))
+            slow.start()
+            hang.join(10)
+            slow.join(10)
+
+            assert "Timeout" in results["hang"][2]
+            assert results["slow"] == (True, 0, "Success")
+            assert dc._get_pool() is not pool
+        finally:
+            if dc._pool:
+                dc._discard_pool(dc._pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
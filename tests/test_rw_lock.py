@@ -0,0 +1,166 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""Unit tests for wsgidav.rw_lock"""
+
+import threading
+import time
+import unittest
+
+from wsgidav.rw_lock import ReadWriteLock
+
+
+def _run_in_thread(func):
+    """Run `func()` in a new thread and return (thread, result_dict)."""
+    res = {}
+
+    def _target():
+        try:
+            res["value"] = func()
+        except Exception as e:
+            res["error"] = e
+
+    t = threading.Thread(target=_target)
+    t.start()
+    return t, res
+
+
+class BasicTest(unittest.TestCase):
+    """Test rw_lock.ReadWriteLock()."""
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def testNested(self):
+        """Read and write locks are reentrant."""
+        lock = self.lock
+        lock.acquire_read()
+        lock.acquire_read()
+        lock.release()
+        lock.release()
+        self.assertRaises(ValueError, lock.release)
+
+        lock.acquire_write()
+        lock.acquire_write()
+        lock.acquire_read()  # A writer may always read
+        lock.release()
+        lock.release()
+        lock.release()
+        self.assertRaises(ValueError, lock.release)
+
+    def testContextManager(self):
+        """read_locked() and write_locked() release on exit and on errors."""
+        lock = self.lock
+        with lock.read_locked():
+            assert len(lock._readers) == 1
+        assert not lock._readers
+
+        with self.assertRaises(KeyError):
+            with lock.write_locked():
+                assert lock._writer is not None
+                raise KeyError
+        assert lock._writer is None
+        self.assertRaises(ValueError, lock.release)
+
+    def testSharedReaders(self):
+        """Multiple threads may hold a read lock at the same time."""
+        lock = self.lock
+        lock.acquire_read()
+        t, res = _run_in_thread(lambda: lock.acquire_read(timeout=1) or lock.release())
+        t.join()
+        assert "error" not in res
+        lock.release()
+
+    def testExclusiveWriter(self):
+        """Writers block readers and other writers."""
+        lock = self.lock
+        lock.acquire_write()
+        t, res = _run_in_thread(lambda: lock.acquire_read(timeout=0.05))
+        t.join()
+        assert isinstance(res["error"], RuntimeError)
+        t, res = _run_in_thread(lambda: lock.acquire_write(timeout=0))
+        t.join()
+        assert isinstance(res["error"], RuntimeError)
+        lock.release()
+        # The timed-out requests must not leave any traces
+        assert not lock._pending_writers
+        with lock.write_locked(timeout=0):
+            pass
+
+    def testWriterPreference(self):
+        """A pending writer blocks new readers, but not nested readers."""
+        lock = self.lock
+        lock.acquire_read()
+        writer, writer_res = _run_in_thread(
+            lambda: lock.acquire_write(timeout=2) or lock.release()
+        )
+        while not lock._pending_writers:
+            time.sleep(0.001)
+
+        # New readers have to wait for the pending writer...
+        t, res = _run_in_thread(lambda: lock.acquire_read(timeout=0.05))
+        t.join()
+        assert isinstance(res["error"], RuntimeError)
+        # ...but we may nest our read lock
+        lock.acquire_read()
+        lock.release()
+
+        lock.release()
+        writer.join()
+        assert "error" not in writer_res
+
+    def testUpgrade(self):
+        """A single reader may upgrade to a write lock."""
+        lock = self.lock
+        lock.acquire_read()
+        lock.acquire_write()
+        me = threading.get_ident()
+        assert lock._writer == me and not lock._readers
+        lock.release()
+        # Still a writer, until all nested locks are released
+        assert lock._writer == me
+        lock.release()
+        assert lock._writer is None
+
+    def testUpgradeDeadlock(self):
+        """Two concurrent upgrades are denied."""
+        lock = self.lock
+        lock.acquire_read()
+
+        def _upgrade():
+            lock.acquire_read()
+            # Blocks (holding the upgrade slot) until the main thread releases
+            lock.acquire_write(timeout=2)
+            lock.release()
+            lock.release()
+
+        t, res = _run_in_thread(_upgrade)
+        while not lock._upgrade_writer_count:
+            time.sleep(0.001)
+        self.assertRaises(ValueError, lock.acquire_write)
+        lock.release()
+        t.join()
+        assert "error" not in res
+        assert lock._writer is None and not lock._readers
+
+    def testUpgradeTimeout(self):
+        """A timed-out upgrade keeps the read lock."""
+        lock = self.lock
+        lock.acquire_read()
+        other_has_read = threading.Event()
+        done = threading.Event()
+
+        def _other():
+            with lock.read_locked():
+                other_has_read.set()
+                done.wait(2)
+
+        t, res = _run_in_thread(_other)
+        other_has_read.wait(2)
+        self.assertRaises(RuntimeError, lock.acquire_write, timeout=0.05)
+        assert lock._readers[threading.get_ident()] == 1
+        assert not lock._upgrade_writer_count
+        done.set()
+        t.join()
+        lock.release()
+        assert not lock._readers
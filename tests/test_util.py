@@ -8,7 +8,10 @@ import logging.handlers
 import sys
 import unittest
 from io import StringIO
+from unittest import mock
 
+from wsgidav import xml_tools
+from wsgidav.dav_error import HTTP_FORBIDDEN, HTTP_LOCKED, DAVError
 from wsgidav.util import (
     BASE_LOGGER_NAME,
     check_tags,
@@ -192,6 +195,88 @@ class BasicTest(unittest.TestCase):
         self.assertRaises(KeyError, get_dict_value, d, "x", as_dict=False)
 
 
+class MultistatusWriterTest(unittest.TestCase):
+    """Test the multistatus writer backends."""
+
+    def _write(self, name):
+        writer = xml_tools.make_multistatus_writer(name)
+        for i in range(3):
+            etree = xml_tools.etree
+            resource_type = etree.Element("{DAV:}resourcetype")
+            if i == 0:
+                etree.SubElement(resource_type, "{DAV:}collection")
+            # Written directly (i == 0), or by etree (attributes or unknown ns)
+            custom = etree.Element("{http://example.com/ns}custom")
+            custom.text = "text & <more>"
+            child = etree.SubElement(custom, "{DAV:}href")
+            child.text = "/"
+            child.tail = "tail"
+            if i == 1:
+                child.set("attr", 'a"b')
+            elif i == 2:
+                etree.SubElement(custom, "{urn:unknown}child")
+            extra = []
+            if xml_tools.use_lxml:
+                # Namespace declarations that are not used by the tags, or
+                # other prefixes for known namespaces
+                extra.append(
+                    (
+                        "{DAV:}lockdiscovery",
+                        etree.Element(
+                            "{DAV:}lockdiscovery",
+                            nsmap={"D": "DAV:", "X": "urn:x"} if i else {"d": "DAV:"},
+                        ),
+                    )
+                )
+            writer.add_response(
+                f"/folder/f\u00fcle {i} & <x>.txt",
+                extra
+                + [
+                    ("{DAV:}displayname", f"f\u00fcle {i} & <x>\r\n.txt"),
+                    ("{DAV:}getcontentlength", str(i)),
+                    ("{DAV:}getcontenttype", ""),
+                    ("{DAV:}resourcetype", resource_type),
+                    ("{http://example.com/ns}custom", custom),
+                    ("{DAV:}supportedlock", None),
+                    ("{http://example.com/ns}author", b"Joe"),
+                    ("{urn:other}empty", None),
+                    ("{}no-ns", "a"),
+                    ("no-ns", "b"),
+                    ("{DAV:}quota-used-bytes", DAVError(HTTP_FORBIDDEN)),
+                    ("{urn:other}locked", DAVError(HTTP_LOCKED)),
+                ],
+            )
+        writer.add_status_response("/folder/locked.txt", "423 Locked")
+        writer.add_response_description("Line 1\nLine <2>")
+        return writer.to_bytes()
+
+    def testBackends(self):
+        assert set(xml_tools.MULTISTATUS_WRITERS) >= {"etree", "fast"}
+        self.assertRaises(ValueError, xml_tools.make_multistatus_writer, "foo")
+
+        xml = self._write("fast")
+        # Output must be well-formed
+        root = xml_tools.etree.XML(xml)
+        assert len(root) == 5
+        assert xml.count(b"</D:response>") == 4
+        assert "f\u00fcle 0 &amp; &lt;x&gt;.txt".encode() in xml
+
+        if not xml_tools.use_lxml:
+            raise unittest.SkipTest("Identical output requires lxml")
+        assert xml == self._write("etree")
+        # Also without any response
+        assert (
+            xml_tools.make_multistatus_writer("fast").to_bytes()
+            == xml_tools.make_multistatus_writer("etree").to_bytes()
+        )
+        # Both reject strings that cannot be represented in XML
+        for name in ("etree", "fast"):
+            writer = xml_tools.make_multistatus_writer(name)
+            self.assertRaises(
+                ValueError, writer.add_response, "/", [("{DAV:}x", "a\x00")]
+            )
+
+
 class LoggerTest(unittest.TestCase):
     """Test configurable logging."""
 
@@ -308,6 +393,33 @@ class LoggerTest(unittest.TestCase):
         assert rootOutput == ""
         assert baseOutput == ""
 
+    def testQueueLogging(self):
+        """Queue mode writes records from a listener thread."""
+        config = {"verbose": 3, "logging": {"queue": True}}
+        stdout = StringIO()
+        with mock.patch.object(sys, "stdout", stdout):
+            init_logging(config)
+            _baseLogger = logging.getLogger(BASE_LOGGER_NAME)
+            handler = _baseLogger.handlers[0]
+            assert isinstance(handler, logging.handlers.QueueHandler)
+            listener = handler.wsgidav_listener
+
+            _baseLogger.debug("_baseLogger.debug")
+            _baseLogger.info("_baseLogger.info %s", "lazy")
+
+            # Re-initializing stops the listener and flushes pending records
+            config["logging"]["queue"] = False
+            init_logging(config)
+            assert handler.wsgidav_listener is None
+            assert listener._thread is None
+            assert not isinstance(
+                _baseLogger.handlers[0], logging.handlers.QueueHandler
+            )
+
+        output = stdout.getvalue()
+        assert ".debug" not in output
+        assert "_baseLogger.info lazy" in output
+
 
 if __name__ == "__main__":
     unittest.main()
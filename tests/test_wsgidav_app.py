@@ -12,18 +12,25 @@ See http://webtest.readthedocs.org/en/latest/
 """
 
 import os
+import pstats
 import shutil
 import sys
 import tempfile
+import threading
+import time
 import unittest
 from pathlib import Path
+from unittest import mock
 from urllib.parse import quote
 
 import pytest
 
-from tests.util import create_test_folder
-from wsgidav import util
+from tests.util import create_test_folder, make_tree
+from wsgidav import request_server, util
+from wsgidav.dav_provider import DAVProvider, _DAVResource
+from wsgidav.dir_browser import WsgiDavDirBrowser
 from wsgidav.fs_dav_provider import FilesystemProvider
+from wsgidav.mw.metrics import _ResponseIterator
 from wsgidav.wsgidav_app import WsgiDAVApp
 
 try:
@@ -48,7 +55,9 @@ except ImportError:
 class ServerTest(unittest.TestCase):
     """Test wsgidav_app using paste.fixture."""
 
-    def _makeWsgiDAVApp(self, share_path, with_authentication, fs_opts=None):
+    def _makeWsgiDAVApp(
+        self, share_path, with_authentication, fs_opts=None, auth_opts=None
+    ):
         provider = FilesystemProvider(share_path, fs_opts=fs_opts or {})
 
         config = {
@@ -73,9 +82,26 @@ class ServerTest(unittest.TestCase):
             config["simple_dc"]["user_mapping"] = {
                 "/": {"tester": {"password": "secret", "description": "", "roles": []}}
             }
+            if auth_opts:
+                config["http_authenticator"].update(auth_opts)
 
         return WsgiDAVApp(config)
 
+    def _make_app(self, **config_overrides):
+        """Return a TestApp for the test folder (anonymous access).
+
+        `config_overrides` replace the top-level options of the default test
+        configuration. The WsgiDAVApp is available as `app.app`.
+        """
+        config = {
+            "provider_mapping": {"/": self.root_path},
+            "simple_dc": {"user_mapping": {"*": True}},
+            "logging": {"enable_loggers": []},
+            "verbose": 1,
+        }
+        config.update(config_overrides)
+        return webtest.TestApp(WsgiDAVApp(config))
+
     def setUp(self):
         self.temp_paths = []
         self.root_path = create_test_folder("wsgidav-test")
@@ -110,6 +136,473 @@ class ServerTest(unittest.TestCase):
         # res = app.get("/subfolder", status=301)
         res = app.get("/subfolder")  # seems to follow redirects?
 
+    def testDirBrowserPaging(self):
+        """Directory listings are sorted and paginated."""
+        root_path = tempfile.mkdtemp(prefix="wsgidav-test-paging-")
+        self.temp_paths.append(root_path)
+        os.mkdir(os.path.join(root_path, "zz_folder"))
+        for i in range(12):
+            with open(os.path.join(root_path, f"file_{i:02}.txt"), "wb") as f:
+                f.write(b"x" * (i if i % 2 else 20 + i))
+        with open(os.path.join(root_path, "Thumbs.db"), "wb") as f:
+            f.write(b"ignored")
+        app = self._make_app(
+            provider_mapping={"/": root_path}, dir_browser={"page_size": 5}
+        )
+
+        def _names(res):
+            """Return listed names in order of appearance."""
+            names = ["zz_folder"] + [f"file_{i:02}.txt" for i in range(12)]
+            names = [n for n in names if n in res.text]
+            return sorted(names, key=res.text.index)
+
+        res = app.get("/", status=200)
+        assert "Content-Length" not in res.headers
+        assert _names(res) == ["zz_folder"] + [f"file_{i:02}.txt" for i in range(4)]
+        assert "1 - 5 of 13" in res.text
+        assert "Thumbs.db" not in res.text
+        assert 'href="?offset=5"' in res.text
+
+        res = app.get("/?offset=10", status=200)
+        assert _names(res) == ["file_09.txt", "file_10.txt", "file_11.txt"]
+        assert "11 - 13 of 13" in res.text
+        assert "Next" not in res.text
+
+        # Folders first, then the largest files
+        res = app.get("/?sort=size&order=desc", status=200)
+        assert _names(res) == [
+            "zz_folder",
+            "file_10.txt",
+            "file_08.txt",
+            "file_06.txt",
+            "file_04.txt",
+        ]
+        # Page size is limited by the configuration
+        res = app.get("/?limit=100&sort=invalid&offset=x", status=200)
+        assert len(_names(res)) == 5
+
+    def testDirBrowserJson(self):
+        """Directory listings are available as JSON."""
+        app = self.app
+        res = app.get("/?format=json", status=200)
+        assert res.content_type == "application/json"
+        assert res.headers["ETag"]
+        data = res.json
+        assert data["href"] == "/"
+        assert data["total"] == 8
+        assert data["sort"] == "name"
+        names = [item["name"] for item in data["items"]]
+        assert names[0] == "subfolder"
+        assert names[1:3] == ["cors.html", "data.json"]
+        item = data["items"][names.index("readme.txt")]
+        assert item == {
+            "name": "readme.txt",
+            "href": "readme.txt",
+            "is_collection": False,
+            "type": "TXT-File",
+            "size": 21,
+            "modified": item["modified"],
+        }
+        assert data["items"][0]["href"] == "./subfolder/"
+        assert data["items"][0]["size"] is None
+
+        res = app.get("/?format=json&name=*.JS*", status=200)
+        assert [item["name"] for item in res.json["items"]] == ["data.json", "main.js"]
+
+        res = app.get("/?format=json&type=folder", status=200)
+        assert res.json["total"] == 1
+
+        res = app.get(
+            "/?format=json&type=file&sort=size&order=desc&limit=2&fields=name,size",
+            status=200,
+        )
+        assert res.json["total"] == 7
+        assert res.json["limit"] == 2
+        assert res.json["items"] == [
+            {"name": "Lotosblütenstengel (蓮花莖).docx", "size": 58866},
+            {"name": "cors.html", "size": 994},
+        ]
+
+        # The HTML listing uses the same filters and has another ETag
+        res2 = app.get("/?type=folder", status=200)
+        assert "subfolder" in res2.text
+        assert "readme.txt" not in res2.text
+        assert res2.headers["ETag"] != res.headers["ETag"]
+
+    def testDirBrowserAssets(self):
+        """Dir browser assets have content-hashed URLs and may be compressed."""
+        app = self._make_app()
+        dir_browser = app.app.application
+        while not isinstance(dir_browser, WsgiDavDirBrowser):
+            dir_browser = dir_browser.next_app
+        # Assets are loaded on first use
+        assert dir_browser.assets == {}
+        res = app.get("/", status=200)
+        assert "/style.css" in dir_browser.assets
+        url = res.html.find("link", rel="stylesheet")["href"]
+        assert url.startswith("/:dir_browser/style.css?v=")
+
+        res = app.get(url, status=200)
+        assert res.content_type == "text/css"
+        assert res.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert "Content-Encoding" not in res.headers
+        assert res.headers["Vary"] == "Accept-Encoding"
+        css = res.body
+        etag = res.headers["ETag"]
+
+        # Unversioned (or outdated) URLs must be revalidated
+        res = app.get("/:dir_browser/style.css?v=123", status=200)
+        assert res.headers["Cache-Control"] == "public, no-cache"
+        app.get("/:dir_browser/style.css", headers={"If-None-Match": etag}, status=304)
+
+        # (WebTest decodes the gzip-compressed body)
+        res = app.get(url, headers={"Accept-Encoding": "br, gzip"}, status=200)
+        assert res.headers["ETag"] == etag[:-1] + '-gz"'
+        assert res.body == css
+        res = app.get(url, headers={"Accept-Encoding": "gzip;q=0"}, status=200)
+        assert res.headers["ETag"] == etag
+
+        # Binary assets are not compressed
+        res = app.get("/:dir_browser/logo.png", headers={"Accept-Encoding": "gzip"})
+        assert res.content_type == "image/png"
+        assert "Vary" not in res.headers
+
+        # Other files are served by the file system provider
+        res = app.get("/:dir_browser/template.html", status=200)
+        assert "/template.html" not in dir_browser.assets
+        app.get("/:dir_browser/../htdocs/../style.css", status=403)
+
+    def testDirBrowserConditionalGet(self):
+        """Directory listings support ETag / 304 and are optionally cached."""
+        app = self._make_app(dir_browser={"cache_pages": 2})
+        org_get_context = WsgiDavDirBrowser._get_context
+        render_count = 0
+
+        def _get_context(*args, **kwargs):
+            nonlocal render_count
+            render_count += 1
+            return org_get_context(*args, **kwargs)
+
+        with mock.patch.object(WsgiDavDirBrowser, "_get_context", _get_context):
+            res = app.get("/", status=200)
+            etag = res.headers["ETag"]
+            assert etag.startswith('W/"')
+            assert "no-cache" in res.headers["Cache-Control"]
+            assert res.headers["Last-Modified"]
+            assert render_count == 1
+
+            res = app.get("/", headers={"If-None-Match": etag}, status=304)
+            assert res.headers["ETag"] == etag
+            assert not res.body
+            res = app.get(
+                "/",
+                headers={"If-Modified-Since": res.headers["Last-Modified"]},
+                status=304,
+            )
+
+            # Served from the cache
+            res2 = app.get("/", status=200)
+            assert res2.body == app.get("/", status=200).body
+            assert render_count == 1
+
+            # Other page arguments have another ETag
+            res = app.get("/?sort=size", status=200)
+            assert res.headers["ETag"] != etag
+            assert render_count == 2
+
+            # Revalidation and cache hits do not evaluate the members
+            with mock.patch.object(
+                WsgiDavDirBrowser, "_get_members", side_effect=AssertionError
+            ):
+                app.get("/", headers={"If-None-Match": etag}, status=304)
+                app.get("/", status=200)
+
+            # Added members change the ETag
+            time.sleep(0.01)
+            app.put("/new_member.txt", params=b"new", status=201)
+            res = app.get("/", headers={"If-None-Match": etag}, status=200)
+            assert res.headers["ETag"] != etag
+            assert render_count == 3
+
+    def testResolveProvider(self):
+        """Requests are routed to the most specific share."""
+        provider_mapping = {
+            "/": self.root_path,
+            "/a": self.root_path,
+            "/a/b": self.root_path,
+            "/Mixed": self.root_path,
+        }
+        app = self._make_app(provider_mapping=provider_mapping).app
+
+        def _share(path):
+            return app.resolve_provider(path)[0]
+
+        assert _share("") == "/"
+        assert _share("/") == "/"
+        assert _share("/x/y") == "/"
+        assert _share("/a") == "/a"
+        assert _share("/a/") == "/a"
+        assert _share("/ab") == "/"
+        assert _share("/a/bc/d") == "/a"
+        assert _share("/a/b") == "/a/b"
+        assert _share("/A/B/c/d.txt") == "/a/b"
+        assert app.resolve_provider("/a/b/c")[1] is app.provider_map["/a/b"]
+        assert _share("/mixed/x") == "/mixed"
+        assert app.resolve_provider("/mixed")[1] is app.provider_map["/Mixed"]
+
+        del provider_mapping["/"]
+        app = self._make_app(provider_mapping=provider_mapping).app
+        assert app.resolve_provider("/x") == (None, None)
+        assert app.resolve_provider("/a/x")[0] == "/a"
+
+    def testConcurrentPropfind(self):
+        """Opt-in concurrent PROPFIND keeps the response order."""
+        app = self._make_app(
+            provider_mapping={
+                "/serial": self.root_path,
+                "/pool": {"root": self.root_path, "propfind_workers": 4},
+            }
+        )
+        wsgi_app = app.app
+        assert wsgi_app.provider_map["/serial"].get_propfind_executor() is None
+        assert wsgi_app.provider_map["/pool"].propfind_workers == 4
+
+        thread_names = set()
+        org_get_properties = _DAVResource.get_properties
+
+        def _get_properties(res, mode, *, name_list=None):
+            thread_names.add(threading.current_thread().name)
+            time.sleep(0.001)
+            return org_get_properties(res, mode, name_list=name_list)
+
+        with mock.patch.object(_DAVResource, "get_properties", _get_properties):
+            serial = app.request(
+                "/serial/", method="PROPFIND", headers={"Depth": "1"}, status=207
+            )
+            assert not any(n.startswith("wsgidav-propfind") for n in thread_names)
+            pool = app.request(
+                "/pool/", method="PROPFIND", headers={"Depth": "1"}, status=207
+            )
+            assert any(n.startswith("wsgidav-propfind") for n in thread_names)
+
+        assert serial.body.replace(b"/serial/", b"/pool/") == pool.body
+
+    def testPropfindBodyCache(self):
+        """Identical PROPFIND bodies are parsed only once."""
+        app = self.app
+        body = (
+            b'<?xml version="1.0" encoding="utf-8"?>'
+            b'<D:propfind xmlns:D="DAV:" xmlns:Z="urn:test">'
+            b"<D:prop><D:getcontentlength/><Z:missing/></D:prop></D:propfind>"
+        )
+        request_server._parse_propfind_body.cache_clear()
+        res = None
+        for _ in range(3):
+            res = app.request(
+                "/readme.txt", method="PROPFIND", body=body, headers={"Depth": "0"}
+            )
+            assert res.status_code == 207
+            assert b"<D:getcontentlength>" in res.body
+            assert b"404 Not Found" in res.body
+        info = request_server._parse_propfind_body.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+
+        # Invalid bodies are rejected every time
+        for _ in range(2):
+            app.request("/", method="PROPFIND", body=b"<D:propfind", status=400)
+            app.request(
+                "/",
+                method="PROPFIND",
+                body=b'<D:foo xmlns:D="DAV:"><D:allprop/></D:foo>',
+                status=400,
+            )
+        # Large bodies are not cached
+        large = body.replace(
+            b"<Z:missing/>",
+            b"<Z:missing/>"
+            * (request_server.PROPFIND_CACHE_MAX_BODY_SIZE // len(b"<Z:missing/>")),
+        )
+        app.request("/", method="PROPFIND", body=large, status=207)
+        assert request_server._parse_propfind_body.cache_info().currsize == 1
+
+    def testMetrics(self):
+        """Metrics are collected and served in Prometheus text format."""
+        metrics = {"enable": True, "buckets": [0.5, 10], "token": "secret"}
+        app = self._make_app(metrics=metrics, lock_storage=True)
+        # Chunks are only counted if there is no Content-Length
+        with mock.patch.object(
+            _ResponseIterator, "_count_chunks", side_effect=AssertionError
+        ):
+            app.get("/readme.txt", status=200)
+            app.head("/readme.txt", status=200)
+        not_found = app.get("/not-existing.txt", status=404)
+        app.put("/new.txt", params=b"hello", status=201)
+        app.request("/", method="PROPFIND", headers={"Depth": "1"}, status=207)
+        app.request("/", method="FOO", status=405, expect_errors=True)
+
+        app.get("/:metrics", status=401)
+        app.get("/:metrics", headers={"Authorization": "Bearer wrong"}, status=401)
+        res = app.get(
+            "/:metrics", headers={"Authorization": "Bearer secret"}, status=200
+        )
+        assert res.content_type == "text/plain"
+        text = res.text
+        assert "# TYPE wsgidav_requests_total counter" in text
+        assert 'wsgidav_requests_total{method="GET",share="/",status="200"} 1' in text
+        assert 'wsgidav_requests_total{method="GET",share="/",status="404"} 1' in text
+        assert 'wsgidav_requests_total{method="PUT",share="/",status="201"} 1' in text
+        assert 'wsgidav_requests_total{method="OTHER",share="/",status="405"} 1' in text
+        assert (
+            'wsgidav_request_duration_seconds_bucket{method="GET",share="/",le="+Inf"} 2'
+            in text
+        )
+        assert (
+            'wsgidav_request_duration_seconds_count{method="PUT",share="/"} 1' in text
+        )
+        assert 'wsgidav_request_bytes_total{method="PUT",share="/"} 5' in text
+        assert 'wsgidav_response_bytes_total{method="PROPFIND",share="/"}' in text
+        readme_size = os.path.getsize(os.path.join(self.root_path, "readme.txt"))
+        bytes_out = readme_size + len(not_found.body)
+        assert (
+            f'wsgidav_response_bytes_total{{method="GET",share="/"}} {bytes_out}'
+            in text
+        )
+        assert 'wsgidav_response_bytes_total{method="HEAD",share="/"} 0' in text
+        assert "wsgidav_requests_active 0" in text
+        assert "wsgidav_locks 0" in text
+        # The metrics request itself is not counted
+        assert "/:metrics" not in text
+        assert 'status="401"' not in text
+
+        # Without a token, the endpoint is denied
+        del metrics["token"]
+        app = self._make_app(metrics=metrics)
+        app.get("/:metrics", status=403)
+        metrics["path"] = None
+        app = self._make_app(metrics=metrics)
+        app.get("/:metrics", status=404)
+
+    def testProfiler(self):
+        """Selected requests are profiled, old pstats files are removed."""
+        output_dir = tempfile.mkdtemp(prefix="wsgidav-test-profiles")
+        self.temp_paths.append(output_dir)
+        app = self._make_app(
+            profiler={
+                "enable": True,
+                "methods": ["PROPFIND"],
+                "paths": ["/subfolder/*"],
+                "header": "X-Profile",
+                "output_dir": output_dir,
+                "max_files": 2,
+            }
+        )
+
+        def _files():
+            return sorted(os.listdir(output_dir))
+
+        res = app.get("/readme.txt", status=200)
+        assert res.body
+        assert _files() == []
+
+        app.request("/", method="PROPFIND", headers={"Depth": "1"}, status=207)
+        files = _files()
+        assert len(files) == 1
+        assert "-PROPFIND-root-" in files[0]
+        stats = pstats.Stats(os.path.join(output_dir, files[0]))
+        assert stats.total_calls > 0
+
+        app.get("/readme.txt", headers={"X-Profile": "1"}, status=200)
+        time.sleep(0.002)  # file names have millisecond resolution
+        app.get("/subfolder/", status=200)
+        files = _files()
+        assert len(files) == 2
+        assert "-GET-readme.txt-" in files[0]
+        assert "-GET-subfolder-" in files[1]
+
+    def testTimings(self):
+        """Request phases are timed and reported."""
+        app = self._make_app(
+            http_authenticator={"accept_digest": False, "default_to_digest": False},
+            simple_dc={"user_mapping": {"*": {"tester": {"password": "secret"}}}},
+            timings={"enable": True, "server_timing_header": True},
+            logging={"enable": False},
+            verbose=3,
+        )
+        app.authorization = ("Basic", ("tester", "secret"))
+
+        with self.assertLogs("wsgidav", level="INFO") as cm:
+            res = app.request(
+                "/", method="PROPFIND", headers={"Depth": "1"}, status=207
+            )
+        server_timing = res.headers["Server-Timing"]
+        for phase in ("resolve", "auth", "resource", "conditions", "props", "xml"):
+            assert f"{phase};dur=" in server_timing
+        assert "app;dur=" in server_timing
+        assert "stream" not in server_timing
+
+        log_line = [line for line in cm.output if '"PROPFIND /"' in line][-1]
+        assert "timings=[resolve=" in log_line
+        assert "stream=" in log_line
+
+    def testDynamicShare(self):
+        """Share templates create providers on demand (LRU cached)."""
+        for user in ("alice", "bob", "carol"):
+            os.mkdir(os.path.join(self.root_path, user))
+        Path(self.root_path, "alice", "alice.txt").write_text("hello")
+        app = self._make_app(
+            provider_mapping={
+                "/": self.root_path,
+                "/home/admin": self.root_path,
+                "/home/{user}": {"root": self.root_path + "/{user}"},
+            },
+            dynamic_shares={"max_count": 2},
+        )
+        wsgi_app = app.app
+        dyn_share = wsgi_app.dynamic_shares[0]
+        assert not wsgi_app.provider_map.get("/home/{user}")
+        assert len(dyn_share) == 0
+
+        share, provider = wsgi_app.resolve_provider("/home/alice/alice.txt")
+        assert share == "/home/alice"
+        assert provider.root_folder_path.endswith("alice")
+        assert provider.share_path == "/home/alice"
+        assert wsgi_app.resolve_provider("/home/alice")[1] is provider
+        assert dyn_share.hits == 1 and dyn_share.misses == 1
+        # Static shares are preferred
+        assert wsgi_app.resolve_provider("/home/admin/x")[0] == "/home/admin"
+        # Not a match, or folder does not exist: fall back to static shares
+        assert wsgi_app.resolve_provider("/home")[0] == "/"
+        assert wsgi_app.resolve_provider("/home/..")[0] == "/"
+        assert wsgi_app.resolve_provider("/home/dave/x")[0] == "/"
+        # Share paths are case insensitive
+        assert wsgi_app.resolve_provider("/home/Alice/x") == ("/home/alice", provider)
+        # Failures are remembered
+        with mock.patch.object(wsgi_app, "_create_provider") as create_provider:
+            assert wsgi_app.resolve_provider("/home/dave/x")[0] == "/"
+            create_provider.assert_not_called()
+            dyn_share._failures["/home/dave"] = time.monotonic() - 1
+            create_provider.side_effect = ValueError("Unknown user")
+            assert wsgi_app.resolve_provider("/home/Dave/x")[0] == "/"
+            assert create_provider.call_count == 1
+
+        # LRU eviction
+        wsgi_app.resolve_provider("/home/bob")
+        wsgi_app.resolve_provider("/home/carol")
+        assert len(dyn_share) == 2
+        assert wsgi_app.resolve_provider("/home/alice")[1] is not provider
+
+        # Idle eviction
+        dyn_share.idle_timeout = 0.01
+        time.sleep(0.02)
+        wsgi_app.resolve_provider("/home/bob")
+        assert len(dyn_share) == 1
+
+        res = app.get("/home/alice/alice.txt", status=200)
+        assert res.body == b"hello"
+        res = app.get("/home/alice/", status=200)
+        assert "alice.txt" in res
+        app.get("/home/dave/alice.txt", status=404)
+
     def testGetPut(self):
         """Read and write file contents."""
         app = self.app
@@ -249,6 +742,277 @@ class ServerTest(unittest.TestCase):
         # Non-existing resource (expect 404 NotFound)
         app.get("/not_existing_file.txt", headers=headers, status=404)
 
+    def testAuthenticationCache(self):
+        """Repeated basic credentials are verified from the auth cache."""
+        wsgi_app = self._makeWsgiDAVApp(
+            self.root_path,
+            True,
+            auth_opts={"auth_cache": {"enable": True, "ttl": 60, "max_size": 2}},
+        )
+        app = webtest.TestApp(wsgi_app)
+        dc = wsgi_app.http_authenticator.get_domain_controller()
+        cache = dc.auth_cache
+        assert cache is not None
+
+        def _headers(user, password):
+            creds = util.calc_base64(user + ":" + password)
+            return {"Authorization": f"Basic {creds}"}
+
+        app.get("/", headers=_headers("tester", "secret"), status=200)
+        assert len(cache) == 1 and cache.hits == 0
+        app.get("/", headers=_headers("tester", "secret"), status=200)
+        assert cache.hits == 1
+
+        # Wrong passwords are never cached
+        app.get("/", headers=_headers("tester", "wrong"), status=401)
+        assert len(cache) == 1
+
+        # Passwords are not stored in plain text
+        assert not any(b"secret" in k for k in cache._entries)
+
+        assert cache.invalidate("other") == 0
+        assert cache.invalidate("tester") == 1
+        app.get("/", headers=_headers("tester", "secret"), status=200)
+        assert cache.hits == 1 and len(cache) == 1
+
+        # Bounded size: least recently used entries are evicted
+        environ = {"wsgidav.auth.roles": ("editor",)}
+        cache.add("/", "u1", "p1", environ)
+        cache.add("/", "u2", "p2", environ)
+        assert len(cache) == 2
+        assert not cache.get("/", "tester", "secret", {})
+        res_environ = {}
+        assert cache.get("/", "u1", "p1", res_environ)
+        assert res_environ["wsgidav.auth.roles"] == ("editor",)
+
+        # Expired entries are discarded
+        cache.ttl = -1
+        cache.add("/", "u3", "p3", environ)
+        assert not cache.get("/", "u3", "p3", {})
+
+        # Disabled by default
+        wsgi_app = self._makeWsgiDAVApp(self.root_path, True)
+        assert wsgi_app.http_authenticator.get_domain_controller().auth_cache is None
+
+    def testSessionCookie(self):
+        """A signed session cookie replaces basic authentication."""
+        wsgi_app = self._makeWsgiDAVApp(
+            self.root_path,
+            True,
+            auth_opts={"session_cookie": {"enable": True, "max_age": 60}},
+        )
+        app = webtest.TestApp(wsgi_app)
+        creds = util.calc_base64("tester:secret")
+        headers = {"Authorization": f"Basic {creds}"}
+
+        app.get("/", status=401)
+        res = app.get("/", headers=headers, status=200)
+        cookie = res.headers["Set-Cookie"]
+        assert cookie.startswith("wsgidav-session=")
+        assert "HttpOnly" in cookie and "Max-Age=60" in cookie
+        token = app.cookies["wsgidav-session"]
+
+        # The cookie is now sent by the test app automatically
+        res = app.get("/", status=200)
+        assert "Set-Cookie" not in res.headers
+
+        # Tampered tokens are rejected
+        data, signature = token.split(".")
+        authenticator = wsgi_app.http_authenticator
+        payload = authenticator.parse_session_token(token)
+        assert payload["u"] == "tester"
+        forged = data[:-4] + "AAAA." + signature
+        assert authenticator.parse_session_token(forged) is None
+        assert authenticator.parse_session_token("garbage") is None
+        app.set_cookie("wsgidav-session", forged)
+        app.get("/", status=401)
+
+        # Expired tokens are rejected
+        authenticator.session_max_age = -1
+        expired = authenticator.make_session_token("/", "tester", {})
+        authenticator.session_max_age = 60
+        app.set_cookie("wsgidav-session", expired)
+        app.get("/", status=401)
+
+        # Logout deletes the cookie
+        app.set_cookie("wsgidav-session", token)
+        app.get("/", status=200)
+        res = app.get("/?logout", status=401)
+        assert "Max-Age=0" in res.headers["Set-Cookie"]
+
+        # Tokens from another server instance (secret) are rejected
+        other_app = webtest.TestApp(
+            self._makeWsgiDAVApp(
+                self.root_path,
+                True,
+                auth_opts={"session_cookie": {"enable": True}},
+            )
+        )
+        other_app.set_cookie("wsgidav-session", token)
+        other_app.get("/", status=401)
+
+        # An explicit Authorization header takes precedence over the cookie
+        app.set_cookie("wsgidav-session", token)
+        wrong = {"Authorization": f"Basic {util.calc_base64('tester:wrong')}"}
+        app.get("/", headers=wrong, status=401)
+
+        # Tokens are revoked if the password changes or the user is removed
+        user_map = wsgi_app.http_authenticator.domain_controller.user_map
+        app.set_cookie("wsgidav-session", token)
+        app.get("/", status=200)
+        user_map["/"]["tester"]["password"] = "changed"
+        app.get("/", status=401)
+        user_map["/"]["tester"]["password"] = "secret"
+        app.get("/", status=200)
+        del user_map["/"]["tester"]
+        app.get("/", status=401)
+
+    def testCompactResources(self):
+        """File system resources use __slots__ and keep only a few stat fields."""
+        provider = FilesystemProvider(self.root_path, fs_opts={})
+        provider.set_share_path("/")
+        environ = {"wsgidav.provider": provider, "wsgidav.config": {}}
+        folder = provider.get_resource_inst("/", environ)
+        members = {m.name: m for m in folder.get_member_list()}
+        for res in (folder, members["readme.txt"], members["subfolder"]):
+            assert not hasattr(res, "__dict__")
+            with self.assertRaises(AttributeError):
+                res.foo = 1
+            assert res.get_last_modified() == int(os.stat(res._file_path).st_mtime)
+            assert res.file_stat.st_mtime == res.get_last_modified()
+            assert res.file_stat.st_mode == os.stat(res._file_path).st_mode
+
+        file_res = members["readme.txt"]
+        assert file_res.get_content_length() == file_res.file_stat.st_size
+
+        # Subclasses without __slots__ still work as before
+        class _CustomResource(type(file_res)):
+            pass
+
+        res = _CustomResource("/readme.txt", environ, file_res._file_path)
+        res.foo = 1
+        assert res.get_content_length() == file_res.get_content_length()
+
+        # file_stat can be assigned, and is only refreshed on demand
+        res.file_stat = os.stat(members["data.json"]._file_path)
+        assert res.get_content_length() == members["data.json"].get_content_length()
+        res.file_stat = os.stat(res._file_path)
+        with open(res._file_path, "ab") as f:
+            f.write(b"more")
+        assert res.file_stat.st_size == res.get_content_length()
+        assert res.get_content_length() == file_res.get_content_length()
+        assert res.refresh_file_stat().st_size == res.get_content_length()
+        assert res.get_content_length() == file_res.get_content_length() + 4
+
+        with self.assertWarns(DeprecationWarning):
+            assert folder.fs_opts is provider.fs_opts
+
+    def testResourceCache(self):
+        """Resources are resolved once per request and invalidated on writes."""
+        app = self.app
+        resolved = []
+        get_resource_inst = FilesystemProvider.get_resource_inst
+
+        def _get_resource_inst(provider, path, environ):
+            resolved.append(path)
+            return get_resource_inst(provider, path, environ)
+
+        with mock.patch.object(
+            FilesystemProvider, "get_resource_inst", _get_resource_inst
+        ):
+            app.get("/readme.txt", status=200)
+            assert resolved == ["/readme.txt"]
+
+            resolved.clear()
+            app.put("/new.txt", params=b"data", status=201)
+            # create_empty_resource() returns a new instance
+            assert sorted(resolved) == ["/", "/new.txt", "/new.txt"]
+
+            resolved.clear()
+            app.request("/folder", method="MKCOL", status=201)
+            app.request("/folder", method="MKCOL", status=405)
+            assert resolved.count("/folder") == 2
+
+        # Write operations see the modified tree
+        app.request("/new.txt", method="DELETE", status=204)
+        app.get("/new.txt", status=404)
+        app.request("/folder", method="DELETE", status=204)
+        app.request("/folder", method="MKCOL", status=201)
+
+        provider = FilesystemProvider(self.root_path, fs_opts={})
+        provider.set_share_path("/")
+        environ = {"wsgidav.provider": provider, "wsgidav.config": {}}
+        res = provider.get_cached_resource_inst("/subfolder", environ)
+        assert provider.get_cached_resource_inst("/subfolder", environ) is res
+        assert provider.get_cached_resource_inst("/", environ) is not None
+        assert provider.get_cached_resource_inst("/other.txt", environ) is None
+        provider.invalidate_cached_resources("/subfolder/x.txt", environ)
+        assert set(environ["wsgidav.resource_cache"]) == {"/", "/other.txt"}
+
+    def testResourceCacheDeleteScales(self):
+        """Deleting a tree invalidates the request cache in linear time."""
+        entries = make_tree(
+            os.path.join(self.root_path, "tree"), depth=2, folders=5, files=10
+        )
+        invalidate = DAVProvider.invalidate_cached_resources
+        scanned = 0
+
+        def _invalidate(path, environ):
+            nonlocal scanned
+            scanned += len(environ.get("wsgidav.resource_cache") or ())
+            invalidate(path, environ)
+
+        with mock.patch.object(
+            DAVProvider, "invalidate_cached_resources", staticmethod(_invalidate)
+        ):
+            self.app.request("/tree", method="DELETE", status=204)
+        assert not os.path.exists(os.path.join(self.root_path, "tree"))
+        # Quadratic behavior would scan about entries**2 / 2 keys
+        assert scanned < 3 * entries, (scanned, entries)
+
+    def testFilesystemMemberList(self):
+        """Folder members are created by the provider and cached per request."""
+        from wsgidav.fs_dav_provider import FileResource
+
+        class _CustomFileResource(FileResource):
+            pass
+
+        class _CustomProvider(FilesystemProvider):
+            def _make_resource(self, path, environ, file_path, is_dir):
+                if is_dir:
+                    return super()._make_resource(path, environ, file_path, is_dir)
+                return _CustomFileResource(path, environ, file_path)
+
+        provider = _CustomProvider(self.root_path, fs_opts={})
+        provider.set_share_path("/")
+        environ = {"wsgidav.provider": provider, "wsgidav.config": {}}
+        readme = provider.get_cached_resource_inst("/readme.txt", environ)
+        assert type(readme) is _CustomFileResource
+        folder = provider.get_cached_resource_inst("/", environ)
+        count = provider._count_get_resource_inst
+        members = {m.name: m for m in folder.get_member_list()}
+        assert members["readme.txt"] is readme
+        assert type(members["data.json"]) is _CustomFileResource
+        assert (
+            provider.get_cached_resource_inst("/data.json", environ)
+            is (members["data.json"])
+        )
+        assert provider._count_get_resource_inst == count + len(members) - 1
+
+        # Custom path mapping: members are resolved by get_resource_inst()
+        class _MappingProvider(FilesystemProvider):
+            def get_resource_inst(self, path, environ):
+                self.resolved.append(path)
+                return super().get_resource_inst(path, environ)
+
+        provider = _MappingProvider(self.root_path, fs_opts={})
+        provider.set_share_path("/")
+        provider.resolved = []
+        environ = {"wsgidav.provider": provider, "wsgidav.config": {}}
+        folder = provider.get_resource_inst("/", environ)
+        members = folder.get_member_list()
+        assert sorted(provider.resolved[1:]) == sorted(m.path for m in members)
+
     def testFollowSymlinksRejectsTraversalWithoutSymlink(self):
         """Traversal outside root must fail, even when follow_symlinks is enabled."""
         outside_data = b"outside-root-secret"
@@ -11,6 +11,7 @@ Example:
 
 import multiprocessing
 import os
+import random
 import shutil
 import sys
 import time
@@ -75,6 +76,79 @@ def create_test_folder(name):
     return path
 
 
+#: Non-ASCII name parts used by make_tree(unicode_names=True)
+UNICODE_NAME_PARTS = ("äöü", "ß", "éè", "Ωπ", "日本語", "한국어", "😀")
+
+
+def make_tree(
+    root_path,
+    *,
+    depth=2,
+    folders=10,
+    files=10,
+    file_size=1024,
+    name_length=0,
+    unicode_names=False,
+    seed=0,
+):
+    """Create a synthetic folder tree and return the number of entries.
+
+    `root_path` is created and every folder up to `depth` levels below it
+    contains `folders` sub folders and `files` files, e.g. depth=2, folders=10,
+    files=10 creates 110 sub folders and 1110 files (1220 entries).
+
+    `file_size` is either a number of bytes, or a (min, max) tuple for random
+    sizes. Names are padded to `name_length` characters (if longer than the
+    default name) and contain non-ASCII characters if `unicode_names` is true.
+    """
+    rng = random.Random(seed)
+    if isinstance(file_size, int):
+        min_size = max_size = file_size
+    else:
+        min_size, max_size = file_size
+    data = b"*" * max_size
+    entries = 0
+
+    def _name(prefix, i, ext=""):
+        stem = f"{prefix}_{i:04}"
+        if unicode_names:
+            stem += "_" + UNICODE_NAME_PARTS[i % len(UNICODE_NAME_PARTS)]
+        if name_length > len(stem) + len(ext):
+            stem = stem.ljust(name_length - len(ext), "x")
+        return stem + ext
+
+    def _fill(folder_path, level):
+        nonlocal entries
+        os.mkdir(folder_path)
+        for i in range(files):
+            size = min_size if min_size == max_size else rng.randint(min_size, max_size)
+            with open(os.path.join(folder_path, _name("file", i, ".txt")), "wb") as f:
+                if size:
+                    f.write(data[:size])
+        entries += files
+        if level < depth:
+            for i in range(folders):
+                _fill(os.path.join(folder_path, _name("folder", i)), level + 1)
+            entries += folders
+
+    _fill(root_path, 0)
+    return entries
+
+
+def create_test_tree(name, *, depth=2, folders=10, files=10, file_size=1024, **kwargs):
+    """Create a generated folder tree in the temp folder and return its path.
+
+    See make_tree() for the arguments, e.g. depth=2, folders=10, files=10
+    creates 111 folders (including the root) and 1110 files.
+    """
+    path = os.path.join(gettempdir(), name)
+    shutil.rmtree(path, ignore_errors=True)
+    make_tree(
+        path, depth=depth, folders=folders, files=files, file_size=file_size, **kwargs
+    )
+    return path
+
+
 # ==============================================================================
 # run_wsgidav_server
 # ==============================================================================
@@ -0,0 +1,346 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""
+ASGI application, that serves a :class:`~wsgidav.wsgidav_app.WsgiDAVApp`.
+
+Usage::
+
+    from wsgidav.asgi_app import WsgiDAVAsgiApp
+
+    app = WsgiDAVAsgiApp(config)
+
+    # e.g. `uvicorn.run(app, interface="asgi3")`
+
+The middleware stack and the request handlers are executed by a bounded pool
+of worker threads (see option ``asgi.max_workers``), because providers are
+blocking.
+In contrast to a generic WSGI adapter, the event loop does the network I/O:
+
+- Request bodies up to ``asgi.buffer_body_size`` bytes are received *before*
+  a worker thread is assigned, larger (or chunked) bodies are streamed, i.e.
+  ``wsgi.input.read()`` waits for the next chunk from the client.
+- Response chunks are produced in the worker thread, but sent by the event
+  loop. The worker is released while a slow client is receiving data.
+
+So idle or slow clients do not occupy threads, and the number of threads
+stays bounded, no matter how many connections are open.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from wsgidav import util
+from wsgidav.wsgidav_app import WsgiDAVApp
+
+__docformat__ = "reStructuredText"
+
+_logger = util.get_module_logger(__name__)
+
+#: Collect response chunks up to this size, before they are passed to the loop
+RESPONSE_BUFFER_SIZE = 64 * 1024
+
+
+class ClientDisconnected(OSError):
+    """Raised by ``wsgi.input.read()``, if the client went away."""
+
+
+class _AsgiInputStream(io.RawIOBase):
+    """File-like ``wsgi.input``, that receives body chunks from the event loop.
+
+    This is used in a worker thread.
+    """
+
+    def __init__(self, receive, loop):
+        super().__init__()
+        self._receive = receive
+        self._loop = loop
+        self._buffer = bytearray()
+        self._more_body = True
+
+    def readable(self):
+        return True
+
+    def _receive_chunk(self):
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        if message["type"] == "http.disconnect":
+            self._more_body = False
+            raise ClientDisconnected("Client disconnected while sending the body")
+        self._buffer += message.get("body", b"")
+        self._more_body = message.get("more_body", False)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while self._more_body:
+                self._receive_chunk()
+            size = len(self._buffer)
+        else:
+            while self._more_body and len(self._buffer) < size:
+                self._receive_chunk()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+class _ResponseState:
+    """Collects the `start_response()` arguments of one request."""
+
+    __slots__ = ("status", "headers", "headers_sent", "pending")
+
+    def __init__(self):
+        self.status = None
+        self.headers = None
+        self.headers_sent = False
+        #: Chunks passed to the `write()` callable
+        self.pending = []
+
+    def start_response(self, status, response_headers, exc_info=None):
+        if exc_info:
+            try:
+                if self.headers_sent:
+                    raise exc_info[1].with_traceback(exc_info[2])
+            finally:
+                exc_info = None
+        elif self.status is not None:
+            raise RuntimeError("start_response() was already called")
+        self.status = status
+        self.headers = response_headers
+        return self.write
+
+    def write(self, data):
+        self.pending.append(data)
+
+
+# ========================================================================
+# WsgiDAVAsgiApp
+# ========================================================================
+class WsgiDAVAsgiApp:
+    """ASGI 3 application, that runs WsgiDAV on a bounded thread pool.
+
+    Args:
+        config (dict): WsgiDAV configuration (passed to `WsgiDAVApp`).
+        wsgidav_app (WsgiDAVApp): optional instance, that is used instead of
+            creating a new one.
+    """
+
+    def __init__(self, config, *, wsgidav_app=None):
+        if wsgidav_app is None:
+            wsgidav_app = WsgiDAVApp(config)
+        self.wsgidav_app = wsgidav_app
+        self.config = wsgidav_app.config
+
+        asgi_opts = util.get_dict_value(self.config, "asgi", as_dict=True)
+        self.max_workers = int(asgi_opts.get("max_workers", 32))
+        self.buffer_body_size = int(asgi_opts.get("buffer_body_size", 64 * 1024))
+        self._executor = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(max_workers={self.max_workers})"
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="wsgidav-asgi"
+            )
+        return self._executor
+
+    def shutdown(self):
+        """Stop the worker threads (called on ASGI lifespan shutdown)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __call__(self, scope, receive, send):
+        scope_type = scope["type"]
+        if scope_type == "http":
+            await self._handle_http(scope, receive, send)
+        elif scope_type == "lifespan":
+            await self._handle_lifespan(receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type {scope_type!r}")
+
+    async def _handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def make_environ(self, scope, wsgi_input):
+        """Return a WSGI environment (PEP 3333) for an ASGI HTTP scope."""
+        # WSGI strings are 'bytes-as-latin-1', WsgiDAVApp will re-encode
+        script_name = scope.get("root_path", "").encode("utf-8").decode("latin-1")
+        path_info = scope["path"].encode("utf-8").decode("latin-1")
+        if script_name and path_info.startswith(script_name):
+            path_info = path_info[len(script_name) :]
+
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": script_name,
+            "PATH_INFO": path_info,
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": wsgi_input,
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "asgi.scope": scope,
+        }
+        client = scope.get("client")
+        if client:
+            environ["REMOTE_ADDR"] = client[0]
+            environ["REMOTE_PORT"] = str(client[1])
+
+        for name, value in scope.get("headers", ()):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+                key = name
+            else:
+                key = "HTTP_" + name
+            if key in environ:
+                # Repeated headers are combined (RFC 9110), but cookies are
+                # separated by '; ' (RFC 6265)
+                sep = "; " if key == "HTTP_COOKIE" else ","
+                value = environ[key] + sep + value
+            environ[key] = value
+        return environ
+
+    async def _read_body(self, scope, receive):
+        """Return a `wsgi.input` stream.
+
+        Small bodies are received completely, so the request does not block
+        a worker thread while the client is sending.
+        """
+        content_length = None
+        for name, value in scope.get("headers", ()):
+            if name.lower() == b"content-length":
+                try:
+                    content_length = int(value)
+                except ValueError:
+                    pass
+                break
+        if content_length is None or content_length > self.buffer_body_size:
+            return _AsgiInputStream(receive, asyncio.get_running_loop())
+
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnected("Client disconnected while sending the body")
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        return io.BytesIO(bytes(body))
+
+    def _start_app(self, environ, state):
+        """Call the WSGI app and return (app_iter, iterator, chunks, done).
+
+        Runs in a worker thread.
+        WSGI apps may call `start_response()` lazily, when the first chunk is
+        produced, so we already collect the first chunks here.
+        """
+        app_iter = self.wsgidav_app(environ, state.start_response)
+        try:
+            it = iter(app_iter)
+            chunks, done = self._next_chunks(it, state)
+            if state.status is None:
+                raise RuntimeError("WSGI application did not call start_response()")
+        except BaseException:
+            self._close_app_iter(app_iter)
+            raise
+        return app_iter, it, chunks, done
+
+    @staticmethod
+    def _next_chunks(it, state):
+        """Return (chunks, done), collecting up to `RESPONSE_BUFFER_SIZE` bytes.
+
+        Runs in a worker thread.
+        """
+        chunks = state.pending
+        state.pending = []
+        size = sum(len(c) for c in chunks)
+        for chunk in it:
+            if state.pending:
+                # The legacy `write()` callable was used
+                chunks.extend(state.pending)
+                size += sum(len(c) for c in state.pending)
+                state.pending = []
+            if chunk:
+                chunks.append(chunk)
+                size += len(chunk)
+            if size >= RESPONSE_BUFFER_SIZE and state.status is not None:
+                return chunks, False
+        chunks.extend(state.pending)
+        state.pending = []
+        return chunks, True
+
+    @staticmethod
+    def _close_app_iter(app_iter):
+        if hasattr(app_iter, "close"):
+            app_iter.close()
+
+    async def _handle_http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        try:
+            wsgi_input = await self._read_body(scope, receive)
+        except ClientDisconnected:
+            _logger.debug("Client disconnected while sending the request body")
+            return
+
+        environ = self.make_environ(scope, wsgi_input)
+        state = _ResponseState()
+        executor = self.executor
+
+        app_iter, it, chunks, done = await loop.run_in_executor(
+            executor, self._start_app, environ, state
+        )
+        try:
+            status_code = int(state.status.split(" ", 1)[0])
+            headers = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in state.headers
+            ]
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": status_code,
+                    "headers": headers,
+                }
+            )
+            state.headers_sent = True
+            while True:
+                if chunks:
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": b"".join(chunks),
+                            "more_body": True,
+                        }
+                    )
+                if done:
+                    break
+                chunks, done = await loop.run_in_executor(
+                    executor, self._next_chunks, it, state
+                )
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await loop.run_in_executor(executor, self._close_app_iter, app_iter)
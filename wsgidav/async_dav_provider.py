@@ -0,0 +1,710 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Asynchronous DAV provider API and adapters.
+
+**AsyncDAVProvider, AsyncDAVCollection, AsyncDAVNonCollection**
+
+Counterparts of :class:`~wsgidav.dav_provider.DAVProvider`,
+:class:`~wsgidav.dav_provider.DAVCollection`, and
+:class:`~wsgidav.dav_provider.DAVNonCollection` for backends that use
+``asyncio`` (e.g. cloud storage or database clients).
+
+Methods that may access the backend are coroutines and have the same names and
+arguments as their synchronous counterparts, for example::
+
+    res = await provider.get_resource_inst(path, environ)
+    if res and res.is_collection:
+        members = await res.get_member_list()
+
+Cheap capability checks (``support_etag()``, ``support_ranges()``,
+``support_recursive_move()``, ...) are plain methods.
+Dead properties and locks are still handled by the (synchronous) property and
+lock manager.
+
+**Adapters**
+
+:class:`AsyncToSyncProvider`
+    Publishes an AsyncDAVProvider as regular DAVProvider. The coroutines are
+    executed by an event loop in a dedicated thread.
+    When a collection is listed (e.g. PROPFIND with Depth 1), all members are
+    requested concurrently and their live properties are gathered in a single
+    round-trip.
+
+    ``WsgiDAVApp`` uses this adapter automatically, if an ``AsyncDAVProvider``
+    instance is passed in ``provider_mapping``.
+
+:class:`SyncToAsyncProvider`
+    Lets asynchronous code use a regular DAVProvider. Blocking calls are
+    executed with ``asyncio.to_thread()``.
+"""
+
+import asyncio
+import inspect
+import io
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from wsgidav import util
+from wsgidav.dav_error import HTTP_FORBIDDEN, DAVError
+from wsgidav.dav_provider import DAVCollection, DAVNonCollection, DAVProvider
+
+__docformat__ = "reStructuredText"
+
+_logger = util.get_module_logger(__name__)
+
+#: Live property getters that are gathered concurrently by AsyncToSyncProvider
+LIVE_PROP_GETTERS = (
+    "get_content_length",
+    "get_content_type",
+    "get_creation_date",
+    "get_display_name",
+    "get_etag",
+    "get_last_modified",
+)
+
+
+# ========================================================================
+# _AsyncDAVResource
+# ========================================================================
+class _AsyncDAVResource(ABC):  # noqa: B024
+    """Represents a single existing DAV resource instance (async variant).
+
+    See :class:`~wsgidav.dav_provider._DAVResource`.
+    """
+
+    def __init__(
+        self, path: str, is_collection: bool, environ: dict, *, provider
+    ) -> None:
+        assert util.is_str(path)
+        assert path == "" or path.startswith("/")
+        self.provider: AsyncDAVProvider = provider
+        self.path: str = path
+        self.is_collection: bool = is_collection
+        self.environ: dict = environ
+        self.name: str = util.get_uri_name(self.path)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    async def get_content_length(self) -> Optional[int]:
+        return None
+
+    async def get_content_type(self) -> Optional[str]:
+        return None
+
+    async def get_creation_date(self) -> Optional[float]:
+        return None
+
+    async def get_display_name(self) -> str:
+        return self.name
+
+    async def get_etag(self):
+        return None
+
+    async def get_last_modified(self) -> Optional[float]:
+        return None
+
+    async def get_used_bytes(self) -> Optional[int]:
+        return None
+
+    async def get_available_bytes(self) -> Optional[int]:
+        return None
+
+    async def set_last_modified(self, dest_path, time_stamp, *, dry_run):
+        raise NotImplementedError
+
+    def get_display_info(self):
+        return None
+
+    def support_etag(self):
+        return False
+
+    def support_ranges(self):
+        return False
+
+    def support_recursive_delete(self):
+        return False
+
+    def support_recursive_move(self, dest_path):
+        return False
+
+    async def delete(self):
+        raise DAVError(HTTP_FORBIDDEN)
+
+    async def copy_move_single(self, dest_path, *, is_move):
+        raise DAVError(HTTP_FORBIDDEN)
+
+    async def move_recursive(self, dest_path):
+        raise DAVError(HTTP_FORBIDDEN)
+
+
+class AsyncDAVNonCollection(_AsyncDAVResource):
+    """A resource with content (like a 'file').
+
+    See :class:`~wsgidav.dav_provider.DAVNonCollection`.
+    """
+
+    def __init__(self, path: str, environ: dict, *, provider) -> None:
+        super().__init__(path, False, environ, provider=provider)
+
+    @abstractmethod
+    async def get_content_length(self):
+        raise NotImplementedError
+
+    async def get_content_type(self):
+        return util.guess_mime_type(self.path, self.environ["wsgidav.config"])
+
+    @abstractmethod
+    async def get_content(self):
+        """Open content as a stream for reading.
+
+        Return either `bytes`, a file-like object, or an object with an
+        ``async read(size)`` method (and optionally ``async seek(pos)`` and
+        ``close()``).
+        """
+        raise NotImplementedError
+
+    async def begin_write(self, *, content_type=None):
+        """Open content as a stream for writing.
+
+        Return a file-like object, or an object with ``async write(data)`` and
+        ``async close()`` methods.
+        """
+        raise DAVError(HTTP_FORBIDDEN)
+
+    async def end_write(self, *, with_errors):
+        pass
+
+
+class AsyncDAVCollection(_AsyncDAVResource):
+    """A resource with members (like a 'folder').
+
+    See :class:`~wsgidav.dav_provider.DAVCollection`.
+    """
+
+    def __init__(self, path: str, environ: dict, *, provider) -> None:
+        super().__init__(path, True, environ, provider=provider)
+
+    def get_display_info(self):
+        return {"type": "Directory"}
+
+    @abstractmethod
+    async def get_member_names(self):
+        raise NotImplementedError
+
+    async def get_member(self, name):
+        return await self.provider.get_resource_inst(
+            util.join_uri(self.path, name), self.environ
+        )
+
+    async def get_member_list(self):
+        """Return a list of direct members.
+
+        This default implementation requests all members concurrently.
+        """
+        names = await self.get_member_names()
+        members = await asyncio.gather(*(self.get_member(name) for name in names))
+        assert all(m is not None for m in members)
+        return members
+
+    async def create_empty_resource(self, name):
+        raise DAVError(HTTP_FORBIDDEN)
+
+    async def create_collection(self, name):
+        raise DAVError(HTTP_FORBIDDEN)
+
+
+# ========================================================================
+# AsyncDAVProvider
+# ========================================================================
+class AsyncDAVProvider(ABC):
+    """Abstract base class for asynchronous DAV resource providers.
+
+    See :class:`~wsgidav.dav_provider.DAVProvider`.
+    """
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+    def is_readonly(self):
+        return False
+
+    @abstractmethod
+    async def get_resource_inst(self, path: str, environ: dict):
+        """Return a _AsyncDAVResource object for path (None, if not found)."""
+        raise NotImplementedError
+
+    async def exists(self, path: str, environ: dict):
+        return await self.get_resource_inst(path, environ) is not None
+
+    async def is_collection(self, path: str, environ: dict):
+        res = await self.get_resource_inst(path, environ)
+        return res and res.is_collection
+
+
+# ========================================================================
+# AsyncToSyncProvider
+# ========================================================================
+async def _gather_live_props(async_res):
+    """Return {getter_name: value_or_exception, ...} for LIVE_PROP_GETTERS."""
+    values = await asyncio.gather(
+        *(getattr(async_res, name)() for name in LIVE_PROP_GETTERS),
+        return_exceptions=True,
+    )
+    return dict(zip(LIVE_PROP_GETTERS, values))
+
+
+class _SyncReadStream(io.RawIOBase):
+    """File-like wrapper for an async read stream."""
+
+    def __init__(self, adapter, stream):
+        super().__init__()
+        self._adapter = adapter
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return hasattr(self._stream, "seek")
+
+    def read(self, size=-1):
+        return self._adapter.run(self._stream.read(size))
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        return self._adapter.run(self._stream.seek(pos, whence))
+
+    def close(self):
+        if not self.closed:
+            res = getattr(self._stream, "close", None)
+            if res is not None:
+                res = res()
+                if inspect.isawaitable(res):
+                    self._adapter.run(res)
+        super().close()
+
+
+class _SyncWriteStream:
+    """File-like wrapper for an async write stream."""
+
+    def __init__(self, adapter, stream):
+        self._adapter = adapter
+        self._stream = stream
+
+    def write(self, data):
+        return self._adapter.run(self._stream.write(data))
+
+    def close(self):
+        return self._adapter.run(self._stream.close())
+
+
+class _SyncResourceMixin:
+    """Implements the synchronous _DAVResource API for an async resource."""
+
+    def _init_adapter(self, adapter, async_res):
+        self.adapter = adapter
+        self.async_res = async_res
+        self._live_props = None
+
+    def _run(self, coro):
+        return self.adapter.run(coro)
+
+    def _wrap(self, async_res):
+        return self.adapter.wrap_resource(async_res, self.environ)
+
+    def _get_live_prop(self, getter_name):
+        # All live properties are fetched concurrently on first access
+        if self._live_props is None:
+            self._live_props = self._run(_gather_live_props(self.async_res))
+        value = self._live_props[getter_name]
+        if isinstance(value, BaseException):
+            raise value
+        return value
+
+    def invalidate(self):
+        """Forget cached live properties (e.g. after a write operation)."""
+        self._live_props = None
+
+    def get_content_length(self):
+        return self._get_live_prop("get_content_length")
+
+    def get_content_type(self):
+        return self._get_live_prop("get_content_type")
+
+    def get_creation_date(self):
+        return self._get_live_prop("get_creation_date")
+
+    def get_display_name(self):
+        return self._get_live_prop("get_display_name")
+
+    def get_etag(self):
+        return self._get_live_prop("get_etag")
+
+    def get_last_modified(self):
+        return self._get_live_prop("get_last_modified")
+
+    def get_used_bytes(self):
+        return self._run(self.async_res.get_used_bytes())
+
+    def get_available_bytes(self):
+        return self._run(self.async_res.get_available_bytes())
+
+    def get_display_info(self):
+        info = self.async_res.get_display_info()
+        if info is None:
+            return super().get_display_info()
+        return info
+
+    def set_last_modified(self, dest_path, time_stamp, *, dry_run):
+        self.invalidate()
+        return self._run(
+            self.async_res.set_last_modified(dest_path, time_stamp, dry_run=dry_run)
+        )
+
+    def support_etag(self):
+        return self.async_res.support_etag()
+
+    def support_recursive_delete(self):
+        return self.async_res.support_recursive_delete()
+
+    def support_recursive_move(self, dest_path):
+        return self.async_res.support_recursive_move(dest_path)
+
+    def delete(self):
+        self._run(self.async_res.delete())
+        self.remove_all_properties(recursive=True)
+        self.remove_all_locks(recursive=True)
+
+    def _move_dead_properties(self, dest_path, *, is_move, with_children):
+        prop_man = self.provider.prop_manager
+        if prop_man:
+            dest_res = self.provider.get_resource_inst(dest_path, self.environ)
+            if is_move:
+                prop_man.move_properties(
+                    self.get_ref_url(),
+                    dest_res.get_ref_url(),
+                    with_children=with_children,
+                    environ=self.environ,
+                )
+            else:
+                prop_man.copy_properties(
+                    self.get_ref_url(), dest_res.get_ref_url(), self.environ
+                )
+
+    def copy_move_single(self, dest_path, *, is_move):
+        self._run(self.async_res.copy_move_single(dest_path, is_move=is_move))
+        self._move_dead_properties(dest_path, is_move=is_move, with_children=False)
+
+    def move_recursive(self, dest_path):
+        self._run(self.async_res.move_recursive(dest_path))
+        self._move_dead_properties(dest_path, is_move=True, with_children=True)
+
+
+class _SyncNonCollection(_SyncResourceMixin, DAVNonCollection):
+    def __init__(self, adapter, async_res, environ):
+        super().__init__(async_res.path, environ)
+        self._init_adapter(adapter, async_res)
+
+    def support_ranges(self):
+        return self.async_res.support_ranges()
+
+    def get_content(self):
+        stream = self._run(self.async_res.get_content())
+        if isinstance(stream, bytes):
+            return io.BytesIO(stream)
+        elif inspect.iscoroutinefunction(getattr(stream, "read", None)):
+            return _SyncReadStream(self.adapter, stream)
+        return stream
+
+    def begin_write(self, *, content_type=None):
+        self.invalidate()
+        stream = self._run(self.async_res.begin_write(content_type=content_type))
+        if inspect.iscoroutinefunction(getattr(stream, "write", None)):
+            return _SyncWriteStream(self.adapter, stream)
+        return stream
+
+    def end_write(self, *, with_errors):
+        self.invalidate()
+        return self._run(self.async_res.end_write(with_errors=with_errors))
+
+
+class _SyncCollection(_SyncResourceMixin, DAVCollection):
+    def __init__(self, adapter, async_res, environ):
+        super().__init__(async_res.path, environ)
+        self._init_adapter(adapter, async_res)
+
+    def get_member_names(self):
+        return self._run(self.async_res.get_member_names())
+
+    def get_member(self, name):
+        return self._wrap(self._run(self.async_res.get_member(name)))
+
+    def get_member_list(self):
+        async def _get_members():
+            members = await self.async_res.get_member_list()
+            live_props = await asyncio.gather(*map(_gather_live_props, members))
+            return members, live_props
+
+        members, live_props = self._run(_get_members())
+        res = []
+        for member, props in zip(members, live_props):
+            member = self._wrap(member)
+            member._live_props = props
+            res.append(member)
+        return res
+
+    def create_empty_resource(self, name):
+        return self._wrap(self._run(self.async_res.create_empty_resource(name)))
+
+    def create_collection(self, name):
+        return self._wrap(self._run(self.async_res.create_collection(name)))
+
+
+class AsyncToSyncProvider(DAVProvider):
+    """Publish an :class:`AsyncDAVProvider` as synchronous DAVProvider.
+
+    The coroutines of the async provider are executed by an event loop that
+    runs in a dedicated daemon thread (one per adapter), so all requests share
+    the same loop (and connection pools bound to it).
+    """
+
+    def __init__(self, async_provider: AsyncDAVProvider):
+        super().__init__()
+        if not isinstance(async_provider, AsyncDAVProvider):
+            raise ValueError(f"Expected an AsyncDAVProvider: {async_provider!r}")
+        self.async_provider = async_provider
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.async_provider!r})"
+
+    def is_readonly(self):
+        return self.async_provider.is_readonly()
+
+    def _get_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=loop.run_forever,
+                    name=f"wsgidav-async-{self.async_provider}",
+                    daemon=True,
+                )
+                self._loop_thread.start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the adapter's loop and return the result."""
+        loop = self._get_loop()
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("Synchronous call from inside the provider loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def close(self):
+        """Stop the event loop thread."""
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop_thread.join()
+                self._loop.close()
+                self._loop = self._loop_thread = None
+
+    def wrap_resource(self, async_res, environ):
+        """Return a synchronous _DAVResource for an async resource (or None)."""
+        if async_res is None:
+            return None
+        if async_res.is_collection:
+            return _SyncCollection(self, async_res, environ)
+        return _SyncNonCollection(self, async_res, environ)
+
+    def get_resource_inst(self, path: str, environ: dict):
+        self._count_get_resource_inst += 1
+        async_res = self.run(self.async_provider.get_resource_inst(path, environ))
+        return self.wrap_resource(async_res, environ)
+
+    def exists(self, path: str, environ: dict):
+        return self.run(self.async_provider.exists(path, environ))
+
+    def is_collection(self, path: str, environ: dict):
+        return self.run(self.async_provider.is_collection(path, environ))
+
+
+# ========================================================================
+# SyncToAsyncProvider
+# ========================================================================
+class _AsyncReadStream:
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def read(self, size=-1):
+        return await asyncio.to_thread(self._stream.read, size)
+
+    async def seek(self, pos, whence=io.SEEK_SET):
+        return await asyncio.to_thread(self._stream.seek, pos, whence)
+
+    async def close(self):
+        await asyncio.to_thread(self._stream.close)
+
+
+class _AsyncWriteStream:
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def write(self, data):
+        return await asyncio.to_thread(self._stream.write, data)
+
+    async def close(self):
+        await asyncio.to_thread(self._stream.close)
+
+
+class _AsyncResourceAdapter(_AsyncDAVResource):
+    """Implements the async resource API for a synchronous _DAVResource."""
+
+    def __init__(self, provider, res):
+        super().__init__(res.path, res.is_collection, res.environ, provider=provider)
+        self.res = res
+
+    def _wrap(self, res):
+        return None if res is None else _AsyncResourceAdapter(self.provider, res)
+
+    async def get_content_length(self):
+        return await asyncio.to_thread(self.res.get_content_length)
+
+    async def get_content_type(self):
+        return await asyncio.to_thread(self.res.get_content_type)
+
+    async def get_creation_date(self):
+        return await asyncio.to_thread(self.res.get_creation_date)
+
+    async def get_display_name(self):
+        return await asyncio.to_thread(self.res.get_display_name)
+
+    async def get_etag(self):
+        return await asyncio.to_thread(self.res.get_etag)
+
+    async def get_last_modified(self):
+        return await asyncio.to_thread(self.res.get_last_modified)
+
+    async def get_used_bytes(self):
+        return await asyncio.to_thread(self.res.get_used_bytes)
+
+    async def get_available_bytes(self):
+        return await asyncio.to_thread(self.res.get_available_bytes)
+
+    async def set_last_modified(self, dest_path, time_stamp, *, dry_run):
+        return await asyncio.to_thread(
+            self.res.set_last_modified, dest_path, time_stamp, dry_run=dry_run
+        )
+
+    def get_display_info(self):
+        return self.res.get_display_info()
+
+    def support_etag(self):
+        return self.res.support_etag()
+
+    def support_ranges(self):
+        return not self.is_collection and self.res.support_ranges()
+
+    def support_recursive_delete(self):
+        return self.res.support_recursive_delete()
+
+    def support_recursive_move(self, dest_path):
+        return self.res.support_recursive_move(dest_path)
+
+    async def delete(self):
+        return await asyncio.to_thread(self.res.delete)
+
+    async def copy_move_single(self, dest_path, *, is_move):
+        return await asyncio.to_thread(
+            self.res.copy_move_single, dest_path, is_move=is_move
+        )
+
+    async def move_recursive(self, dest_path):
+        return await asyncio.to_thread(self.res.move_recursive, dest_path)
+
+    # Non-collections
+
+    async def get_content(self):
+        stream = await asyncio.to_thread(self.res.get_content)
+        return _AsyncReadStream(stream)
+
+    async def begin_write(self, *, content_type=None):
+        stream = await asyncio.to_thread(
+            self.res.begin_write, content_type=content_type
+        )
+        return _AsyncWriteStream(stream)
+
+    async def end_write(self, *, with_errors):
+        return await asyncio.to_thread(self.res.end_write, with_errors=with_errors)
+
+    # Collections
+
+    async def get_member_names(self):
+        return await asyncio.to_thread(self.res.get_member_names)
+
+    async def get_member(self, name):
+        return self._wrap(await asyncio.to_thread(self.res.get_member, name))
+
+    async def get_member_list(self):
+        members = await asyncio.to_thread(self.res.get_member_list)
+        return [self._wrap(m) for m in members]
+
+    async def create_empty_resource(self, name):
+        return self._wrap(await asyncio.to_thread(self.res.create_empty_resource, name))
+
+    async def create_collection(self, name):
+        return self._wrap(await asyncio.to_thread(self.res.create_collection, name))
+
+
+class SyncToAsyncProvider(AsyncDAVProvider):
+    """Use a synchronous DAVProvider from asynchronous code.
+
+    Blocking calls are executed in worker threads (``asyncio.to_thread()``).
+    Note that `environ` must contain ``wsgidav.config``, like for every
+    DAVProvider.
+    """
+
+    def __init__(self, provider: DAVProvider):
+        if not isinstance(provider, DAVProvider):
+            raise ValueError(f"Expected a DAVProvider: {provider!r}")
+        self.provider = provider
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.provider!r})"
+
+    def is_readonly(self):
+        return self.provider.is_readonly()
+
+    def _environ(self, environ):
+        # Resources expect their provider in the environment
+        if environ.get("wsgidav.provider") is not self.provider:
+            environ = {**environ, "wsgidav.provider": self.provider}
+        return environ
+
+    async def get_resource_inst(self, path: str, environ: dict):
+        res = await asyncio.to_thread(
+            self.provider.get_resource_inst, path, self._environ(environ)
+        )
+        return None if res is None else _AsyncResourceAdapter(self, res)
+
+    async def exists(self, path: str, environ: dict):
+        return await asyncio.to_thread(
+            self.provider.exists, path, self._environ(environ)
+        )
+
+    async def is_collection(self, path: str, environ: dict):
+        return await asyncio.to_thread(
+            self.provider.is_collection, path, self._environ(environ)
+        )
@@ -84,6 +84,7 @@ import sys
 import time
 import traceback
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from urllib.parse import quote, unquote
 
@@ -168,8 +169,14 @@ class _DAVResource(ABC):
     not supported.
 
     See also DAVProvider.get_resource_inst().
+
+    The base classes define ``__slots__``, so subclasses may do the same to
+    save memory in large listings (otherwise instances get a ``__dict__`` as
+    usual).
     """
 
+    __slots__ = ("provider", "path", "is_collection", "environ", "name")
+
     def __init__(self, path: str, is_collection: bool, environ: dict):
         assert util.is_str(path)
         assert path == "" or path.startswith("/")
@@ -689,7 +696,7 @@ class _DAVResource(ABC):
                 #
                 #                lockRoot = self.get_href(self.provider.ref_url_to_path(lock["root"]))
                 lockPath = self.provider.ref_url_to_path(lock["root"])
-                lockRes = self.provider.get_resource_inst(lockPath, self.environ)
+                lockRes = self.provider.get_cached_resource_inst(lockPath, self.environ)
                 # FIXME: test for None
                 lockHref = lockRes.get_href()
 
@@ -1225,6 +1232,8 @@ class DAVNonCollection(_DAVResource):
     See also _DAVResource
     """
 
+    __slots__ = ()
+
     def __init__(self, path: str, environ: dict):
         super().__init__(path, False, environ)
 
@@ -1328,6 +1337,8 @@ class DAVCollection(_DAVResource):
     See also _DAVResource
     """
 
+    __slots__ = ()
+
     def __init__(self, path: str, environ: dict) -> None:
         super().__init__(path, True, environ)
 
@@ -1519,6 +1530,10 @@ class DAVProvider(ABC):
         self._count_get_resource_inst = 0
         self._count_get_resource_inst_init = 0
 
+        #: Number of threads that evaluate PROPFIND properties (0: serial)
+        self.propfind_workers = 0
+        self._propfind_executor = None
+
         # self.caseSensitiveUrls = True
 
     def __repr__(self):
@@ -1564,6 +1579,31 @@ class DAVProvider(ABC):
             )
         self.prop_manager = prop_manager
 
+    def set_propfind_workers(self, count):
+        """Evaluate the properties of PROPFIND responses with `count` threads.
+
+        This is useful for providers that access remote storage, where the
+        properties of every resource need a separate round-trip.
+        The resources' property methods must be thread-safe in this case.
+        Pass 0 to evaluate the resources one after another (default).
+        """
+        count = int(count)
+        if count < 0:
+            raise ValueError(f"Invalid propfind_workers: {count}")
+        if self._propfind_executor is not None:
+            self._propfind_executor.shutdown(wait=False)
+            self._propfind_executor = None
+        self.propfind_workers = count
+        if count > 0:
+            # (Threads are started on demand)
+            self._propfind_executor = ThreadPoolExecutor(
+                max_workers=count, thread_name_prefix="wsgidav-propfind"
+            )
+
+    def get_propfind_executor(self):
+        """Return an executor for PROPFIND property evaluation (or None)."""
+        return self._propfind_executor
+
     def ref_url_to_path(self, ref_url):
         """Convert a refUrl to a path, by stripping the share prefix.
 
@@ -1590,6 +1630,53 @@ class DAVProvider(ABC):
         """
         raise NotImplementedError
 
+    def get_cached_resource_inst(self, path: str, environ: dict):
+        """Return get_resource_inst(path, environ), but resolve a path only once
+        per request.
+
+        The results (including None for unmapped paths) are stored in a
+        request-scoped identity map in ``environ["wsgidav.resource_cache"]``,
+        so the request handlers and middlewares share the same instances.
+        Code that modifies resources must call
+        :meth:`invalidate_cached_resources` afterwards.
+        """
+        cache = self._get_resource_cache(environ)
+        if cache is None:
+            return self.get_resource_inst(path, environ)
+        try:
+            return cache[path]
+        except KeyError:
+            pass
+        res = cache[path] = self.get_resource_inst(path, environ)
+        return res
+
+    def _get_resource_cache(self, environ: dict):
+        """Return the request-scoped {path: resource} dict (or None).
+
+        None is returned, if `environ` belongs to a request for another provider.
+        """
+        if environ.get("wsgidav.provider") is not self:
+            return None
+        cache = environ.get("wsgidav.resource_cache")
+        if cache is None:
+            cache = environ["wsgidav.resource_cache"] = {}
+        return cache
+
+    @staticmethod
+    def invalidate_cached_resources(path: str, environ: dict):
+        """Remove <path>, its descendants, and its parent from the request cache.
+
+        See :meth:`get_cached_resource_inst`.
+        """
+        cache = environ.get("wsgidav.resource_cache")
+        if not cache:
+            return
+        path = path or "/"
+        parent = (util.get_uri_parent(path) or "").rstrip("/")
+        for key in list(cache):
+            if key.rstrip("/") == parent or util.is_equal_or_child_uri(path, key):
+                del cache[key]
+
     def exists(self, path: str, environ: dict):
         """Return True, if path maps to an existing resource.
 
@@ -1598,7 +1685,7 @@ class DAVProvider(ABC):
 
         This method SHOULD be overridden by a more efficient implementation.
         """
-        return self.get_resource_inst(path, environ) is not None
+        return self.get_cached_resource_inst(path, environ) is not None
 
     def is_collection(self, path: str, environ: dict):
         """Return True, if path maps to an existing collection resource.
@@ -1606,7 +1693,7 @@ class DAVProvider(ABC):
         This method should only be used, if no other information is queried
         for <path>. Otherwise a _DAVResource should be created first.
         """
-        res = self.get_resource_inst(path, environ)
+        res = self.get_cached_resource_inst(path, environ)
         return res and res.is_collection
 
     def custom_request_handler(self, environ, start_response, default_handler):
@@ -26,6 +26,19 @@ Digest Authentication
 See https://en.wikipedia.org/wiki/Digest_access_authentication
 
 
+Authentication Cache
+--------------------
+
+Verifying a password may be expensive (e.g. bcrypt hashes in htpasswd files, or
+a PAM stack), but WebDAV clients re-send basic credentials with every request.
+If ``http_authenticator.auth_cache.enable`` is set, `HTTPAuthenticator`
+remembers successful basic authentications in ``dc.auth_cache`` (an
+:class:`AuthCache` instance), so a repeated credential is verified from memory
+until it expires.
+A domain controller (or the application) can call
+``dc.auth_cache.invalidate(user_name)`` when a user's password changes.
+
+
 Permissions and Roles
 ---------------------
 
@@ -37,9 +50,13 @@ TODO: Work In Progress / Subject to change
 
 """
 
+import os
 import sys
+import threading
+import time
 from abc import ABC, abstractmethod
-from hashlib import md5
+from collections import OrderedDict
+from hashlib import blake2b, md5
 
 from wsgidav import util
 
@@ -48,6 +65,102 @@ __docformat__ = "reStructuredText"
 logger = util.get_module_logger(__name__)
 
 
+class AuthCache:
+    """Bounded, thread-safe cache of successful basic authentications.
+
+    Entries are keyed by a salted hash of (realm, user_name, password), so
+    plain text passwords are never stored. The salt is generated per instance,
+    so keys are not valid across processes or restarts.
+
+    Each entry also stores the roles and permissions that the domain controller
+    set in the environment, so they can be restored on a cache hit.
+
+    Args:
+        ttl (float): seconds until an entry expires
+        max_size (int): number of entries, least recently used entries are
+            evicted first
+    """
+
+    def __init__(self, *, ttl=300, max_size=1000):
+        assert ttl > 0 and max_size > 0
+        self.ttl = ttl
+        self.max_size = max_size
+        self._salt = os.urandom(16)
+        self._lock = threading.Lock()
+        #: {key: (expire, realm, user_name, roles, permissions)}
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(size={len(self._entries)}, ttl={self.ttl})"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, realm, user_name, password):
+        data = "\0".join((realm or "", user_name, password))
+        return blake2b(util.to_bytes(data), key=self._salt, digest_size=32).digest()
+
+    def get(self, realm, user_name, password, environ):
+        """Return True, if the credentials were recently verified.
+
+        On a hit, the cached roles and permissions are copied to `environ`.
+        """
+        key = self._key(realm, user_name, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+        environ["wsgidav.auth.roles"] = entry[3]
+        environ["wsgidav.auth.permissions"] = entry[4]
+        return True
+
+    def add(self, realm, user_name, password, environ):
+        """Remember successful credentials and the roles/permissions in `environ`."""
+        key = self._key(realm, user_name, password)
+        entry = (
+            time.monotonic() + self.ttl,
+            realm,
+            user_name,
+            environ.get("wsgidav.auth.roles"),
+            environ.get("wsgidav.auth.permissions"),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_name=None, *, realm=None):
+        """Remove entries for a user and/or realm (all entries, if both are None).
+
+        Returns:
+            int: number of removed entries
+        """
+        with self._lock:
+            if user_name is None and realm is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            keys = [
+                k
+                for k, e in self._entries.items()
+                if (user_name is None or e[2] == user_name)
+                and (realm is None or e[1] == realm)
+            ]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+
 class BaseDomainController(ABC):
     #: A domain controller MAY list these values as
     #: `environ["wsgidav.auth.permissions"] = (<permission>, ...)`
@@ -59,6 +172,17 @@ class BaseDomainController(ABC):
         self.wsgidav_app = wsgidav_app
         self.config = config
 
+        cache_conf = util.get_dict_value(
+            config, "http_authenticator.auth_cache", as_dict=True
+        )
+        #: :class:`AuthCache` instance (or None), used by HTTPAuthenticator
+        self.auth_cache = None
+        if cache_conf.get("enable"):
+            self.auth_cache = AuthCache(
+                ttl=cache_conf.get("ttl", 300),
+                max_size=cache_conf.get("max_size", 1000),
+            )
+
     def __str__(self):
         return f"{self.__class__.__name__}()"
 
@@ -163,6 +287,26 @@ class BaseDomainController(ABC):
         """
         raise NotImplementedError
 
+    def get_session_key(self, realm, user_name, environ):
+        """Return a string that changes when the user's credentials change.
+
+        HTTPAuthenticator signs a digest of this key into session tokens and
+        compares it on every request that presents a token. So tokens are
+        revoked if the key changes, or if None is returned (i.e. the user does
+        not exist anymore).
+
+        The default implementation returns an empty string, i.e. tokens stay
+        valid until they expire.
+
+        Args:
+            realm (str):
+            user_name (str):
+            environ (dict):
+        Returns:
+            str or None
+        """
+        return ""
+
     @abstractmethod
     def supports_http_digest_auth(self):
         """Signal if this DC instance supports the HTTP digest authentication theme.
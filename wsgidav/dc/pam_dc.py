@@ -6,11 +6,26 @@ a Pluggable Authentication Module ('PAM').
 
 Used by HTTPAuthenticator. Only available on linux and macOS.
 
+python-pam is not thread-safe (#265), and a PAM stack may be slow (e.g. if it
+queries LDAP). Therefore ``pam.authenticate()`` is called in a small pool of
+worker processes (option ``pam_dc.workers``), so multiple logins can be
+verified in parallel, and a hanging PAM module does not block other clients
+longer than ``pam_dc.timeout`` seconds.
+Set ``workers: 0`` to authenticate in the server process instead (serialized
+by a lock).
+
+It is recommended to enable ``http_authenticator.auth_cache`` as well, so
+repeated credentials are not passed to PAM on every request.
+
 See https://wsgidav.readthedocs.io/en/latest/user_guide_configure.html
 """
 
+import multiprocessing
 import os
 import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 
 from wsgidav import util
 from wsgidav.dc.base_dc import BaseDomainController
@@ -27,18 +42,45 @@ except ImportError:
     raise
 
 
+#: `pam.pam()` instance of a worker process
+_worker_pam = None
+
+
+def _init_worker():
+    global _worker_pam
+    _worker_pam = pam.pam()
+
+
+def _authenticate_in_worker(user_name, password, service, resetcreds, encoding):
+    """Called in a worker process, return (is_ok, code, reason)."""
+    is_ok = _worker_pam.authenticate(
+        user_name,
+        password,
+        service=service,
+        resetcreds=resetcreds,
+        encoding=encoding,
+    )
+    return is_ok, _worker_pam.code, _worker_pam.reason
+
+
 class PAMDomainController(BaseDomainController):
     def __init__(self, wsgidav_app, config):
         super().__init__(wsgidav_app, config)
 
         self.lock = threading.RLock()
-        self.pam = pam.pam()
+        self.pam = None
 
         dc_conf = util.get_dict_value(config, "pam_dc", as_dict=True)
 
         self.pam_service = dc_conf.get("service", "login")
         self.pam_encoding = dc_conf.get("encoding", "utf-8")
         self.pam_resetcreds = dc_conf.get("resetcreds", True)
+        self.pam_workers = int(dc_conf.get("workers", 4))
+        self.pam_timeout = float(dc_conf.get("timeout", 10))
+        # The process pool is created on first use
+        self._pool = None
+        if self.pam_workers <= 0:
+            self.pam = pam.pam()
         self.allow_users = dc_conf.get("allow_users", "all")
         if not (
             self.allow_users in ("all", "current") or isinstance(self.allow_users, list)
@@ -73,24 +115,91 @@ class PAMDomainController(BaseDomainController):
             return True
         return False
 
+    def _get_pool(self):
+        with self.lock:
+            if self._pool is None:
+                # Don't fork a (multi-threaded) server process
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.pam_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._pool
+
+    def _discard_pool(self, pool):
+        """Shut down `pool` and kill its workers, so the next login starts a new one.
+
+        A worker that hangs in a PAM call cannot be cancelled, and a crashed
+        worker breaks the whole pool.
+        """
+        with self.lock:
+            if self._pool is pool:
+                self._pool = None
+        # Grab the processes before shutdown() clears the list
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        try:
+            pool.shutdown(wait=False, cancel_futures=True)
+        except TypeError:  # Python 3.8
+            pool.shutdown(wait=False)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _authenticate(self, user_name, password):
+        """Return (is_ok, code, reason)."""
+        if self.pam is not None:
+            # Seems that python_pam is not threadsafe (#265)
+            with self.lock:
+                is_ok = self.pam.authenticate(
+                    user_name,
+                    password,
+                    service=self.pam_service,
+                    resetcreds=self.pam_resetcreds,
+                    encoding=self.pam_encoding,
+                )
+                return is_ok, self.pam.code, self.pam.reason
+
+        error = None
+        for _attempt in range(2):
+            pool = self._get_pool()
+            try:
+                future = pool.submit(
+                    _authenticate_in_worker,
+                    user_name,
+                    password,
+                    self.pam_service,
+                    self.pam_resetcreds,
+                    self.pam_encoding,
+                )
+                return future.result(timeout=self.pam_timeout)
+            except FutureTimeoutError:
+                self._discard_pool(pool)
+                return False, None, f"Timeout after {self.pam_timeout} seconds"
+            except (BrokenProcessPool, CancelledError, RuntimeError) as e:
+                # The pool was broken by a crashed worker, or it was discarded
+                # (or shut down) because a concurrent login timed out.
+                # Retry once on a new pool, so other logins are not affected.
+                self._discard_pool(pool)
+                error = e
+        return False, None, f"PAM worker failed: {error!r}"
+
+    def get_session_key(self, realm, user_name, environ):
+        """Revoke session tokens of users that are not allowed (anymore)."""
+        if not self._validate_user(user_name):
+            return None
+        return ""
+
     def basic_auth_user(self, realm, user_name, password, environ):
-        # Seems that python_pam is not threadsafe (#265)
         if not self._validate_user(user_name):
             _logger.warning(f"User {user_name!r} is not allowed.")
             return False
-        with self.lock:
-            is_ok = self.pam.authenticate(
-                user_name,
-                password,
-                service=self.pam_service,
-                resetcreds=self.pam_resetcreds,
-                encoding=self.pam_encoding,
+
+        is_ok, code, reason = self._authenticate(user_name, password)
+        if not is_ok:
+            _logger.warning(
+                f"pam.authenticate({user_name!r}, '<redacted>', {self.pam_service!r}) failed with code {code}: {reason}"
             )
-            if not is_ok:
-                _logger.warning(
-                    f"pam.authenticate({user_name!r}, '<redacted>', {self.pam_service!r}) failed with code {self.pam.code}: {self.pam.reason}"
-                )
-                return False
+            return False
 
         _logger.debug(f"User {user_name!r} logged on.")
         return True
@@ -124,6 +124,13 @@ class SimpleDomainController(BaseDomainController):
             return True
         return False
 
+    def get_session_key(self, realm, user_name, environ):
+        """Return password and roles, so changing them revokes session tokens."""
+        user = self._get_realm_entry(realm, user_name)
+        if not isinstance(user, dict):
+            return None
+        return f"{user.get('password')}\0{user.get('roles', [])}"
+
     def supports_http_digest_auth(self):
         # We have access to a plaintext password (or stored hash)
         return True
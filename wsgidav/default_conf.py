@@ -19,6 +19,8 @@ from wsgidav.dir_browser import WsgiDavDirBrowser
 from wsgidav.error_printer import ErrorPrinter
 from wsgidav.http_authenticator import HTTPAuthenticator
 from wsgidav.mw.cors import Cors
+from wsgidav.mw.metrics import MetricsMiddleware
+from wsgidav.mw.profiler import ProfilerMiddleware
 from wsgidav.request_resolver import RequestResolver
 
 __docformat__ = "reStructuredText"
@@ -35,13 +37,26 @@ DEFAULT_CONFIG = {
     "port": 8080,
     "mount_path": None,  # Application root, e.g. <mount_path>/<share_name>/<res_path>
     "provider_mapping": {},
+    # Providers of share templates like '/home/{user}' are created on demand
+    "dynamic_shares": {
+        "max_count": 1000,  # Max. number of cached providers (LRU)
+        "idle_timeout": 600,  # Discard providers after n seconds without access
+        "negative_ttl": 10,  # Don't retry failed creations for n seconds
+    },
     "fs_dav_provider": {
         "shadow_map": {},
         "follow_symlinks": False,
     },
+    # Options for wsgidav.asgi_app.WsgiDAVAsgiApp (e.g. used with uvicorn)
+    "asgi": {
+        "max_workers": 32,  # Threads that run the (blocking) request handlers
+        "buffer_body_size": 65536,  # Receive smaller bodies before dispatching
+    },
     "honor_mtime_header": False,
     "add_header_MS_Author_Via": True,
     "default_charset": "utf-8",  # e.g. "utf-8"
+    #: Build multistatus responses with "fast" (string) or "etree" (element) writer
+    "xml_writer": "fast",
     "hotfixes": {
         "emulate_win32_lastmod": False,  # True: support Win32LastModifiedTime
         "re_encode_path_info": True,  # (See issue #73)
@@ -56,6 +71,8 @@ DEFAULT_CONFIG = {
     "lock_storage": True,  # True: use LockManager(lock_storage.LockStorageDict)
     "middleware_stack": [
         # WsgiDavDebugFilter,
+        MetricsMiddleware,  # configured under metrics option (see below)
+        ProfilerMiddleware,  # configured under profiler option (see below)
         Cors,
         ErrorPrinter,
         HTTPAuthenticator,
@@ -71,6 +88,21 @@ DEFAULT_CONFIG = {
         "default_to_digest": True,  # True (default digest) or False (default basic)
         # Name of a header field that will be accepted as authorized user
         "trusted_auth_header": None,
+        # Remember successful basic authentication for expensive verifiers
+        # (e.g. bcrypt hashes or PAM)
+        "auth_cache": {
+            "enable": False,
+            "ttl": 300,  # Seconds until a credential is verified again
+            "max_size": 1000,  # Max. number of cached credentials
+        },
+        # Issue a signed session cookie after successful authentication, so
+        # following requests don't need to be authenticated again
+        "session_cookie": {
+            "enable": False,
+            "name": "wsgidav-session",
+            "max_age": 3600,  # Seconds until the session token expires
+            "secret": None,  # None: generate a random secret on start-up
+        },
     },
     #: Used by SimpleDomainController only
     "simple_dc": {"user_mapping": {}},  # NO anonymous access by default
@@ -92,6 +124,32 @@ DEFAULT_CONFIG = {
         "logger_format": DEFAULT_LOGGER_FORMAT,
         "enable_loggers": [],
         "debug_methods": [],
+        "queue": False,  # True: write log records from a background thread
+    },
+    #: Record durations of request phases (auth, resource, props, xml, ...)
+    "timings": {
+        "enable": False,  # Add them to the request log (verbose >= 3)
+        "server_timing_header": False,  # Also send a `Server-Timing` header
+    },
+    #: Options for `MetricsMiddleware`
+    "metrics": {
+        "enable": False,  # Collect request metrics
+        "path": "/:metrics",  # Serve them in Prometheus text format (None: don't)
+        # The path is served before authentication: clients must send
+        # 'Authorization: Bearer <token>', otherwise access is denied
+        "token": None,
+        "allow_anonymous": False,  # Serve metrics to everyone (not recommended)
+        "buckets": None,  # Upper bounds (seconds) of the duration histogram
+    },
+    #: Options for `ProfilerMiddleware`
+    "profiler": {
+        "enable": False,  # Profile selected requests with cProfile
+        "sample_rate": 0.0,  # Fraction of requests, e.g. 0.01
+        "methods": [],  # Always profile these methods
+        "paths": [],  # Always profile paths matching these fnmatch patterns
+        "header": None,  # Always profile requests with this header
+        "output_dir": None,  # None: <tempdir>/wsgidav-profiles
+        "max_files": 100,  # Keep only the newest pstats files
     },
     #: Options for `WsgiDavDirBrowser`
     "dir_browser": {
@@ -105,6 +163,11 @@ DEFAULT_CONFIG = {
             "Thumbs.db",  # Windows image previews
         ],
         "icon": True,
+        # Max. number of entries per page (0: no paging). Request other pages
+        # with '?offset=1000', sort with '?sort=size&order=desc'
+        "page_size": 0,
+        # Number of rendered listing pages that are cached in memory (0: off)
+        "cache_pages": 0,
         "response_trailer": True,  # Raw HTML code, appended as footer (True: use a default)
         "show_user": True,  # Show authenticated user an realm
         # Send <dm:mount> response if request URL contains '?davmount' (rfc4709)
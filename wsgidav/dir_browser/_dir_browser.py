@@ -5,15 +5,26 @@
 WSGI middleware that handles GET requests on collections to display directories.
 """
 
+import gzip
+import json
 import os
+import re
 import sys
-from fnmatch import fnmatch
-from urllib.parse import unquote
+import threading
+from collections import OrderedDict
+from fnmatch import translate
+from hashlib import md5
+from urllib.parse import parse_qs, unquote, urlencode
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 from wsgidav import __version__, util
-from wsgidav.dav_error import HTTP_MEDIATYPE_NOT_SUPPORTED, HTTP_OK, DAVError
+from wsgidav.dav_error import (
+    HTTP_MEDIATYPE_NOT_SUPPORTED,
+    HTTP_NOT_MODIFIED,
+    HTTP_OK,
+    DAVError,
+)
 from wsgidav.mw.base_mw import BaseMiddleware
 from wsgidav.util import get_uri_name, safe_re_encode, send_redirect_response
 
@@ -41,6 +52,108 @@ for t, el in MS_OFFICE_TYPE_TO_EXT_MAP.items():
         MS_OFFICE_EXT_TO_TYPE_MAP[e] = t
 OPEN_OFFICE_EXTENSIONS = {"odt", "odp", "odx"}
 
+#: Columns that the listing can be sorted by (query parameter `sort`)
+SORT_COLUMNS = ("name", "type", "size", "modified")
+
+#: Fields of the JSON listing (query parameter `fields`)
+JSON_FIELDS = ("name", "href", "is_collection", "type", "size", "modified")
+
+#: Values of the `type` query parameter that filter the listing
+TYPE_FILTERS = ("folder", "file")
+
+#: Rendered HTML is sent in chunks of (at least) this size
+STREAM_CHUNK_SIZE = 64 * 1024
+
+#: Assets up to this size are served from memory
+MAX_ASSET_SIZE = 1024 * 1024
+
+#: Only htdocs files with these extensions are served from memory (other files
+#: are passed to the FilesystemProvider)
+ASSET_EXTENSIONS = {".css", ".gif", ".ico", ".jpg", ".js", ".png", ".svg", ".woff2"}
+
+#: Assets with these extensions are also held gzip-compressed
+COMPRESSIBLE_EXTENSIONS = {".css", ".ico", ".js", ".svg"}
+
+#: Cache-Control of assets that are requested with their current content hash
+ASSET_CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"
+ASSET_CACHE_CONTROL = "public, no-cache"
+
+
+class _Asset:
+    """A static file of the htdocs folder, held in memory."""
+
+    __slots__ = ("data", "gzip_data", "etag", "content_type", "last_modified")
+
+    def __init__(self, file_path, rel_path):
+        with open(file_path, "rb") as f:
+            self.data = f.read()
+        self.etag = md5(self.data).hexdigest()[:16]
+        self.content_type = util.guess_mime_type(rel_path)
+        self.last_modified = util.get_rfc1123_time(os.path.getmtime(file_path))
+        self.gzip_data = None
+        if os.path.isfile(file_path + ".gz"):
+            # Use a precompressed variant if it is shipped with the asset
+            with open(file_path + ".gz", "rb") as f:
+                self.gzip_data = f.read()
+        elif os.path.splitext(rel_path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            gzip_data = gzip.compress(self.data, 9, mtime=0)
+            if len(gzip_data) < len(self.data) * 0.9:
+                self.gzip_data = gzip_data
+
+
+def _load_asset(htdocs_path, path):
+    """Return an _Asset for a URL path below htdocs_path (None: not an asset)."""
+    if os.path.splitext(path)[1].lower() not in ASSET_EXTENSIONS:
+        return None
+    rel_path = path.lstrip("/")
+    file_path = os.path.realpath(os.path.join(htdocs_path, *rel_path.split("/")))
+    if not file_path.startswith(os.path.join(htdocs_path, "")):
+        return None
+    try:
+        if os.path.getsize(file_path) > MAX_ASSET_SIZE:
+            return None
+        return _Asset(file_path, rel_path)
+    except OSError:
+        return None
+
+
+def _accepts_gzip(environ):
+    """Return True if the Accept-Encoding header allows gzip."""
+    for coding in environ.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = coding.partition(";")
+        if coding.strip().lower() in ("gzip", "x-gzip"):
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    return float(params[2:]) > 0
+                except ValueError:
+                    return False
+            return True
+    return False
+
+
+def _compile_ignore_patterns(patterns):
+    """Return a compiled regex that matches any of the fnmatch patterns (or None)."""
+    if util.is_basestring(patterns):
+        patterns = patterns.split(",")
+    patterns = [os.path.normcase(p) for p in patterns or () if p]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{translate(p)})" for p in patterns))
+
+
+def _get_sort_key(sort, name, content_length, last_modified):
+    """Return a sort key of a member for a column in SORT_COLUMNS."""
+    name = name.lower()
+    if sort == "type":
+        ext = name.rsplit(".", 1)[1] if "." in name else ""
+        return (ext, name)
+    elif sort == "size":
+        return (content_length or 0, name)
+    elif sort == "modified":
+        return (last_modified or 0, name)
+    return name
+
 
 class WsgiDavDirBrowser(BaseMiddleware):
     """WSGI middleware that handles GET requests on collections to display directories."""
@@ -57,7 +170,9 @@ class WsgiDavDirBrowser(BaseMiddleware):
         if htdocs_path:
             self.htdocs_path = os.path.realpath(htdocs_path)
         else:
-            self.htdocs_path = os.path.join(os.path.dirname(__file__), "htdocs")
+            self.htdocs_path = os.path.realpath(
+                os.path.join(os.path.dirname(__file__), "htdocs")
+            )
 
         if not os.path.isdir(self.htdocs_path):
             raise ValueError(f"Invalid dir_browser htdocs_path {self.htdocs_path!r}")
@@ -69,20 +184,70 @@ class WsgiDavDirBrowser(BaseMiddleware):
             ASSET_SHARE, True
         )
 
+        #: Max. number of rows per page (0: no paging)
+        self.page_size = max(0, int(self.dir_config.get("page_size") or 0))
+        self._ignore_re = _compile_ignore_patterns(self.dir_config.get("ignore"))
+        #: Max. number of rendered pages that are cached (0: no caching)
+        self.cache_pages = max(0, int(self.dir_config.get("cache_pages") or 0))
+        #: ETag -> list of HTML chunks (least recently used first)
+        self._page_cache = OrderedDict()
+        self._page_cache_lock = threading.Lock()
+
+        #: URL path (relative to ASSET_SHARE) -> _Asset (loaded on first use)
+        self.assets = {}
+        self._assets_lock = threading.Lock()
+
         # Prepare a Jinja2 template
         templateLoader = FileSystemLoader(searchpath=self.htdocs_path)
         templateEnv = Environment(loader=templateLoader, autoescape=select_autoescape())
+        templateEnv.globals["asset_url"] = self.get_asset_url
         self.template = templateEnv.get_template("template.html")
 
     def is_disabled(self):
         return self.dir_config.get("enable") is False
 
+    def get_asset_url(self, rel_path):
+        """Return the URL of an htdocs file, including its content hash.
+
+        Browsers may cache these URLs forever, since they change with the content.
+        """
+        url = f"{self.mount_path}{ASSET_SHARE}/{rel_path}"
+        asset = self._get_asset("/" + rel_path)
+        if asset:
+            url += f"?v={asset.etag}"
+        return url
+
+    def _get_asset(self, path):
+        """Return the _Asset for a URL path below ASSET_SHARE (or None).
+
+        Assets are read when they are requested first and then kept in memory.
+        """
+        asset = self.assets.get(path)
+        if asset is None:
+            asset = _load_asset(self.htdocs_path, path)
+            if asset is not None:
+                with self._assets_lock:
+                    asset = self.assets.setdefault(path, asset)
+        return asset
+
     def __call__(self, environ, start_response):
         path = environ["PATH_INFO"]
 
+        provider = environ["wsgidav.provider"]
+        if (
+            provider
+            and provider.share_path == ASSET_SHARE
+            and environ["REQUEST_METHOD"] in ("GET", "HEAD")
+        ):
+            asset = self._get_asset(path)
+            if asset is not None:
+                return self._send_asset(environ, start_response, asset)
+
         dav_res = None
         if environ["wsgidav.provider"]:
-            dav_res = environ["wsgidav.provider"].get_resource_inst(path, environ)
+            dav_res = environ["wsgidav.provider"].get_cached_resource_inst(
+                path, environ
+            )
 
         if (
             environ["REQUEST_METHOD"] in ("GET", "HEAD")
@@ -127,23 +292,93 @@ class WsgiDavDirBrowser(BaseMiddleware):
                     environ, start_response, location=f"{path}/"
                 )
 
-            context = self._get_context(environ, dav_res)
-
-            res = self.template.render(**context)
-            res = util.to_bytes(res)
-            start_response(
-                "200 OK",
-                [
-                    ("Content-Type", "text/html; charset=utf-8"),
-                    ("Content-Length", str(len(res))),
-                    ("Cache-Control", "private"),
-                    ("Date", util.get_rfc1123_time()),
-                ],
-            )
-            return [res]
+            args = self._get_listing_args(environ)
+            etag, last_modified = self._get_listing_validator(environ, dav_res, args)
+            headers = [
+                # Let browsers revalidate every time (cheap, see below)
+                ("Cache-Control", "private, no-cache"),
+                ("ETag", f'W/"{etag}"'),
+            ]
+            if last_modified:
+                headers.append(("Last-Modified", util.get_rfc1123_time(last_modified)))
+
+            if self._is_not_modified(environ, etag, last_modified):
+                return util.send_status_response(
+                    environ, start_response, HTTP_NOT_MODIFIED, add_headers=headers
+                )
+
+            if args["format"] == "json":
+                members = self._get_members(dav_res, args)
+                body = self._get_json_listing(environ, dav_res, args, members)
+                start_response(
+                    "200 OK",
+                    headers
+                    + [
+                        ("Content-Type", "application/json; charset=utf-8"),
+                        ("Content-Length", str(len(body))),
+                        ("Date", util.get_rfc1123_time()),
+                    ],
+                )
+                return [body]
+
+            headers += [
+                ("Content-Type", "text/html; charset=utf-8"),
+                ("Date", util.get_rfc1123_time()),
+            ]
+            chunks = self._get_cached_page(etag)
+            if chunks is not None:
+                start_response("200 OK", headers)
+                return chunks
+
+            context = self._get_context(environ, dav_res, args=args)
+
+            start_response("200 OK", headers)
+            if self.cache_pages:
+                return self._render_and_cache(etag, context)
+            return self._render(context)
 
         return self.next_app(environ, start_response)
 
+    def _send_asset(self, environ, start_response, asset):
+        """Serve an htdocs file from memory."""
+        query = parse_qs(environ.get("QUERY_STRING", ""))
+        if query.get("v", [None])[0] == asset.etag:
+            cache_control = ASSET_CACHE_CONTROL_IMMUTABLE
+        else:
+            cache_control = ASSET_CACHE_CONTROL
+
+        data = asset.data
+        etag = asset.etag
+        headers = [("Cache-Control", cache_control)]
+        if asset.gzip_data:
+            headers.append(("Vary", "Accept-Encoding"))
+            if _accepts_gzip(environ):
+                data = asset.gzip_data
+                # Different representations need different ETags
+                etag += "-gz"
+                headers.append(("Content-Encoding", "gzip"))
+        headers += [
+            ("ETag", f'"{etag}"'),
+            ("Last-Modified", asset.last_modified),
+        ]
+
+        if "HTTP_IF_NONE_MATCH" in environ:
+            token_list = util.parse_if_match_header(environ["HTTP_IF_NONE_MATCH"])
+            if etag in token_list or "*" in token_list:
+                return util.send_status_response(
+                    environ, start_response, HTTP_NOT_MODIFIED, add_headers=headers
+                )
+
+        headers += [
+            ("Content-Type", asset.content_type),
+            ("Content-Length", str(len(data))),
+            ("Date", util.get_rfc1123_time()),
+        ]
+        start_response("200 OK", headers)
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return [b""]
+        return [data]
+
     def _fail(self, value, context_info=None, src_exception=None, err_condition=None):
         """Wrapper to raise (and log) DAVError."""
         e = DAVError(value, context_info, src_exception, err_condition)
@@ -153,16 +388,267 @@ class WsgiDavDirBrowser(BaseMiddleware):
             )
         raise e
 
-    def _get_context(self, environ, dav_res):
+    def _render(self, context):
+        """Render the template and yield the HTML in chunks."""
+        buffer = []
+        size = 0
+        for part in self.template.generate(**context):
+            buffer.append(part)
+            size += len(part)
+            if size >= STREAM_CHUNK_SIZE:
+                yield util.to_bytes("".join(buffer))
+                buffer = []
+                size = 0
+        if buffer:
+            yield util.to_bytes("".join(buffer))
+
+    def _get_cached_page(self, etag):
+        if not self.cache_pages:
+            return None
+        with self._page_cache_lock:
+            chunks = self._page_cache.get(etag)
+            if chunks is not None:
+                self._page_cache.move_to_end(etag)
+            return chunks
+
+    def _render_and_cache(self, etag, context):
+        """Render the template, yield the chunks, and cache the complete page."""
+        chunks = []
+        for chunk in self._render(context):
+            chunks.append(chunk)
+            yield chunk
+        with self._page_cache_lock:
+            self._page_cache[etag] = chunks
+            self._page_cache.move_to_end(etag)
+            while len(self._page_cache) > self.cache_pages:
+                self._page_cache.popitem(last=False)
+
+    def _get_listing_validator(self, environ, dav_res, args):
+        """Return (etag, last_modified) of a listing page.
+
+        The ETag is a hash of the collection's own ETag and modification date,
+        the listing arguments, and the user (as far as it is displayed).
+        Members are not evaluated, so 304 responses and cached pages are cheap.
+        Note that a collection's modification date changes when members are
+        added, removed, or renamed, but usually not when a member file is
+        modified in place.
+        """
+        last_modified = dav_res.get_last_modified() or 0
+        digest = md5()
+        digest.update(
+            util.to_bytes(
+                "{}\0{}\0{}\0{!r}\0{}\0{}\0{}\0{}\0{}\n".format(
+                    __version__,
+                    dav_res.get_href(),
+                    dav_res.get_etag(),
+                    last_modified,
+                    sorted(args.items()),
+                    environ["wsgidav.provider"].is_readonly(),
+                    environ.get("wsgidav.auth.user_name"),
+                    environ.get("wsgidav.auth.realm"),
+                    environ.get("wsgidav.auth.roles"),
+                )
+            )
+        )
+        return digest.hexdigest(), int(last_modified) or None
+
+    @staticmethod
+    def _is_not_modified(environ, etag, last_modified):
+        """Return True if the client's copy of the listing is still valid."""
+        if "HTTP_IF_NONE_MATCH" in environ:
+            # If-Modified-Since is ignored, if If-None-Match is present
+            token_list = util.parse_if_match_header(environ["HTTP_IF_NONE_MATCH"])
+            return etag in token_list or "*" in token_list
+        if "HTTP_IF_MODIFIED_SINCE" in environ and last_modified:
+            if_modified_since = util.parse_time_string(
+                environ["HTTP_IF_MODIFIED_SINCE"]
+            )
+            return bool(if_modified_since and if_modified_since >= last_modified)
+        return False
+
+    def _get_listing_args(self, environ):
+        """Return a dict with the listing query parameters.
+
+        sort, order, offset, limit: sort and page the listing,
+        name, type: only list members with matching name (fnmatch pattern) or
+        type ('folder' or 'file'),
+        format, fields: return JSON ('format=json') with selected fields
+        (comma separated, default: all).
+        """
+        query = parse_qs(environ.get("QUERY_STRING", ""))
+
+        def _get(name, default):
+            return query.get(name, [default])[0]
+
+        sort = _get("sort", "name")
+        if sort not in SORT_COLUMNS:
+            sort = "name"
+        order = "desc" if _get("order", "asc") == "desc" else "asc"
+        try:
+            offset = max(0, int(_get("offset", 0)))
+        except ValueError:
+            offset = 0
+        try:
+            limit = max(0, int(_get("limit", 0)))
+        except ValueError:
+            limit = 0
+        if self.page_size:
+            limit = min(limit, self.page_size) if limit else self.page_size
+        type_filter = _get("type", "")
+        if type_filter not in TYPE_FILTERS:
+            type_filter = ""
+        fields = _get("fields", "")
+        fields = tuple(f for f in JSON_FIELDS if f in fields.split(","))
+        return {
+            "sort": sort,
+            "order": order,
+            "offset": offset,
+            "limit": limit,
+            "name": _get("name", ""),
+            "type": type_filter,
+            "format": "json" if _get("format", "html") == "json" else "html",
+            "fields": fields or JSON_FIELDS,
+        }
+
+    def _is_ignored(self, name):
+        return bool(self._ignore_re and self._ignore_re.match(os.path.normcase(name)))
+
+    def _get_members(self, dav_res, args):
+        """Return a filtered and sorted list of member resources (or info dicts).
+
+        Only attributes that are required for filtering and sorting are
+        evaluated here. Folders are listed before files.
+        """
+        sort, order = args["sort"], args["order"]
+        name_re = None
+        if args["name"]:
+            name_re = re.compile(translate(args["name"]), re.IGNORECASE)
+        type_filter = args["type"]
+
+        def _skip(name, is_collection):
+            if type_filter and is_collection != (type_filter == "folder"):
+                return True
+            return bool(name_re and not name_re.match(name))
+
+        # Ask collection for member info list
+        dir_info_list = dav_res.get_directory_info()
+        items = []
+        ignored = 0
+        if dir_info_list is None:
+            # No pre-build info: evaluate members
+            for res in dav_res.get_member_list():
+                name = res.get_display_name()
+                if self._is_ignored(name):
+                    ignored += 1
+                    continue
+                if _skip(name, res.is_collection):
+                    continue
+                if sort == "name" or res.is_collection:
+                    # Avoid needless calls for folders, as they are not sorted by
+                    # size or date
+                    key = _get_sort_key("name", name, None, None)
+                elif sort == "size":
+                    key = _get_sort_key(sort, name, res.get_content_length(), None)
+                elif sort == "modified":
+                    key = _get_sort_key(sort, name, None, res.get_last_modified())
+                else:
+                    key = _get_sort_key(sort, name, None, None)
+                items.append((res.is_collection, key, res))
+        else:
+            for entry in dir_info_list:
+                name = entry["display_name"]
+                if self._is_ignored(name):
+                    ignored += 1
+                    continue
+                is_collection = bool(entry.get("is_collection"))
+                if _skip(name, is_collection):
+                    continue
+                key = _get_sort_key(
+                    "name" if is_collection else sort,
+                    name,
+                    entry.get("content_length"),
+                    entry.get("last_modified"),
+                )
+                items.append((is_collection, key, entry))
+        if ignored:
+            _logger.debug(f"Dir browser ignored {ignored} entries")
+
+        reverse = order == "desc"
+        folders = [item for item in items if item[0]]
+        files = [item for item in items if not item[0]]
+        folders.sort(key=lambda item: item[1], reverse=reverse)
+        files.sort(key=lambda item: item[1], reverse=reverse)
+        return [item[2] for item in folders + files]
+
+    def _get_row(self, res, is_readonly):
+        """Return a dict with display data of a member resource."""
+        ms_sharepoint_support = self.dir_config.get("ms_sharepoint_support")
+        libre_office_support = self.dir_config.get("libre_office_support")
+        di = res.get_display_info()
+        href = res.get_href()
+        ofe_prefix = None
+        tr_classes = []
+        a_classes = []
+
+        # #268 Use relative paths to support reverse proxies:
+        rel_href = get_uri_name(href)
+        if res.is_collection:
+            tr_classes.append("directory")
+            rel_href = f"./{rel_href}/"  # 274
+
+        add_link_html = []
+
+        if not is_readonly and not res.is_collection:
+            ext = os.path.splitext(href)[1].lstrip(".").lower()
+            ms_office_type = MS_OFFICE_EXT_TO_TYPE_MAP.get(ext)
+            if ms_office_type:
+                if ms_sharepoint_support:
+                    ofe_prefix = f"ms-{ms_office_type}:ofe|u|"
+                    a_classes.append("msoffice")
+                    if libre_office_support:
+                        add_link_html.append(
+                            f"<a class='edit2' title='Edit with Libre Office' href='vnd.libreoffice.command:ofv|u|{rel_href}'>Edit</a>"
+                        )
+                        # ofe_prefix_2 = "vnd.libreoffice.command:ofv|u|"
+                        # a_classes.append("msoffice")
+                elif libre_office_support:
+                    ofe_prefix = "vnd.libreoffice.command:ofv|u|"
+                    # a_classes.append("msoffice")
+
+            elif ext in OPEN_OFFICE_EXTENSIONS:
+                if libre_office_support:
+                    ofe_prefix = "vnd.libreoffice.command:ofv|u|"
+                    a_classes.append("msoffice")
+
+        if res.is_link():
+            a_classes.append("symlink")
+
+        return {
+            "href": rel_href,
+            "ofe_prefix": ofe_prefix,
+            "a_class": " ".join(a_classes),
+            "add_link_html": "".join(add_link_html),
+            "tr_class": " ".join(tr_classes),
+            "display_name": res.get_display_name(),
+            "last_modified": res.get_last_modified(),
+            "is_collection": res.is_collection,
+            "content_length": res.get_content_length(),
+            "display_type": di.get("type"),
+            "display_type_comment": di.get("typeComment"),
+        }
+
+    def _get_context(self, environ, dav_res, *, args=None, members=None):
         """
         @see: http://www.webdav.org/specs/rfc4918.html#rfc.section.9.4
         """
         assert dav_res.is_collection
 
         is_readonly = environ["wsgidav.provider"].is_readonly()
-        ms_sharepoint_support = self.dir_config.get("ms_sharepoint_support")
-        libre_office_support = self.dir_config.get("libre_office_support")
         is_top_dir = dav_res.path in ("", "/")
+        if args is None:
+            args = self._get_listing_args(environ)
+        if members is None:
+            members = self._get_members(dav_res, args)
 
         # TODO: WebDAV URLs only on Windows?
         # TODO: WebDAV URLs only on HTTPS?
@@ -196,87 +682,7 @@ class WsgiDavDirBrowser(BaseMiddleware):
         context["trailer"] = trailer
 
         rows = context["rows"]
-
-        # Ask collection for member info list
-        dir_info_list = dav_res.get_directory_info()
-
-        if dir_info_list is None:
-            # No pre-build info: traverse members
-            dir_info_list = []
-            childList = dav_res.get_descendants(depth="1", add_self=False)
-            for res in childList:
-                di = res.get_display_info()
-                href = res.get_href()
-                ofe_prefix = None
-                tr_classes = []
-                a_classes = []
-
-                # #268 Use relative paths to support reverse proxies:
-                rel_href = get_uri_name(href)
-                if res.is_collection:
-                    tr_classes.append("directory")
-                    rel_href = f"./{rel_href}/"  # 274
-
-                add_link_html = []
-
-                if not is_readonly and not res.is_collection:
-                    ext = os.path.splitext(href)[1].lstrip(".").lower()
-                    ms_office_type = MS_OFFICE_EXT_TO_TYPE_MAP.get(ext)
-                    if ms_office_type:
-                        if ms_sharepoint_support:
-                            ofe_prefix = f"ms-{ms_office_type}:ofe|u|"
-                            a_classes.append("msoffice")
-                            if libre_office_support:
-                                add_link_html.append(
-                                    f"<a class='edit2' title='Edit with Libre Office' href='vnd.libreoffice.command:ofv|u|{rel_href}'>Edit</a>"
-                                )
-                                # ofe_prefix_2 = "vnd.libreoffice.command:ofv|u|"
-                                # a_classes.append("msoffice")
-                        elif libre_office_support:
-                            ofe_prefix = "vnd.libreoffice.command:ofv|u|"
-                            # a_classes.append("msoffice")
-
-                    elif ext in OPEN_OFFICE_EXTENSIONS:
-                        if libre_office_support:
-                            ofe_prefix = "vnd.libreoffice.command:ofv|u|"
-                            a_classes.append("msoffice")
-
-                if res.is_link():
-                    a_classes.append("symlink")
-
-                entry = {
-                    "href": rel_href,
-                    "ofe_prefix": ofe_prefix,
-                    "a_class": " ".join(a_classes),
-                    "add_link_html": "".join(add_link_html),
-                    "tr_class": " ".join(tr_classes),
-                    "display_name": res.get_display_name(),
-                    "last_modified": res.get_last_modified(),
-                    "is_collection": res.is_collection,
-                    "content_length": res.get_content_length(),
-                    "display_type": di.get("type"),
-                    "display_type_comment": di.get("typeComment"),
-                }
-
-                dir_info_list.append(entry)
-        #
-        ignore_patterns = self.dir_config.get("ignore", [])
-        if util.is_basestring(ignore_patterns):
-            ignore_patterns = ignore_patterns.split(",")
-
-        ignored_list = []
-        for entry in dir_info_list:
-            # Skip ignore patterns
-            ignore = False
-            for pat in ignore_patterns:
-                if fnmatch(entry["display_name"], pat):
-                    ignored_list.append(entry["display_name"])
-                    # _logger.debug("Ignore {}".format(entry["display_name"]))
-                    ignore = True
-                    break
-            if ignore:
-                continue
-            #
+        for entry in self._get_page_rows(members, args, is_readonly):
             last_modified = entry.get("last_modified")
             if last_modified is None:
                 entry["str_modified"] = ""
@@ -290,19 +696,8 @@ class WsgiDavDirBrowser(BaseMiddleware):
                     entry["str_size"] = util.byte_number_string(content_length)
 
             rows.append(entry)
-        if ignored_list:
-            _logger.debug(
-                f"Dir browser ignored {len(ignored_list)} entries: {ignored_list}"
-            )
 
-        # sort
-        sort = "name"
-        if sort == "name":
-            rows.sort(
-                key=lambda v: "{}{}".format(
-                    not v["is_collection"], v["display_name"].lower()
-                )
-            )
+        context.update(self._get_paging_context(args, len(members), len(rows)))
 
         if "wsgidav.auth.user_name" in environ:
             context.update(
@@ -318,3 +713,91 @@ class WsgiDavDirBrowser(BaseMiddleware):
             )
 
         return context
+
+    def _get_page_rows(self, members, args, is_readonly):
+        """Return display data of the members of the current page."""
+        offset, limit = args["offset"], args["limit"]
+        page = members[offset : offset + limit] if limit else members[offset:]
+        return [
+            member if isinstance(member, dict) else self._get_row(member, is_readonly)
+            for member in page
+        ]
+
+    def _get_json_listing(self, environ, dav_res, args, members):
+        """Return the current page as compact JSON (bytes)."""
+        is_readonly = environ["wsgidav.provider"].is_readonly()
+        fields = args["fields"]
+        items = []
+        for row in self._get_page_rows(members, args, is_readonly):
+            is_collection = bool(row.get("is_collection"))
+            item = {
+                "name": row["display_name"],
+                "href": row.get("href"),
+                "is_collection": is_collection,
+                "type": row.get("display_type"),
+                "size": None if is_collection else row.get("content_length"),
+                "modified": row.get("last_modified"),
+            }
+            if len(fields) < len(JSON_FIELDS):
+                item = {f: item[f] for f in fields}
+            items.append(item)
+        res = {
+            "href": dav_res.get_href(),
+            "total": len(members),
+            "offset": args["offset"],
+            "limit": args["limit"],
+            "sort": args["sort"],
+            "order": args["order"],
+            "items": items,
+        }
+        return util.to_bytes(json.dumps(res, separators=(",", ":")))
+
+    def _get_paging_context(self, args, total, count):
+        """Return context variables for sort and page links."""
+        sort, order, offset, limit = (
+            args["sort"],
+            args["order"],
+            args["offset"],
+            args["limit"],
+        )
+
+        def _query(**kwargs):
+            query = {"sort": sort, "order": order, "offset": offset}
+            if limit and limit != self.page_size:
+                query["limit"] = limit
+            for name in ("name", "type"):
+                if args[name]:
+                    query[name] = args[name]
+            query.update(kwargs)
+            if query["sort"] == "name":
+                query.pop("sort")
+            if query["order"] == "asc":
+                query.pop("order")
+            if not query["offset"]:
+                query.pop("offset")
+            return "?" + urlencode(query) if query else "./"
+
+        sort_links = {}
+        for column in SORT_COLUMNS:
+            if column == sort:
+                next_order = "asc" if order == "desc" else "desc"
+            else:
+                next_order = "asc"
+            sort_links[column] = _query(sort=column, order=next_order, offset=0)
+
+        prev_url = next_url = None
+        if limit and offset > 0:
+            prev_url = _query(offset=max(0, offset - limit))
+        if limit and offset + limit < total:
+            next_url = _query(offset=offset + limit)
+
+        return {
+            "sort": sort,
+            "order": order,
+            "sort_links": sort_links,
+            "total": total,
+            "first_row": offset + 1 if count else 0,
+            "last_row": offset + count,
+            "prev_url": prev_url,
+            "next_url": next_url,
+        }
@@ -19,6 +19,7 @@ import os
 import shutil
 import stat
 import sys
+import warnings
 from typing import List
 
 from wsgidav import util
@@ -32,6 +33,12 @@ _logger = util.get_module_logger(__name__)
 BUFFER_SIZE = 8192
 
 
+def _make_stat_result(mode, size, ctime, mtime):
+    """Return an `os.stat_result` that only has the given fields set."""
+    # (mode, ino, dev, nlink, uid, gid, size, atime, mtime, ctime)
+    return os.stat_result((mode, 0, 0, 0, 0, 0, size, mtime, mtime, ctime))
+
+
 # ========================================================================
 # FileResource
 # ========================================================================
@@ -41,24 +48,49 @@ class FileResource(DAVNonCollection):
     See also _DAVResource, DAVNonCollection, and FilesystemProvider.
     """
 
+    # Large listings keep many instances alive, so we only store the stat
+    # fields that we need (see `file_stat`)
+    __slots__ = ("_file_path", "_mode", "_size", "_ctime", "_mtime")
+
     def __init__(self, path: str, environ: dict, file_path: str):
         super().__init__(path, environ)
         self._file_path: str = file_path
-        self.file_stat: os.stat_result = os.stat(self._file_path)
+        self.file_stat = os.stat(self._file_path)
         # Setting the name from the file path should fix the case on Windows
         self.name: str = os.path.basename(self._file_path)
         self.name = util.to_str(self.name)
 
+    @property
+    def file_stat(self) -> os.stat_result:
+        """Return the cached stat fields as `os.stat_result`.
+
+        Only `st_mode`, `st_size`, `st_ctime`, and `st_mtime` are kept (other
+        fields are 0). Call `refresh_file_stat()` to query the file system again.
+        """
+        return _make_stat_result(self._mode, self._size, self._ctime, self._mtime)
+
+    @file_stat.setter
+    def file_stat(self, file_stat: os.stat_result):
+        self._mode: int = file_stat[stat.ST_MODE]
+        self._size: int = file_stat[stat.ST_SIZE]
+        self._ctime: int = file_stat[stat.ST_CTIME]
+        self._mtime: int = file_stat[stat.ST_MTIME]
+
+    def refresh_file_stat(self) -> os.stat_result:
+        """Query `os.stat()` and update the cached size and times."""
+        self.file_stat = file_stat = os.stat(self._file_path)
+        return file_stat
+
     # Getter methods for standard live properties
     def get_content_length(self):
-        return self.file_stat[stat.ST_SIZE]
+        return self._size
 
     def get_content_type(self):
         config = self.environ["wsgidav.config"]
         return util.guess_mime_type(self.path, config)
 
     def get_creation_date(self):
-        return self.file_stat[stat.ST_CTIME]
+        return self._ctime
 
     def get_display_name(self):
         return self.name
@@ -67,7 +99,7 @@ class FileResource(DAVNonCollection):
         return util.get_file_etag(self._file_path)
 
     def get_last_modified(self):
-        return self.file_stat[stat.ST_MTIME]
+        return self._mtime
 
     def is_link(self):
         return os.path.islink(self._file_path)
@@ -148,7 +180,7 @@ class FileResource(DAVNonCollection):
         fpDest = self.provider._loc_to_file_path(dest_path, self.environ)
         assert not util.is_equal_or_child_uri(self.path, dest_path)
         assert not os.path.exists(fpDest)
-        _logger.debug(f"move_recursive({self._file_path}, {fpDest})")
+        _logger.debug("move_recursive(%s, %s)", self._file_path, fpDest)
         shutil.move(self._file_path, fpDest)
         # (Live properties are copied by copy2 or copystat)
         # Move dead properties
@@ -184,18 +216,49 @@ class FolderResource(DAVCollection):
     See also _DAVResource, DAVCollection, and FilesystemProvider.
     """
 
+    __slots__ = ("_file_path", "_mode", "_ctime", "_mtime")
+
     def __init__(self, path: str, environ: dict, file_path):
         super().__init__(path, environ)
         self._file_path: str = file_path
-        self.file_stat: os.stat_result = os.stat(self._file_path)
-        self.fs_opts = self.provider
+        self.file_stat = os.stat(self._file_path)
         # Setting the name from the file path should fix the case on Windows
         self.name = os.path.basename(self._file_path)
         self.name = util.to_str(self.name)  # .encode("utf8")
 
+    @property
+    def file_stat(self) -> os.stat_result:
+        """Return the cached stat fields as `os.stat_result`.
+
+        Only `st_mode`, `st_ctime`, and `st_mtime` are kept (other fields are 0).
+        Call `refresh_file_stat()` to query the file system again.
+        """
+        return _make_stat_result(self._mode, 0, self._ctime, self._mtime)
+
+    @file_stat.setter
+    def file_stat(self, file_stat: os.stat_result):
+        self._mode: int = file_stat[stat.ST_MODE]
+        self._ctime: int = file_stat[stat.ST_CTIME]
+        self._mtime: int = file_stat[stat.ST_MTIME]
+
+    def refresh_file_stat(self) -> os.stat_result:
+        """Query `os.stat()` and update the cached times."""
+        self.file_stat = file_stat = os.stat(self._file_path)
+        return file_stat
+
+    @property
+    def fs_opts(self) -> dict:
+        """@deprecated: use `self.provider.fs_opts` instead."""
+        warnings.warn(
+            "FolderResource.fs_opts is deprecated: use provider.fs_opts instead.",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return self.provider.fs_opts
+
     # Getter methods for standard live properties
     def get_creation_date(self):
-        return self.file_stat[stat.ST_CTIME]
+        return self._ctime
 
     def get_display_name(self):
         return self.name
@@ -213,7 +276,7 @@ class FolderResource(DAVCollection):
         return shutil.disk_usage(self._file_path).free
 
     def get_last_modified(self):
-        return self.file_stat[stat.ST_MTIME]
+        return self._mtime
 
     def is_link(self):
         return os.path.islink(self._file_path)
@@ -252,6 +315,51 @@ class FolderResource(DAVCollection):
             nameList.append(name)
         return nameList
 
+    def get_member_list(self) -> List[FileResource]:
+        """Return a list of direct members.
+
+        See DAVCollection.get_member_list()
+
+        This is faster than calling get_member() for every name, because the
+        folder is scanned only once and the paths of direct members of an
+        already validated folder don't need to be resolved again.
+        Members are created by FilesystemProvider._make_resource() and added to
+        the request-scoped resource cache.
+        Providers that override get_resource_inst() or _loc_to_file_path() get
+        the default implementation, which resolves every member.
+        """
+        provider = self.provider
+        provider_class = type(provider)
+        if (
+            provider_class.get_resource_inst is not FilesystemProvider.get_resource_inst
+            or provider_class._loc_to_file_path
+            is not FilesystemProvider._loc_to_file_path
+        ):
+            return super().get_member_list()
+
+        follow_symlinks = provider.fs_opts.get("follow_symlinks")
+        environ = self.environ
+        cache = provider._get_resource_cache(environ)
+        memberList = []
+        with os.scandir(self._file_path) as it:
+            for entry in it:
+                if not follow_symlinks and entry.is_symlink():
+                    _logger.info(f"Skipping symlink {entry.path!r}")
+                    continue
+                is_dir = entry.is_dir()
+                if not is_dir and not entry.is_file():
+                    _logger.info(f"Skipping non-file {entry.path!r}")
+                    continue
+                path = util.join_uri(self.path, util.to_str(entry.name))
+                res = cache.get(path) if cache is not None else None
+                if res is None:
+                    provider._count_get_resource_inst += 1
+                    res = provider._make_resource(path, environ, entry.path, is_dir)
+                    if cache is not None:
+                        cache[path] = res
+                memberList.append(res)
+        return memberList
+
     def get_member(self, name: str) -> FileResource:
         """Return direct collection member (DAVResource or derived).
 
@@ -344,7 +452,7 @@ class FolderResource(DAVCollection):
         fpDest = self.provider._loc_to_file_path(dest_path, self.environ)
         assert not util.is_equal_or_child_uri(self.path, dest_path)
         assert not os.path.exists(fpDest)
-        _logger.debug(f"move_recursive({self._file_path}, {fpDest})")
+        _logger.debug("move_recursive(%s, %s)", self._file_path, fpDest)
         shutil.move(self._file_path, fpDest)
         # (Live properties are copied by copy2 or copystat)
         # Move dead properties
@@ -483,6 +591,14 @@ class FilesystemProvider(DAVProvider):
             return None
         if not self.fs_opts.get("follow_symlinks") and os.path.islink(fp):
             raise DAVError(HTTP_FORBIDDEN, f"Symlink support is disabled: {fp!r}")
-        if os.path.isdir(fp):
-            return FolderResource(path, environ, fp)
-        return FileResource(path, environ, fp)
+        return self._make_resource(path, environ, fp, os.path.isdir(fp))
+
+    def _make_resource(self, path: str, environ: dict, file_path, is_dir: bool):
+        """Return a new resource object for an existing file or folder.
+
+        Used by get_resource_inst() and FolderResource.get_member_list(), so
+        subclasses can override this to return custom resource classes.
+        """
+        if is_dir:
+            return FolderResource(path, environ, file_path)
+        return FileResource(path, environ, file_path)
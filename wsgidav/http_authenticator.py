@@ -29,6 +29,23 @@ Usage::
      request will be sent a basic authentication required response
      (default = True)
 
+**Session Cookies**
+
+If ``http_authenticator.session_cookie.enable`` is set, a signed and expiring
+session token is sent as cookie after a successful basic or digest
+authentication. Following requests that present a valid token (for the same
+realm) are accepted without asking the domain controller again, which saves
+the 401 challenge round-trips of digest authentication and the cost of
+password checks.
+The token is signed with HMAC-SHA256, so it cannot be forged without knowing
+the secret. If no ``secret`` is configured, a random one is generated on
+start-up (i.e. tokens become invalid when the server restarts, and they are not
+shared between multiple server processes).
+An explicit ``Authorization`` header takes precedence over the cookie.
+Tokens also contain a digest of ``domain_controller.get_session_key()``, which
+is checked on every request, so a token is revoked when the user is removed or
+the password changes (depending on the domain controller).
+
 The HTTPAuthenticator will put the following authenticated information in the
 environ dictionary::
 
@@ -36,6 +53,7 @@ environ dictionary::
    environ["wsgidav.auth.user_name"] = user_name
    environ["wsgidav.auth.roles"] = <tuple> (optional)
    environ["wsgidav.auth.permissions"] = <tuple> (optional)
+   environ["wsgidav.auth.session"] = True (if accepted by session token)
 
 
 **Domain Controllers**
@@ -78,11 +96,15 @@ from previous middleware or server config (if required).
 """
 
 import base64
+import hmac
 import inspect
+import json
+import os
 import random
 import re
 import time
-from hashlib import md5
+from hashlib import md5, sha256
+from http.cookies import CookieError, SimpleCookie
 from textwrap import dedent
 
 from wsgidav import util
@@ -172,6 +194,17 @@ class HTTPAuthenticator(BaseMiddleware):
                 "Set accept_basic=True, accept_digest=False, default_to_digest=False"
             )
 
+        session_conf = util.get_dict_value(
+            config, "http_authenticator.session_cookie", as_dict=True
+        )
+        #: Lifetime of session tokens in seconds (0: session cookies disabled)
+        self.session_max_age = 0
+        if session_conf.get("enable"):
+            self.session_max_age = int(session_conf.get("max_age", 3600))
+            self.session_cookie_name = session_conf.get("name", "wsgidav-session")
+            secret = session_conf.get("secret")
+            self._session_secret = util.to_bytes(secret) if secret else os.urandom(32)
+
         self._nonce_dict = dict([])
 
         self._header_parser = re.compile(r"([\w]+)=([^,]*),")
@@ -205,6 +238,10 @@ class HTTPAuthenticator(BaseMiddleware):
         if "logout" in environ.get("QUERY_STRING", ""):
             force_logout = True
             _logger.warning("Force logout")
+            if self.session_max_age:
+                start_response = self._wrap_start_response(
+                    start_response, self._session_cookie_header(environ, None)
+                )
 
         force_allow = False
         if self.win_accept_anonymous_options and environ["REQUEST_METHOD"] == "OPTIONS":
@@ -229,6 +266,14 @@ class HTTPAuthenticator(BaseMiddleware):
             environ["wsgidav.auth.user_name"] = environ.get(self.trusted_auth_header)
             return self.next_app(environ, start_response)
 
+        if (
+            self.session_max_age
+            and not force_logout
+            and "HTTP_AUTHORIZATION" not in environ
+            and self._accept_session_token(environ, realm)
+        ):
+            return self.next_app(environ, start_response)
+
         if "HTTP_AUTHORIZATION" in environ and not force_logout:
             auth_header = environ["HTTP_AUTHORIZATION"]
             auth_match = self._header_method.search(auth_header)
@@ -263,8 +308,126 @@ class HTTPAuthenticator(BaseMiddleware):
             return self.send_digest_auth_response(environ, start_response)
         return self.send_basic_auth_response(environ, start_response)
 
+    def _get_realm(self, environ):
+        """Return the realm that was resolved by `__call__()` for this request."""
+        if "wsgidav.auth.realm" in environ:
+            return environ["wsgidav.auth.realm"]
+        return self.domain_controller.get_domain_realm(environ["PATH_INFO"], environ)
+
+    def _wrap_start_response(self, start_response, header):
+        """Return a start_response function that adds a response header."""
+
+        def _start_response(status, response_headers, exc_info=None):
+            response_headers.append(header)
+            return start_response(status, response_headers, exc_info)
+
+        return _start_response
+
+    def _sign(self, data):
+        return hmac.new(self._session_secret, data, sha256).digest()
+
+    def _get_session_key(self, realm, user_name, environ):
+        """Return a digest of the domain controller's session key (or None)."""
+        # Duck-typed domain controllers may not implement this
+        get_key = getattr(self.domain_controller, "get_session_key", None)
+        key = get_key(realm, user_name, environ) if get_key else ""
+        if key is None:
+            return None
+        data = util.to_bytes("\0".join((realm or "", user_name, key)))
+        return util.to_str(base64.urlsafe_b64encode(self._sign(data)[:12]))
+
+    def make_session_token(self, realm, user_name, environ):
+        """Return a signed token for an authenticated user (including roles)."""
+        payload = {
+            "r": realm,
+            "u": user_name,
+            "e": int(time.time()) + self.session_max_age,
+            "k": self._get_session_key(realm, user_name, environ),
+            "ro": environ.get("wsgidav.auth.roles"),
+            "pe": environ.get("wsgidav.auth.permissions"),
+        }
+        data = util.to_bytes(json.dumps(payload, separators=(",", ":")))
+        data_b64 = util.to_str(base64.urlsafe_b64encode(data))
+        signature_b64 = util.to_str(base64.urlsafe_b64encode(self._sign(data)))
+        return f"{data_b64}.{signature_b64}"
+
+    def parse_session_token(self, token):
+        """Return the payload dict of a valid token, or None."""
+        try:
+            data, signature = token.split(".", 1)
+            data = base64.urlsafe_b64decode(data)
+            signature = base64.urlsafe_b64decode(signature)
+        except (ValueError, TypeError):
+            return None
+        if not hmac.compare_digest(signature, self._sign(data)):
+            _logger.warning("Rejected session token with invalid signature.")
+            return None
+        payload = json.loads(data)
+        if payload["e"] < time.time():
+            return None
+        return payload
+
+    def _session_cookie_header(self, environ, token):
+        """Return a 'Set-Cookie' header that sets (or deletes) the session token."""
+        path = (self.wsgidav_app.mount_path if self.wsgidav_app else "") or "/"
+        if token is None:
+            token, max_age = "", 0
+        else:
+            max_age = self.session_max_age
+        value = (
+            f"{self.session_cookie_name}={token}; Path={path}; Max-Age={max_age}; "
+            "HttpOnly; SameSite=Lax"
+        )
+        if environ.get("wsgi.url_scheme") == "https":
+            value += "; Secure"
+        return ("Set-Cookie", value)
+
+    def _accept_session_token(self, environ, realm):
+        """Return True if the request has a valid session token for this realm.
+
+        Also set the authentication info in `environ` in this case.
+        """
+        cookie_header = environ.get("HTTP_COOKIE")
+        if not cookie_header or self.session_cookie_name not in cookie_header:
+            return False
+        try:
+            morsel = SimpleCookie(cookie_header).get(self.session_cookie_name)
+        except CookieError:
+            return False
+        if morsel is None or not morsel.value:
+            return False
+        with util.timed_phase(environ, "auth"):
+            payload = self.parse_session_token(morsel.value)
+        if not payload or payload["r"] != realm:
+            return False
+        key = self._get_session_key(realm, payload["u"], environ)
+        if key is None or key != payload.get("k"):
+            _logger.info("Rejected revoked session token of %r.", payload["u"])
+            return False
+
+        roles, permissions = payload["ro"], payload["pe"]
+        environ["wsgidav.auth.realm"] = realm
+        environ["wsgidav.auth.user_name"] = payload["u"]
+        environ["wsgidav.auth.roles"] = tuple(roles) if roles is not None else None
+        environ["wsgidav.auth.permissions"] = (
+            tuple(permissions) if permissions is not None else None
+        )
+        environ["wsgidav.auth.session"] = True
+        return True
+
+    def _start_session(self, environ, start_response):
+        """Return start_response, that issues a new session token (if enabled)."""
+        if not self.session_max_age:
+            return start_response
+        token = self.make_session_token(
+            environ["wsgidav.auth.realm"], environ["wsgidav.auth.user_name"], environ
+        )
+        return self._wrap_start_response(
+            start_response, self._session_cookie_header(environ, token)
+        )
+
     def send_basic_auth_response(self, environ, start_response):
-        realm = self.domain_controller.get_domain_realm(environ["PATH_INFO"], environ)
+        realm = self._get_realm(environ)
         _logger.debug(f"401 Not Authorized for realm {realm!r} (basic)")
         wwwauthheaders = f'Basic realm="{realm}"'
 
@@ -281,7 +444,7 @@ class HTTPAuthenticator(BaseMiddleware):
         return [body]
 
     def handle_basic_auth_request(self, environ, start_response):
-        realm = self.domain_controller.get_domain_realm(environ["PATH_INFO"], environ)
+        realm = self._get_realm(environ)
         auth_header = environ["HTTP_AUTHORIZATION"]
         auth_value = ""
         try:
@@ -293,10 +456,23 @@ class HTTPAuthenticator(BaseMiddleware):
         auth_value = util.to_str(auth_value)
         user_name, password = auth_value.split(":", 1)
 
-        if self.domain_controller.basic_auth_user(realm, user_name, password, environ):
+        dc = self.domain_controller
+        # Duck-typed domain controllers may not have a cache
+        auth_cache = getattr(dc, "auth_cache", None)
+        with util.timed_phase(environ, "auth"):
+            if auth_cache is not None and auth_cache.get(
+                realm, user_name, password, environ
+            ):
+                is_ok = True
+            else:
+                is_ok = dc.basic_auth_user(realm, user_name, password, environ)
+                if is_ok and auth_cache is not None:
+                    auth_cache.add(realm, user_name, password, environ)
+
+        if is_ok:
             environ["wsgidav.auth.realm"] = realm
             environ["wsgidav.auth.user_name"] = user_name
-            return self.next_app(environ, start_response)
+            return self.next_app(environ, self._start_session(environ, start_response))
 
         _logger.warning(
             f"Authentication (basic) failed for user {user_name!r}, realm {realm!r}."
@@ -304,7 +480,7 @@ class HTTPAuthenticator(BaseMiddleware):
         return self.send_basic_auth_response(environ, start_response)
 
     def send_digest_auth_response(self, environ, start_response):
-        realm = self.domain_controller.get_domain_realm(environ["PATH_INFO"], environ)
+        realm = self._get_realm(environ)
         random.seed()
         serverkey = hex(random.getrandbits(32))[2:]
         etagkey = calc_hexdigest(environ["PATH_INFO"])
@@ -334,7 +510,7 @@ class HTTPAuthenticator(BaseMiddleware):
         return [body]
 
     def handle_digest_auth_request(self, environ, start_response):
-        realm = self.domain_controller.get_domain_realm(environ["PATH_INFO"], environ)
+        realm = self._get_realm(environ)
 
         if not realm:
             raise DAVError(
@@ -537,7 +713,7 @@ class HTTPAuthenticator(BaseMiddleware):
 
         environ["wsgidav.auth.realm"] = realm
         environ["wsgidav.auth.user_name"] = req_username
-        return self.next_app(environ, start_response)
+        return self.next_app(environ, self._start_session(environ, start_response))
 
     def _compute_digest_response(
         self, realm, user_name, method, uri, nonce, cnonce, qop, nc, environ
@@ -567,7 +743,8 @@ class HTTPAuthenticator(BaseMiddleware):
         def md5kd(secret, data):
             return md5h(secret + ":" + data)
 
-        A1 = self.domain_controller.digest_auth_user(realm, user_name, environ)
+        with util.timed_phase(environ, "auth"):
+            A1 = self.domain_controller.digest_auth_user(realm, user_name, environ)
         if not A1:
             return False
 
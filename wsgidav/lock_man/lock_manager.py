@@ -36,6 +36,7 @@ The lock data model is a dictionary with these fields:
 
 """
 
+import logging
 import random
 import time
 from pprint import pformat
@@ -224,8 +225,7 @@ class LockManager:
         On error raise a DAVError with an embedded DAVErrorCondition.
         """
         url = normalize_lock_root(url)
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             # Raises DAVError on conflict:
             self._check_lock_permission(
                 url, lock_type, lock_scope, lock_depth, token_list, principal
@@ -233,8 +233,6 @@ class LockManager:
             return self._generate_lock(
                 principal, lock_type, lock_scope, lock_depth, lock_owner, url, timeout
             )
-        finally:
-            self._lock.release()
 
     def refresh(self, token, *, timeout=None):
         """Set new timeout for lock, if existing and valid."""
@@ -321,13 +319,10 @@ class LockManager:
         return lockUrl and util.is_equal_or_child_uri(lockUrl, url)
 
     def remove_all_locks_from_url(self, url, *, recursive=False):
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             lockList = self.get_url_lock_list(url, recursive=recursive)
             for lock in lockList:
                 self.release(lock["token"])
-        finally:
-            self._lock.release()
 
     def _check_lock_permission(
         self, url, lock_type, lock_scope, lock_depth, token_list, principal
@@ -368,21 +363,27 @@ class LockManager:
         assert lock_scope in ("shared", "exclusive")
         assert lock_depth in ("0", "infinity")
 
-        _logger.debug(
-            f"checkLockPermission({url}, {lock_scope}, {lock_depth}, {principal})"
-        )
+        debug = _logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            _logger.debug(
+                "checkLockPermission(%s, %s, %s, %s)",
+                url,
+                lock_scope,
+                lock_depth,
+                principal,
+            )
 
         # Error precondition to collect conflicting URLs
         errcond = DAVErrorCondition(PRECONDITION_CODE_LockConflict)
 
-        self._lock.acquire_read()
-        try:
+        with self._lock.read_locked():
             # Check url and all parents for conflicting locks
             u = url
             while u:
                 lock_list = self.get_url_lock_list(u)
                 for lock in lock_list:
-                    _logger.debug(f"    check parent {u}, {lock_string(lock)}")
+                    if debug:
+                        _logger.debug("    check parent %s, %s", u, lock_string(lock))
                     if u != url and lock["depth"] != "infinity":
                         # We only consider parents with Depth: infinity
                         continue
@@ -391,9 +392,10 @@ class LockManager:
                         # principal)
                         continue
                     # Lock conflict
-                    _logger.debug(
-                        f" -> DENIED due to locked parent {lock_string(lock)}"
-                    )
+                    if debug:
+                        _logger.debug(
+                            " -> DENIED due to locked parent %s", lock_string(lock)
+                        )
                     errcond.add_href(lock["root"])
                 u = util.get_uri_parent(u)
 
@@ -406,10 +408,11 @@ class LockManager:
                 for lock in child_ocks:
                     assert util.is_child_uri(url, lock["root"])
                     #                    if util.is_child_uri(url, lock["root"]):
-                    _logger.debug(f" -> DENIED due to locked child {lock_string(lock)}")
+                    if debug:
+                        _logger.debug(
+                            " -> DENIED due to locked child %s", lock_string(lock)
+                        )
                     errcond.add_href(lock["root"])
-        finally:
-            self._lock.release()
 
         # If there were conflicts, raise HTTP_LOCKED for <url>, and pass
         # conflicting resource with 'no-conflicting-lock' precondition
@@ -447,22 +450,29 @@ class LockManager:
         """
         assert util.is_str(url)
         assert depth in ("0", "infinity")
-        _logger.debug(
-            f"check_write_permission({url}, {depth}, {token_list}, {principal})"
-        )
+        debug = _logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            _logger.debug(
+                "check_write_permission(%s, %s, %s, %s)",
+                url,
+                depth,
+                token_list,
+                principal,
+            )
 
         # Error precondition to collect conflicting URLs
         errcond = DAVErrorCondition(PRECONDITION_CODE_LockConflict)
 
-        self._lock.acquire_read()
-        try:
+        with self._lock.read_locked():
             # Check url and all parents for conflicting locks
             u = url
             while u:
                 lock_list = self.get_url_lock_list(u)
-                _logger.debug(f"  checking {u}")
+                if debug:
+                    _logger.debug("  checking %s", u)
                 for lock in lock_list:
-                    _logger.debug(f"     lock={lock_string(lock)}")
+                    if debug:
+                        _logger.debug("     lock=%s", lock_string(lock))
                     if u != url and lock["depth"] != "infinity":
                         # We only consider parents with Depth: infinity
                         continue
@@ -471,9 +481,11 @@ class LockManager:
                         continue
                     else:
                         # Token is owned by principal, but not passed with lock list
-                        _logger.debug(
-                            f" -> DENIED due to locked parent {lock_string(lock)}"
-                        )
+                        if debug:
+                            _logger.debug(
+                                " -> DENIED due to locked parent %s",
+                                lock_string(lock),
+                            )
                         errcond.add_href(lock["root"])
                 u = util.get_uri_parent(u)
 
@@ -486,10 +498,11 @@ class LockManager:
                 for lock in child_ocks:
                     assert util.is_child_uri(url, lock["root"])
                     #                    if util.is_child_uri(url, lock["root"]):
-                    _logger.debug(f" -> DENIED due to locked child {lock_string(lock)}")
+                    if debug:
+                        _logger.debug(
+                            " -> DENIED due to locked child %s", lock_string(lock)
+                        )
                     errcond.add_href(lock["root"])
-        finally:
-            self._lock.release()
 
         # If there were conflicts, raise HTTP_LOCKED for <url>, and pass
         # conflicting resource with 'no-conflicting-lock' precondition
@@ -13,6 +13,7 @@ See :class:`~wsgidav.lock_man.lock_storage.LockStorageDict`
 See :class:`~wsgidav.lock_man.lock_storage.LockStorageShelve`
 """
 
+import logging
 import os
 import shelve
 import time
@@ -142,22 +143,20 @@ class LockStorageDict:
 
         Side effect: if lock is expired, it will be purged and None is returned.
         """
-        self._lock.acquire_read()
-        try:
+        with self._lock.read_locked():
             lock = self._dict.get(token)
             if lock is None:
                 # Lock not found: purge dangling URL2TOKEN entries
-                _logger.debug(f"Lock purged dangling: {token}")
+                _logger.debug("Lock purged dangling: %s", token)
                 self.delete(token)
                 return None
             expire = float(lock["expire"])
             if expire >= 0 and expire < time.time():
-                _logger.debug(f"Lock timed-out({expire}): {lock_string(lock)}")
+                if _logger.isEnabledFor(logging.DEBUG):
+                    _logger.debug("Lock timed-out(%s): %s", expire, lock_string(lock))
                 self.delete(token)
                 return None
             return lock
-        finally:
-            self._lock.release()
 
     def create(self, path, lock):
         """Create a direct lock for a resource path.
@@ -175,8 +174,7 @@ class LockStorageDict:
         - lock['timeout'] may be normalized and shorter than requested
         - lock['token'] is added
         """
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             # We expect only a lock definition, not an existing lock
             assert lock.get("token") is None
             assert lock.get("expire") is None, "Use timeout instead of expire"
@@ -216,10 +214,11 @@ class LockStorageDict:
                 tokList.append(token)
                 self._dict[key] = tokList
             self._flush()
-            _logger.debug(f"LockStorageDict.set({org_path!r}): {lock_string(lock)}")
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug(
+                    "LockStorageDict.set(%r): %s", org_path, lock_string(lock)
+                )
             return lock
-        finally:
-            self._lock.release()
 
     def refresh(self, token, *, timeout):
         """Modify an existing lock's timeout.
@@ -238,8 +237,7 @@ class LockStorageDict:
         if timeout < 0 or timeout > LockStorageDict.LOCK_TIME_OUT_MAX:
             timeout = LockStorageDict.LOCK_TIME_OUT_MAX
 
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             # Note: shelve dictionary returns copies, so we must reassign
             # values:
             lock = self._dict[token]
@@ -247,8 +245,6 @@ class LockStorageDict:
             lock["expire"] = time.time() + timeout
             self._dict[token] = lock
             self._flush()
-        finally:
-            self._lock.release()
         return lock
 
     def delete(self, token):
@@ -256,10 +252,10 @@ class LockStorageDict:
 
         Returns True on success. False, if token does not exist, or is expired.
         """
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             lock = self._dict.get(token)
-            _logger.debug(f"delete {lock_string(lock)}")
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug("delete %s", lock_string(lock))
             if lock is None:
                 return False
             # Remove url to lock mapping
@@ -278,8 +274,6 @@ class LockStorageDict:
             del self._dict[token]
 
             self._flush()
-        finally:
-            self._lock.release()
         return True
 
     def get_lock_list(self, path, *, include_root, include_children, token_only):
@@ -316,8 +310,7 @@ class LockStorageDict:
                         lockList.append(lock)
 
         path = normalize_lock_root(path)
-        self._lock.acquire_read()
-        try:
+        with self._lock.read_locked():
             key = f"URL2TOKEN:{path}"
             tokList = self._dict.get(key, [])
             lockList = []
@@ -330,8 +323,6 @@ class LockStorageDict:
                         __appendLocks(ltoks)
 
             return lockList
-        finally:
-            self._lock.release()
 
 
 # ========================================================================
@@ -354,16 +345,12 @@ class LockStorageShelve(LockStorageDict):
     def _flush(self):
         """Write persistent dictionary to disc."""
         _logger.debug("_flush()")
-        self._lock.acquire_write()  # TODO: read access is enough?
-        try:
+        with self._lock.write_locked():  # TODO: read access is enough?
             self._dict.sync()
-        finally:
-            self._lock.release()
 
     def clear(self):
         """Delete all entries."""
-        self._lock.acquire_write()  # TODO: read access is enough?
-        try:
+        with self._lock.write_locked():  # TODO: read access is enough?
             was_closed = self._dict is None
             if was_closed:
                 self.open()
@@ -372,8 +359,6 @@ class LockStorageShelve(LockStorageDict):
                 self._dict.sync()
             if was_closed:
                 self.close()
-        finally:
-            self._lock.release()
 
     def open(self):
         _logger.debug(f"open({self._storage_path!r})")
@@ -387,10 +372,7 @@ class LockStorageShelve(LockStorageDict):
 
     def close(self):
         _logger.debug("close()")
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             if self._dict is not None:
                 self._dict.close()
                 self._dict = None
-        finally:
-            self._lock.release()
@@ -2,7 +2,30 @@
 # Original PyFileServer (c) 2005 Ho Chun Wei.
 # Licensed under the MIT license:
 # http://www.opensource.org/licenses/mit-license.php
-import pickle
+"""
+Implements a lock storage provider for `LockManager` using redis.
+
+Locks are stored as JSON strings with a redis TTL::
+
+    wsgidav-lock:opaquelocktoken:0x1d7b86... -> '{"root": "/temp/litmus/lockme", ...}'
+
+All locked paths are kept in a single sorted set, where all members have
+score 0 and are sorted lexicographically::
+
+    wsgidav-lockpaths -> {'/temp/litmus/lockme\\x00opaquelocktoken:0x1d7b86...', ...}
+
+This allows to find the locks of a resource and all its children with
+``ZRANGEBYLEX`` prefix range scans (instead of scanning the whole key space).
+The locks are then fetched with a single ``MGET``, so even a subtree lock check
+needs only two round-trips.
+
+Index entries of expired locks are removed lazily, when they are found by
+a lookup or by :meth:`LockStorageRedis.cleanup`.
+
+See :class:`~wsgidav.lock_man.lock_manager.LockManager`
+"""
+
+import json
 import time
 
 import redis
@@ -17,12 +40,34 @@ from wsgidav.lock_man.lock_manager import (
 
 _logger = util.get_module_logger(__name__)
 
+#: Separates the path from the token in index entries. '\0' sorts before all
+#: other characters, so entries of '/a' are listed before entries of '/a/b'.
+_INDEX_SEP = "\x00"
+
+
+def _encode_lock(lock):
+    """Return a compact JSON representation of a lock dict."""
+    lock = lock.copy()
+    # `owner` is a XML bytestring (surrogateescape makes this loss-free)
+    lock["owner"] = lock["owner"].decode("utf-8", "surrogateescape")
+    return json.dumps(lock, separators=(",", ":"))
+
+
+def _decode_lock(data):
+    """Return a lock dict from a JSON string created by `_encode_lock()`."""
+    lock = json.loads(data)
+    lock["owner"] = lock["owner"].encode("utf-8", "surrogateescape")
+    return lock
+
 
 class LockStorageRedis:
     """
-    A (high performance?) lock manager implementation using redis!
+    A lock manager storage implementation using redis.
     """
 
+    LOCK_TIME_OUT_DEFAULT = 604800  # 1 week, in seconds
+    LOCK_TIME_OUT_MAX = 4 * 604800  # 1 month, in seconds
+
     def __init__(self, *, host="127.0.0.1", port=6379, db=0, password=None):
         super().__init__()
         self._redis_host = host
@@ -31,20 +76,17 @@ class LockStorageRedis:
         self._redis_password = password
         self._redis_prefix = "wsgidav-{}"
         self._redis_lock_prefix = self._redis_prefix.format("lock:{}")
-        self._redis_url2token_prefix = self._redis_prefix.format("URL2TOKEN:{}")
+        self._redis_index_key = self._redis_prefix.format("lockpaths")
         self._redis = None
 
-    LOCK_TIME_OUT_DEFAULT = 604800  # 1 week, in seconds
-    LOCK_TIME_OUT_MAX = 4 * 604800  # 1 month, in seconds
-
     def __repr__(self):
         return self.__class__.__name__
 
     # def __del__(self):
     #     pass
 
-    def _flush(self):
-        """Overloaded by Shelve implementation."""
+    def _lock_key(self, token):
+        return self._redis_lock_prefix.format(token)
 
     def open(self):
         """Called before first use.
@@ -63,14 +105,45 @@ class LockStorageRedis:
         self._redis = None
 
     def cleanup(self):
-        """Purge expired locks (optional)."""
+        """Purge index entries of expired locks."""
+        members = self._redis.zrange(self._redis_index_key, 0, -1)
+        self._fetch_locks(members)
 
     def clear(self):
         """Delete all entries."""
         if self._redis is not None:
-            keys = self._redis.keys(self._redis_prefix.format("*"))
-            for key in keys:
-                self._redis.delete(key)
+            pipe = self._redis.pipeline(transaction=False)
+            for key in self._redis.scan_iter(match=self._redis_prefix.format("*")):
+                pipe.delete(key)
+            pipe.execute()
+
+    def _fetch_locks(self, members):
+        """Return valid locks for a list of index members.
+
+        Index entries that point to expired or missing locks are purged.
+        """
+        if not members:
+            return []
+        members = [m.decode("utf-8") for m in members]
+        tokens = [m.partition(_INDEX_SEP)[2] for m in members]
+        values = self._redis.mget([self._lock_key(t) for t in tokens])
+        now = time.time()
+        lock_list = []
+        dangling = []
+        for member, value in zip(members, values):
+            if value is None:
+                dangling.append(member)
+                continue
+            lock = _decode_lock(value)
+            if 0 <= lock["expire"] < now:
+                _logger.debug(f"Lock timed-out({lock['expire']}): {lock_string(lock)}")
+                dangling.append(member)
+                continue
+            lock_list.append(lock)
+        if dangling:
+            _logger.debug(f"Purging {len(dangling)} dangling lock index entries")
+            self._redis.zrem(self._redis_index_key, *dangling)
+        return lock_list
 
     def get(self, token):
         """Return a lock dictionary for a token.
@@ -81,13 +154,13 @@ class LockStorageRedis:
             Lock dictionary or <None>
         Side effect: if lock is expired, it will be purged and None is returned.
         """
-        lock = self._redis.get(self._redis_lock_prefix.format(token))
+        lock = self._redis.get(self._lock_key(token))
         if lock is None:
-            # Lock not found: purge dangling URL2TOKEN entries
-            _logger.debug(f"Lock purged dangling: {token}")
-            self.delete(token)
+            # Lock not found (the index entry is purged by the next lookup
+            # of its path)
+            _logger.debug(f"Lock not found: {token}")
             return None
-        lock = pickle.loads(lock)
+        lock = _decode_lock(lock)
         expire = float(lock["expire"])
         if 0 <= expire < time.time():
             _logger.debug(f"Lock timed-out({expire}): {lock_string(lock)}")
@@ -133,18 +206,12 @@ class LockStorageRedis:
         token = generate_lock_token()
         lock["token"] = token
 
-        # Store lock
-        self._redis.set(
-            self._redis_lock_prefix.format(token), pickle.dumps(lock), ex=int(timeout)
-        )
+        # Store lock and locked path reference in one atomic round-trip
+        pipe = self._redis.pipeline()
+        pipe.set(self._lock_key(token), _encode_lock(lock), px=int(timeout * 1000))
+        pipe.zadd(self._redis_index_key, {f"{path}{_INDEX_SEP}{token}": 0})
+        pipe.execute()
 
-        # Store locked path reference
-        key = self._redis_url2token_prefix.format(path)
-        if not self._redis.exists(key):
-            self._redis.lpush(key, token)
-        else:
-            self._redis.lpush(key, token)
-        self._flush()
         _logger.debug(f"LockStorageRedis.set({org_path!r}): {lock_string(lock)}")
         return lock
 
@@ -159,36 +226,34 @@ class LockStorageRedis:
             Lock dictionary.
             Raises ValueError, if token is invalid.
         """
-        assert self._redis.exists(self._redis_lock_prefix.format(token))
         assert timeout == -1 or timeout > 0
         if timeout < 0 or timeout > LockStorageRedis.LOCK_TIME_OUT_MAX:
             timeout = LockStorageRedis.LOCK_TIME_OUT_MAX
 
-        # Note: shelve dictionary returns copies, so we must reassign
-        # values:
-        lock = pickle.loads(self._redis.get(self._redis_lock_prefix.format(token)))
+        key = self._lock_key(token)
+        lock = self._redis.get(key)
+        assert lock is not None, "Lock must exist"
+        lock = _decode_lock(lock)
         lock["timeout"] = timeout
         lock["expire"] = time.time() + timeout
-        self._redis.set(
-            self._redis_lock_prefix.format(token), pickle.dumps(lock), ex=int(timeout)
-        )
-        self._flush()
+        self._redis.set(key, _encode_lock(lock), px=int(timeout * 1000))
         return lock
 
     def delete(self, token):
         """Delete lock.
         Returns True on success. False, if token does not exist, or is expired.
         """
-        lock = self._redis.get(self._redis_lock_prefix.format(token))
+        key = self._lock_key(token)
+        lock = self._redis.get(key)
         if lock is None:
             return False
-        lock = pickle.loads(lock)
+        lock = _decode_lock(lock)
         _logger.debug(f"delete {lock_string(lock)}")
-        # Remove url to lock mapping
-        key = self._redis_url2token_prefix.format(lock.get("root"))
-        self._redis.lrem(key, 1, token)
-        self._redis.delete(self._redis_lock_prefix.format(token))
-        self._flush()
+        # Remove url to lock mapping and the lock itself
+        pipe = self._redis.pipeline()
+        pipe.zrem(self._redis_index_key, f"{lock['root']}{_INDEX_SEP}{token}")
+        pipe.delete(key)
+        pipe.execute()
         return True
 
     def get_lock_list(self, path, *, include_root, include_children, token_only):
@@ -211,28 +276,28 @@ class LockStorageRedis:
         assert path and path.startswith("/")
         assert include_root or include_children
 
-        def __appendLocks(toklist):
-            # Since we can do this quickly, we use self.get() even if
-            # token_only is set, so expired locks are purged.
-            for token in map(lambda x: x.decode("utf-8"), toklist):
-                lock = self._redis.get(self._redis_lock_prefix.format(token))
-                if lock:
-                    lock = pickle.loads(lock)
-                    if token_only:
-                        lockList.append(lock["token"])
-                    else:
-                        lockList.append(lock)
-
         path = normalize_lock_root(path)
-        key = self._redis_url2token_prefix.format(path)
-
-        tokList = self._redis.lrange(key, 0, -1)
-        lockList = []
-        if include_root:
-            __appendLocks(tokList)
-
-        if include_children:
-            for u in map(lambda x: x.decode("utf-8"), self._redis.keys(key + "/*")):
-                if util.is_child_uri(key, u):
-                    __appendLocks(self._redis.lrange(u, 0, -1))
-        return lockList
+        index_key = self._redis_index_key
+
+        if path == "/" and include_children:
+            # The children range of '/' also contains the root entries
+            members = self._redis.zrangebylex(index_key, "[/", "(0")
+            if not include_root:
+                root_entry = f"/{_INDEX_SEP}".encode()
+                members = [m for m in members if not m.startswith(root_entry)]
+        else:
+            pipe = self._redis.pipeline(transaction=False)
+            if include_root:
+                # All entries '<path>\0<token>'
+                pipe.zrangebylex(index_key, f"[{path}{_INDEX_SEP}", f"({path}\x01")
+            if include_children:
+                # All entries '<path>/...'  ('0' is the character after '/')
+                pipe.zrangebylex(index_key, f"[{path}/", f"({path}0")
+            members = []
+            for res in pipe.execute():
+                members.extend(res)
+
+        lock_list = self._fetch_locks(members)
+        if token_only:
+            return [lock["token"] for lock in lock_list]
+        return lock_list
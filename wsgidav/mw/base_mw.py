@@ -20,6 +20,8 @@ class BaseMiddleware(ABC):
 
         wsgidav.dir_browser.WsgiDavDirBrowser
         wsgidav.mw.debug_filter.WsgiDavDebugFilter
+        wsgidav.mw.metrics.MetricsMiddleware
+        wsgidav.mw.profiler.ProfilerMiddleware
         wsgidav.error_printer.ErrorPrinter
         wsgidav.http_authenticator.HTTPAuthenticator
         wsgidav.request_resolver.RequestResolver
@@ -0,0 +1,420 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""
+WSGI middleware that collects runtime metrics (optional).
+
+Requests are counted per method, share, and response status. Durations are
+recorded in histograms, request and response bodies are summed up.
+The numbers are served in the `Prometheus text format
+<https://prometheus.io/docs/instrumenting/exposition_formats/>`_ on a
+configurable path (default: ``/:metrics``), for example::
+
+    wsgidav_requests_total{method="PROPFIND",share="/",status="207"} 1834
+
+This middleware is the first item of the stack, so it is called *before*
+authentication. Therefore the metrics are only served to clients that send
+``Authorization: Bearer <metrics.token>``, unless ``metrics.allow_anonymous``
+is set. Without a token, the endpoint is denied (403).
+Set ``metrics.path`` to ``null`` to only collect the numbers (e.g. for
+:meth:`MetricsMiddleware.render`) and pass the path to the WebDAV share.
+
+The hot path only takes a timestamp and updates a few counters under a lock.
+Response chunks are only counted if there is no Content-Length header.
+Gauges that are more expensive to compute (number of locks, size of the
+property store) are evaluated when the metrics are requested.
+"""
+
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from itertools import chain
+
+from wsgidav import util
+from wsgidav.dav_error import HTTP_FORBIDDEN, HTTP_UNAUTHORIZED, DAVError
+from wsgidav.mw.base_mw import BaseMiddleware
+
+__docformat__ = "reStructuredText"
+
+_logger = util.get_module_logger(__name__)
+
+#: Default upper bounds of the request duration histogram (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+#: Methods that are reported with their own label (others are 'OTHER')
+KNOWN_METHODS = frozenset(
+    (
+        "COPY",
+        "DELETE",
+        "GET",
+        "HEAD",
+        "LOCK",
+        "MKCOL",
+        "MOVE",
+        "OPTIONS",
+        "POST",
+        "PROPFIND",
+        "PROPPATCH",
+        "PUT",
+        "UNLOCK",
+    )
+)
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    return ",".join(f'{n}="{_escape_label(v)}"' for n, v in zip(names, values))
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class _Histogram:
+    """Bucket counts, sum, and count of observed durations for one label set."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size):
+        #: Non-cumulative counts, the last entry is the '+Inf' bucket
+        self.counts = [0] * (size + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class _ResponseIterator:
+    """Pass the chunks of `app_iter` through and call `done(bytes_out)` on close.
+
+    Inner middleware may call start_response() lazily, so the Content-Length
+    header is checked after the first chunk. Only if there is none, the
+    chunks are counted.
+    """
+
+    __slots__ = ("_app_iter", "_get_size", "_done", "_bytes_out")
+
+    def __init__(self, app_iter, get_size, done):
+        self._app_iter = app_iter
+        self._get_size = get_size
+        self._done = done
+        self._bytes_out = 0
+
+    def __iter__(self):
+        it = iter(self._app_iter)
+        for first in it:
+            it = chain((first,), it)
+            size = self._get_size()
+            if size is None:
+                return self._count_chunks(it)
+            self._bytes_out = size
+            break
+        return it
+
+    def _count_chunks(self, it):
+        for chunk in it:
+            self._bytes_out += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self._app_iter, "close"):
+                self._app_iter.close()
+        finally:
+            self._done(self._bytes_out)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Collect request metrics and serve them in Prometheus text format."""
+
+    def __init__(self, wsgidav_app, next_app, config):
+        super().__init__(wsgidav_app, next_app, config)
+        opts = util.get_dict_value(config, "metrics", as_dict=True)
+        self.path = opts.get("path", "/:metrics")
+        if self.path and not self.path.startswith("/"):
+            raise ValueError(f"metrics.path must start with '/': {self.path!r}")
+        self.token = opts.get("token") or None
+        self.allow_anonymous = bool(opts.get("allow_anonymous", False))
+        if self.path and not self.token and not self.allow_anonymous:
+            _logger.warning(
+                "Access to %r is denied: set metrics.token (or allow_anonymous).",
+                self.path,
+            )
+        self.mount_path = config.get("mount_path") or ""
+        self.buckets = tuple(sorted(float(b) for b in opts.get("buckets") or ()))
+        if not self.buckets:
+            self.buckets = DEFAULT_BUCKETS
+
+        self._lock = threading.Lock()
+        self.active = 0
+        #: (method, share, status) -> count
+        self._requests = {}
+        #: (method, share) -> _Histogram
+        self._durations = {}
+        #: (method, share) -> bytes
+        self._bytes_in = {}
+        self._bytes_out = {}
+        self._start_time = time.time()
+
+    def __repr__(self):
+        return f"{self.__module__}.{self.__class__.__name__}({self.path!r})"
+
+    def is_disabled(self):
+        """Optionally return True to skip this module on startup."""
+        return not self.get_config("metrics.enable", False)
+
+    def _get_share_label(self, provider):
+        """Return the configured share (or share template) of a provider."""
+        if provider is None:
+            return ""
+        share = provider.share_path or "/"
+        if share in self.wsgidav_app.provider_map:
+            return share
+        # Label on-demand providers by their template to limit cardinality
+        for dynamic_share in self.wsgidav_app.dynamic_shares:
+            if dynamic_share.match(share):
+                return dynamic_share.template
+        return share
+
+    def __call__(self, environ, start_response):
+        path = environ["SCRIPT_NAME"] + environ["PATH_INFO"]
+        if self.mount_path:
+            path = util.removeprefix(path, self.mount_path)
+        if (
+            self.path
+            and path == self.path
+            and environ["REQUEST_METHOD"] in ("GET", "HEAD")
+        ):
+            return self._send_metrics(environ, start_response)
+
+        return self._handle_request(environ, start_response)
+
+    def _handle_request(self, environ, start_response):
+        start = time.perf_counter()
+        method = environ["REQUEST_METHOD"]
+        if method not in KNOWN_METHODS:
+            method = "OTHER"
+        status_code = "000"
+        content_length = None
+
+        def _start_response(status, response_headers, exc_info=None):
+            nonlocal status_code, content_length
+            status_code = status[:3]
+            for name, value in response_headers:
+                if name.lower() == "content-length":
+                    content_length = value
+            return start_response(status, response_headers, exc_info)
+
+        def _get_size():
+            """Return the response size from the headers (None: unknown)."""
+            if method == "HEAD":
+                return 0
+            try:
+                return int(content_length)
+            except (TypeError, ValueError):
+                return None
+
+        def _done(bytes_out):
+            elapsed = time.perf_counter() - start
+            share = self._get_share_label(environ.get("wsgidav.provider"))
+            try:
+                bytes_in = int(environ.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                bytes_in = 0
+            self._record(method, share, status_code, elapsed, bytes_in, bytes_out)
+
+        with self._lock:
+            self.active += 1
+        try:
+            app_iter = self.next_app(environ, _start_response)
+        except BaseException:
+            _done(0)
+            raise
+        return _ResponseIterator(app_iter, _get_size, _done)
+
+    def _record(self, method, share, status_code, elapsed, bytes_in, bytes_out):
+        key = (method, share)
+        with self._lock:
+            self.active -= 1
+            req_key = (method, share, status_code)
+            self._requests[req_key] = self._requests.get(req_key, 0) + 1
+
+            hist = self._durations.get(key)
+            if hist is None:
+                hist = self._durations[key] = _Histogram(len(self.buckets))
+            hist.counts[bisect_left(self.buckets, elapsed)] += 1
+            hist.sum += elapsed
+            hist.count += 1
+
+            self._bytes_in[key] = self._bytes_in.get(key, 0) + bytes_in
+            self._bytes_out[key] = self._bytes_out.get(key, 0) + bytes_out
+
+    def _get_lock_count(self):
+        lock_manager = self.wsgidav_app.lock_manager
+        if lock_manager is None:
+            return None
+        try:
+            return len(
+                lock_manager.storage.get_lock_list(
+                    "/", include_root=True, include_children=True, token_only=True
+                )
+            )
+        except Exception as e:
+            _logger.warning(f"Could not count locks: {e}")
+            return None
+
+    def _get_property_store_size(self):
+        prop_manager = self.wsgidav_app.prop_manager
+        # Only the built-in dict- and shelve-based managers are supported
+        store = getattr(prop_manager, "_dict", None)
+        if store is None:
+            return None
+        return len(store)
+
+    def render(self):
+        """Return the current metrics in Prometheus text format (str)."""
+        lines = []
+
+        def _add(name, mtype, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {mtype}")
+            for suffix, labels, value in samples:
+                labels = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}{suffix}{labels} {_format_value(value)}")
+
+        with self._lock:
+            active = self.active
+            requests = dict(self._requests)
+            durations = {
+                k: (list(h.counts), h.sum, h.count) for k, h in self._durations.items()
+            }
+            bytes_in = dict(self._bytes_in)
+            bytes_out = dict(self._bytes_out)
+
+        _add(
+            "wsgidav_requests_total",
+            "counter",
+            "Number of handled requests.",
+            [
+                ("", _format_labels(("method", "share", "status"), k), v)
+                for k, v in sorted(requests.items())
+            ],
+        )
+
+        samples = []
+        for key, (counts, total, count) in sorted(durations.items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                labels = _format_labels(
+                    ("method", "share", "le"), (*key, _format_value(bound))
+                )
+                samples.append(("_bucket", labels, cumulative))
+            labels = _format_labels(("method", "share"), key)
+            samples.append(("_sum", labels, round(total, 6)))
+            samples.append(("_count", labels, count))
+        _add(
+            "wsgidav_request_duration_seconds",
+            "histogram",
+            "Time until the response was sent completely.",
+            samples,
+        )
+
+        _add(
+            "wsgidav_request_bytes_total",
+            "counter",
+            "Size of request bodies (according to Content-Length).",
+            [
+                ("", _format_labels(("method", "share"), k), v)
+                for k, v in sorted(bytes_in.items())
+            ],
+        )
+        _add(
+            "wsgidav_response_bytes_total",
+            "counter",
+            "Size of response bodies.",
+            [
+                ("", _format_labels(("method", "share"), k), v)
+                for k, v in sorted(bytes_out.items())
+            ],
+        )
+        _add(
+            "wsgidav_requests_active",
+            "gauge",
+            "Number of requests in progress.",
+            [("", "", active)],
+        )
+
+        lock_count = self._get_lock_count()
+        if lock_count is not None:
+            _add(
+                "wsgidav_locks",
+                "gauge",
+                "Number of active locks.",
+                [("", "", lock_count)],
+            )
+
+        prop_count = self._get_property_store_size()
+        if prop_count is not None:
+            _add(
+                "wsgidav_property_store_resources",
+                "gauge",
+                "Number of resources with dead properties.",
+                [("", "", prop_count)],
+            )
+
+        _add(
+            "wsgidav_start_time_seconds",
+            "gauge",
+            "Start time of the application since unix epoch.",
+            [("", "", round(self._start_time, 3))],
+        )
+        lines.append("")
+        return "\n".join(lines)
+
+    def _is_authorized(self, environ):
+        """Return True, if the request may read the metrics."""
+        if self.allow_anonymous:
+            return True
+        if not self.token:
+            return False
+        auth = environ.get("HTTP_AUTHORIZATION", "")
+        scheme, _, token = auth.partition(" ")
+        if scheme.lower() != "bearer":
+            return False
+        return hmac.compare_digest(token.strip().encode(), self.token.encode())
+
+    def _send_metrics(self, environ, start_response):
+        if not self._is_authorized(environ):
+            is_head = environ["REQUEST_METHOD"] == "HEAD"
+            if not self.token:
+                return util.send_status_response(
+                    environ, start_response, DAVError(HTTP_FORBIDDEN), is_head=is_head
+                )
+            return util.send_status_response(
+                environ,
+                start_response,
+                DAVError(HTTP_UNAUTHORIZED),
+                add_headers=[("WWW-Authenticate", 'Bearer realm="metrics"')],
+                is_head=is_head,
+            )
+
+        body = self.render().encode("utf-8")
+        start_response(
+            "200 OK",
+            [
+                ("Content-Type", "text/plain; version=0.0.4; charset=utf-8"),
+                ("Content-Length", str(len(body))),
+                ("Cache-Control", "no-store"),
+                ("Date", util.get_rfc1123_time()),
+            ],
+        )
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return [b""]
+        return [body]
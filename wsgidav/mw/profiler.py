@@ -0,0 +1,170 @@
+# (c) 2009-2024 Martin Wendt and contributors; see WsgiDAV https://github.com/mar10/wsgidav
+# Licensed under the MIT license:
+# http://www.opensource.org/licenses/mit-license.php
+"""
+WSGI middleware that profiles selected requests (optional).
+
+A request is profiled with :mod:`cProfile`, if
+
+- it is randomly selected (option ``profiler.sample_rate``, e.g. 0.01 for
+  1% of all requests), or
+- its method is listed in ``profiler.methods``, or
+- its path matches one of the ``profiler.paths`` patterns (fnmatch syntax), or
+- it has a ``profiler.header`` request header, e.g. ``X-WsgiDAV-Profile: 1``.
+
+The result is written as pstats file to ``profiler.output_dir``. Only the
+newest ``profiler.max_files`` files are kept.
+The files can be inspected with :mod:`pstats`, or converted to flame graphs,
+e.g. with `flameprof <https://github.com/baverman/flameprof>`_ or
+`snakeviz <https://jiffyclub.github.io/snakeviz/>`_.
+
+Only one request is profiled at a time. Requests that would be profiled while
+another profile is running are passed through unchanged, so the overhead stays
+bounded.
+"""
+
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from cProfile import Profile
+from fnmatch import fnmatch
+
+from wsgidav import util
+from wsgidav.mw.base_mw import BaseMiddleware
+
+__docformat__ = "reStructuredText"
+
+_logger = util.get_module_logger(__name__)
+
+#: Extension of the pstats files written by the profiler
+PROFILE_EXT = ".prof"
+
+
+class ProfilerMiddleware(BaseMiddleware):
+    """Profile a sample of requests and write pstats files."""
+
+    def __init__(self, wsgidav_app, next_app, config):
+        super().__init__(wsgidav_app, next_app, config)
+        opts = util.get_dict_value(config, "profiler", as_dict=True)
+        self.sample_rate = float(opts.get("sample_rate") or 0)
+        self.methods = {m.upper() for m in util.to_set(opts.get("methods"))}
+        self.paths = list(opts.get("paths") or ())
+        header = opts.get("header")
+        self.header_key = "HTTP_" + header.upper().replace("-", "_") if header else None
+        self.max_files = max(1, int(opts.get("max_files") or 100))
+        self.output_dir = opts.get("output_dir") or os.path.join(
+            tempfile.gettempdir(), "wsgidav-profiles"
+        )
+        #: Held while a request is profiled
+        self._profile_lock = threading.Lock()
+        self._files = None
+        self._files_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__module__}.{self.__class__.__name__}({self.output_dir!r})"
+
+    def is_disabled(self):
+        """Optionally return True to skip this module on startup."""
+        return not self.get_config("profiler.enable", False)
+
+    def is_selected(self, environ):
+        """Return True if the request should be profiled."""
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if environ["REQUEST_METHOD"] in self.methods:
+            return True
+        if self.header_key and environ.get(self.header_key):
+            return True
+        if self.paths:
+            path = environ["SCRIPT_NAME"] + environ["PATH_INFO"]
+            return any(fnmatch(path, pattern) for pattern in self.paths)
+        return False
+
+    def __call__(self, environ, start_response):
+        if not self.is_selected(environ):
+            return self.next_app(environ, start_response)
+        return self._profile_request(environ, start_response)
+
+    def _profile_request(self, environ, start_response):
+        """Run the request with an active profiler.
+
+        The profiler is paused while response chunks are passed to the server,
+        so only the time spent in the application is recorded.
+        """
+        profile = None
+        acquired = self._profile_lock.acquire(blocking=False)
+        if acquired:
+            profile = Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Another profiling tool is already active
+                _logger.warning(f"Could not start profiler: {e}")
+                profile = None
+        else:
+            _logger.debug("Profiler busy: not profiling this request.")
+        start = time.perf_counter()
+        app_iter = None
+        try:
+            app_iter = self.next_app(environ, start_response)
+            for chunk in app_iter:
+                if profile:
+                    profile.disable()
+                yield chunk
+                if profile:
+                    profile.enable()
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+            if profile:
+                profile.disable()
+            if acquired:
+                self._profile_lock.release()
+            if profile:
+                self._write_profile(profile, environ, time.perf_counter() - start)
+
+    def _get_file_name(self, environ, elapsed):
+        path = environ["SCRIPT_NAME"] + environ["PATH_INFO"]
+        path = re.sub(r"[^\w.-]+", "_", path).strip("_")[:60] or "root"
+        now = time.time()
+        return "{}-{:03}-{}-{}-{}ms{}".format(
+            time.strftime("%Y%m%d-%H%M%S", time.localtime(now)),
+            int(now * 1000) % 1000,
+            environ["REQUEST_METHOD"],
+            path,
+            int(elapsed * 1000),
+            PROFILE_EXT,
+        )
+
+    def _write_profile(self, profile, environ, elapsed):
+        with self._files_lock:
+            if self._files is None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                # Also rotate files of previous runs
+                self._files = deque(
+                    sorted(
+                        os.path.join(self.output_dir, name)
+                        for name in os.listdir(self.output_dir)
+                        if name.endswith(PROFILE_EXT)
+                    )
+                )
+            file_path = os.path.join(
+                self.output_dir, self._get_file_name(environ, elapsed)
+            )
+            try:
+                profile.dump_stats(file_path)
+            except OSError as e:
+                _logger.error(f"Could not write profile {file_path!r}: {e}")
+                return
+            self._files.append(file_path)
+            while len(self._files) > self.max_files:
+                old_path = self._files.popleft()
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+        _logger.info(f"Wrote profile {file_path!r} ({elapsed:.3f} sec).")
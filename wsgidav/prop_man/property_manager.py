@@ -68,24 +68,18 @@ class PropertyManager:
 
     def _lazy_open(self):
         _logger.debug("_lazy_open()")
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             self._dict = {}
             self._loaded = True
-        finally:
-            self._lock.release()
 
     def _sync(self):
         pass
 
     def _close(self):
         _logger.debug("_close()")
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             self._dict = None
             self._loaded = False
-        finally:
-            self._lock.release()
 
     def _check(self, msg=""):
         try:
@@ -118,9 +112,8 @@ class PropertyManager:
             _logger.error(f"PropertyManager._dump()  ERROR: {e}")
 
     def get_properties(self, norm_url, environ=None):
-        _logger.debug(f"get_properties({norm_url})")
-        self._lock.acquire_read()
-        try:
+        _logger.debug("get_properties(%s)", norm_url)
+        with self._lock.read_locked():
             if not self._loaded:
                 self._lazy_open()
             returnlist = []
@@ -128,13 +121,10 @@ class PropertyManager:
                 for propdata in self._dict[norm_url].keys():
                     returnlist.append(propdata)
             return returnlist
-        finally:
-            self._lock.release()
 
     def get_property(self, norm_url, name, environ=None):
-        _logger.debug(f"get_property({norm_url}, {name})")
-        self._lock.acquire_read()
-        try:
+        _logger.debug("get_property(%s, %s)", norm_url, name)
+        with self._lock.read_locked():
             if not self._loaded:
                 self._lazy_open()
             if norm_url not in self._dict:
@@ -147,8 +137,6 @@ class PropertyManager:
                 _logger.exception(f"get_property({norm_url}, {name}) failed : {e}")
                 raise
             return resourceprops.get(name)
-        finally:
-            self._lock.release()
 
     def write_property(
         self, norm_url, name, property_value, dry_run=False, environ=None
@@ -158,13 +146,16 @@ class PropertyManager:
         assert property_value is not None
 
         _logger.debug(
-            f"write_property({norm_url}, {name}, dry_run={dry_run}):\n\t{property_value}"
+            "write_property(%s, %s, dry_run=%s):\n\t%s",
+            norm_url,
+            name,
+            dry_run,
+            property_value,
         )
         if dry_run:
             return  # TODO: can we check anything here?
 
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             if not self._loaded:
                 self._lazy_open()
             if norm_url in self._dict:
@@ -177,19 +168,16 @@ class PropertyManager:
             self._sync()
             if __debug__ and self._verbose >= 4:
                 self._check()
-        finally:
-            self._lock.release()
 
     def remove_property(self, norm_url, name, dry_run=False, environ=None):
         """
         Specifying the removal of a property that does not exist is NOT an error.
         """
-        _logger.debug(f"remove_property({norm_url}, {name}, dry_run={dry_run})")
+        _logger.debug("remove_property(%s, %s, dry_run=%s)", norm_url, name, dry_run)
         if dry_run:
             # TODO: can we check anything here?
             return
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             if not self._loaded:
                 self._lazy_open()
             if norm_url in self._dict:
@@ -202,25 +190,19 @@ class PropertyManager:
                     self._sync()
             if __debug__ and self._verbose >= 4:
                 self._check()
-        finally:
-            self._lock.release()
 
     def remove_properties(self, norm_url, environ=None):
-        _logger.debug(f"remove_properties({norm_url})")
-        self._lock.acquire_write()
-        try:
+        _logger.debug("remove_properties(%s)", norm_url)
+        with self._lock.write_locked():
             if not self._loaded:
                 self._lazy_open()
             if norm_url in self._dict:
                 del self._dict[norm_url]
                 self._sync()
-        finally:
-            self._lock.release()
 
     def copy_properties(self, src_url, dest_url, environ=None):
-        _logger.debug(f"copy_properties({src_url}, {dest_url})")
-        self._lock.acquire_write()
-        try:
+        _logger.debug("copy_properties(%s, %s)", src_url, dest_url)
+        with self._lock.write_locked():
             if __debug__ and self._verbose >= 4:
                 self._check()
             if not self._loaded:
@@ -230,13 +212,10 @@ class PropertyManager:
                 self._sync()
             if __debug__ and self._verbose >= 4:
                 self._check("after copy")
-        finally:
-            self._lock.release()
 
     def move_properties(self, src_url, dest_url, with_children, environ=None):
-        _logger.debug(f"move_properties({src_url}, {dest_url}, {with_children})")
-        self._lock.acquire_write()
-        try:
+        _logger.debug("move_properties(%s, %s, %s)", src_url, dest_url, with_children)
+        with self._lock.write_locked():
             if __debug__ and self._verbose >= 4:
                 self._check()
             if not self._loaded:
@@ -255,8 +234,6 @@ class PropertyManager:
             self._sync()
             if __debug__ and self._verbose >= 4:
                 self._check("after move")
-        finally:
-            self._lock.release()
 
 
 # ========================================================================
@@ -278,8 +255,7 @@ class ShelvePropertyManager(PropertyManager):
 
     def _lazy_open(self):
         _logger.debug(f"_lazy_open({self._storage_path})")
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             # Test again within the critical section
             if self._loaded:
                 return True
@@ -290,34 +266,25 @@ class ShelvePropertyManager(PropertyManager):
             if __debug__ and self._verbose >= 4:
                 self._check("After shelve.open()")
                 self._dump("After shelve.open()")
-        finally:
-            self._lock.release()
 
     def _sync(self):
         """Write persistent dictionary to disc."""
         _logger.debug("_sync()")
-        self._lock.acquire_write()  # TODO: read access is enough?
-        try:
+        with self._lock.write_locked():  # TODO: read access is enough?
             if self._loaded:
                 self._dict.sync()
-        finally:
-            self._lock.release()
 
     def _close(self):
         _logger.debug("_close()")
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             if self._loaded:
                 self._dict.close()
                 self._dict = None
                 self._loaded = False
-        finally:
-            self._lock.release()
 
     def clear(self):
         """Delete all entries."""
-        self._lock.acquire_write()
-        try:
+        with self._lock.write_locked():
             was_closed = self._dict is None
             if was_closed:
                 self.open()
@@ -326,5 +293,3 @@ class ShelvePropertyManager(PropertyManager):
                 self._dict.sync()
             if was_closed:
                 self.close()
-        finally:
-            self._lock.release()
@@ -6,6 +6,7 @@
 WSGI application that handles one single WebDAV request.
 """
 
+from functools import lru_cache
 from urllib.parse import unquote, urlparse
 
 from wsgidav import util, xml_tools
@@ -31,7 +32,7 @@ from wsgidav.dav_error import (
     as_DAVError,
     get_http_status_string,
 )
-from wsgidav.util import checked_etag, etree
+from wsgidav.util import checked_etag
 
 __docformat__ = "reStructuredText"
 
@@ -39,6 +40,61 @@ _logger = util.get_module_logger(__name__)
 
 DEFAULT_BLOCK_SIZE = 8192
 
+#: Number of distinct PROPFIND request bodies that are parsed only once
+PROPFIND_CACHE_SIZE = 256
+#: Larger PROPFIND request bodies are parsed every time
+PROPFIND_CACHE_MAX_BODY_SIZE = 4096
+
+
+def get_propfind_request(requestEL):
+    """Return (mode, name tuple) for a parsed PROPFIND request body.
+
+    mode is 'allprop', 'name', or 'named' (names are in Clark Notation).
+    Raise HTTP_BAD_REQUEST for an invalid request.
+    """
+    if requestEL.tag != "{DAV:}propfind":
+        util.fail(HTTP_BAD_REQUEST)
+
+    propNameList = []
+    propFindMode = None
+    for pfnode in requestEL:
+        if pfnode.tag == "{DAV:}allprop":
+            if propFindMode:
+                # RFC: allprop and name are mutually exclusive
+                util.fail(HTTP_BAD_REQUEST)
+            propFindMode = "allprop"
+        # TODO: implement <include> option
+        #            elif pfnode.tag == "{DAV:}include":
+        #                if not propFindMode in (None, "allprop"):
+        #                    self._fail(HTTP_BAD_REQUEST,
+        #                        "<include> element is only valid with 'allprop'.")
+        #                for pfpnode in pfnode:
+        #                    propNameList.append(pfpnode.tag)
+        elif pfnode.tag == "{DAV:}name":
+            if propFindMode:  # RFC: allprop and name are mutually exclusive
+                util.fail(HTTP_BAD_REQUEST)
+            propFindMode = "name"
+        elif pfnode.tag == "{DAV:}prop":
+            # RFC: allprop and name are mutually exclusive
+            if propFindMode not in (None, "named"):
+                util.fail(HTTP_BAD_REQUEST)
+            propFindMode = "named"
+            for pfpnode in pfnode:
+                propNameList.append(pfpnode.tag)
+
+    return propFindMode, tuple(propNameList)
+
+
+@lru_cache(maxsize=PROPFIND_CACHE_SIZE)
+def _parse_propfind_body(requestbody):
+    """Cached version of `get_propfind_request()` for a raw request body.
+
+    Most clients send one of a few fixed PROPFIND bodies, so we can skip XML
+    parsing for them. The key is the body itself (bytes cache their hash),
+    invalid bodies raise and are not cached.
+    """
+    return get_propfind_request(util.parse_xml_bytes(requestbody))
+
 
 # ========================================================================
 # RequestServer
@@ -49,6 +105,7 @@ class RequestServer:
         self.allow_propfind_infinite = True
         self._verbose = 3
         self.block_size = DEFAULT_BLOCK_SIZE
+        self.xml_writer = None
         # _logger.debug("RequestServer: __init__")
 
         self._possible_methods = ["OPTIONS", "HEAD", "GET", "PROPFIND"]
@@ -84,6 +141,7 @@ class RequestServer:
         self.block_size = environ["wsgidav.config"].get(
             "block_size", DEFAULT_BLOCK_SIZE
         )
+        self.xml_writer = environ["wsgidav.config"].get("xml_writer")
 
         # Convert 'infinity' and 'T'/'F' to a common case
         if environ.get("HTTP_DEPTH") is not None:
@@ -171,19 +229,25 @@ class RequestServer:
             return util.send_status_response(environ, start_response, error_list[0][1])
 
         # Multiple errors, or error on one single child
-        multistatusEL = xml_tools.make_multistatus_el()
+        writer = xml_tools.make_multistatus_writer(self.xml_writer)
 
         for refurl, e in error_list:
             # assert refurl.startswith("http:")
             assert refurl.startswith("/")
             assert isinstance(e, DAVError)
-            responseEL = etree.SubElement(multistatusEL, "{DAV:}response")
-            etree.SubElement(responseEL, "{DAV:}href").text = refurl
-            etree.SubElement(
-                responseEL, "{DAV:}status"
-            ).text = f"HTTP/1.1 {get_http_status_string(e)}"
+            writer.add_status_response(refurl, get_http_status_string(e))
 
-        return util.send_multi_status_response(environ, start_response, multistatusEL)
+        return util.send_multi_status_response(environ, start_response, writer)
+
+    def _get_resource_inst(self, path, environ):
+        """Return provider.get_resource_inst(path, environ) (or None)."""
+        with util.timed_phase(environ, "resource"):
+            return self._davProvider.get_cached_resource_inst(path, environ)
+
+    def _invalidate_resources(self, environ, *paths):
+        """Drop modified paths from the request-scoped resource cache."""
+        for path in paths:
+            self._davProvider.invalidate_cached_resources(path, environ)
 
     def _check_write_permission(self, res, depth, environ):
         """Raise DAVError(HTTP_LOCKED), if res is locked.
@@ -196,16 +260,17 @@ class RequestServer:
 
         ref_url = res.get_ref_url()
 
-        if "wsgidav.conditions.if" not in environ:
-            util.parse_if_header_dict(environ)
+        with util.timed_phase(environ, "conditions"):
+            if "wsgidav.conditions.if" not in environ:
+                util.parse_if_header_dict(environ)
 
-        # raise HTTP_LOCKED if conflict exists
-        lock_man.check_write_permission(
-            url=ref_url,
-            depth=depth,
-            token_list=environ["wsgidav.ifLockTokenList"],
-            principal=environ["wsgidav.user_name"],
-        )
+            # raise HTTP_LOCKED if conflict exists
+            lock_man.check_write_permission(
+                url=ref_url,
+                depth=depth,
+                token_list=environ["wsgidav.ifLockTokenList"],
+                principal=environ["wsgidav.user_name"],
+            )
 
     def _evaluate_if_headers(self, res, environ):
         """Apply HTTP headers on <path>, raising DAVError if conditions fail.
@@ -221,56 +286,57 @@ class RequestServer:
         @see http://www.webdav.org/specs/rfc4918.html#HEADER_If
         @see util.evaluate_http_conditionals
         """
-        # Add parsed If header to environ
-        if "wsgidav.conditions.if" not in environ:
-            util.parse_if_header_dict(environ)
-
-        # Bail out, if res does not exist
-        if res is None:
-            return
-
-        if_dict = environ["wsgidav.conditions.if"]
-
-        # Raise HTTP_PRECONDITION_FAILED or HTTP_NOT_MODIFIED, if standard
-        # HTTP condition fails
-        last_modified = -1  # nonvalid modified time
-        if res.get_last_modified() is not None:
-            last_modified = int(res.get_last_modified())
-
-        etag = checked_etag(res.get_etag(), allow_none=True)
-        if etag is None:
-            etag = "[]"  # Non-valid entity tag
+        with util.timed_phase(environ, "conditions"):
+            # Add parsed If header to environ
+            if "wsgidav.conditions.if" not in environ:
+                util.parse_if_header_dict(environ)
 
-        if (
-            "HTTP_IF_MODIFIED_SINCE" in environ
-            or "HTTP_IF_UNMODIFIED_SINCE" in environ
-            or "HTTP_IF_MATCH" in environ
-            or "HTTP_IF_NONE_MATCH" in environ
-        ):
-            util.evaluate_http_conditionals(res, last_modified, etag, environ)
+            # Bail out, if res does not exist
+            if res is None:
+                return
 
-        if "HTTP_IF" not in environ:
-            return
+            if_dict = environ["wsgidav.conditions.if"]
 
-        # Raise HTTP_PRECONDITION_FAILED, if DAV 'If' condition fails
-        # TODO: handle empty locked resources
-        # TODO: handle unmapped locked resources
-        #            isnewfile = not provider.exists(mappedpath)
+            # Raise HTTP_PRECONDITION_FAILED or HTTP_NOT_MODIFIED, if standard
+            # HTTP condition fails
+            last_modified = -1  # nonvalid modified time
+            if res.get_last_modified() is not None:
+                last_modified = int(res.get_last_modified())
 
-        ref_url = res.get_ref_url()
-        lock_man = self._davProvider.lock_manager
-        locktoken_list = []
-        if lock_man:
-            lockList = lock_man.get_indirect_url_lock_list(
-                ref_url, principal=environ["wsgidav.user_name"]
-            )
-            for lock in lockList:
-                locktoken_list.append(lock["token"])
-
-        if not util.test_if_header_dict(res, if_dict, ref_url, locktoken_list, etag):
-            self._fail(HTTP_PRECONDITION_FAILED, "'If' header condition failed.")
+            etag = checked_etag(res.get_etag(), allow_none=True)
+            if etag is None:
+                etag = "[]"  # Non-valid entity tag
+
+            if (
+                "HTTP_IF_MODIFIED_SINCE" in environ
+                or "HTTP_IF_UNMODIFIED_SINCE" in environ
+                or "HTTP_IF_MATCH" in environ
+                or "HTTP_IF_NONE_MATCH" in environ
+            ):
+                util.evaluate_http_conditionals(res, last_modified, etag, environ)
+
+            if "HTTP_IF" not in environ:
+                return
+
+            # Raise HTTP_PRECONDITION_FAILED, if DAV 'If' condition fails
+            # TODO: handle empty locked resources
+            # TODO: handle unmapped locked resources
+            #            isnewfile = not provider.exists(mappedpath)
+
+            ref_url = res.get_ref_url()
+            lock_man = self._davProvider.lock_manager
+            locktoken_list = []
+            if lock_man:
+                lockList = lock_man.get_indirect_url_lock_list(
+                    ref_url, principal=environ["wsgidav.user_name"]
+                )
+                for lock in lockList:
+                    locktoken_list.append(lock["token"])
 
-        return
+            if not util.test_if_header_dict(
+                res, if_dict, ref_url, locktoken_list, etag
+            ):
+                self._fail(HTTP_PRECONDITION_FAILED, "'If' header condition failed.")
 
     def do_PROPFIND(self, environ, start_response):
         """
@@ -278,7 +344,7 @@ class RequestServer:
         @see http://www.webdav.org/specs/rfc4918.html#METHOD_PROPFIND
         """
         path = environ["PATH_INFO"]
-        res = self._davProvider.get_resource_inst(path, environ)
+        res = self._get_resource_inst(path, environ)
 
         # RFC: By default, the PROPFIND method without a Depth header MUST act
         # as if a "Depth: infinity" header was included.
@@ -305,70 +371,58 @@ class RequestServer:
         self._evaluate_if_headers(res, environ)
 
         # Parse PROPFIND request
-        requestEL = util.parse_xml_body(environ, allow_empty=True)
-        if requestEL is None:
+        requestbody = util.read_request_body(environ, allow_empty=True)
+        if requestbody is None:
             # An empty PROPFIND request body MUST be treated as a request for
             # the names and values of all properties.
-            requestEL = etree.XML(
-                "<D:propfind xmlns:D='DAV:'><D:allprop/></D:propfind>"
+            propFindMode, propNameList = "allprop", ()
+        elif environ.get("wsgidav.dump_request_body"):
+            requestEL = util.parse_xml_bytes(requestbody)
+            util.dump_request_body(environ, requestEL)
+            propFindMode, propNameList = get_propfind_request(requestEL)
+        elif len(requestbody) <= PROPFIND_CACHE_MAX_BODY_SIZE:
+            propFindMode, propNameList = _parse_propfind_body(requestbody)
+        else:
+            propFindMode, propNameList = get_propfind_request(
+                util.parse_xml_bytes(requestbody)
             )
-
-        if requestEL.tag != "{DAV:}propfind":
-            self._fail(HTTP_BAD_REQUEST)
-
-        propNameList = []
-        propFindMode = None
-        for pfnode in requestEL:
-            if pfnode.tag == "{DAV:}allprop":
-                if propFindMode:
-                    # RFC: allprop and name are mutually exclusive
-                    self._fail(HTTP_BAD_REQUEST)
-                propFindMode = "allprop"
-            # TODO: implement <include> option
-            #            elif pfnode.tag == "{DAV:}include":
-            #                if not propFindMode in (None, "allprop"):
-            #                    self._fail(HTTP_BAD_REQUEST,
-            #                        "<include> element is only valid with 'allprop'.")
-            #                for pfpnode in pfnode:
-            #                    propNameList.append(pfpnode.tag)
-            elif pfnode.tag == "{DAV:}name":
-                if propFindMode:  # RFC: allprop and name are mutually exclusive
-                    self._fail(HTTP_BAD_REQUEST)
-                propFindMode = "name"
-            elif pfnode.tag == "{DAV:}prop":
-                # RFC: allprop and name are mutually exclusive
-                if propFindMode not in (None, "named"):
-                    self._fail(HTTP_BAD_REQUEST)
-                propFindMode = "named"
-                for pfpnode in pfnode:
-                    propNameList.append(pfpnode.tag)
+        propNameList = list(propNameList)
 
         # --- Build list of resource URIs
 
-        reslist = res.get_descendants(depth=environ["HTTP_DEPTH"], add_self=True)
-        #        if environ["wsgidav.verbose"] >= 3:
-        #            pprint(reslist, indent=4)
-
-        multistatusEL = xml_tools.make_multistatus_el()
-        responsedescription = []
-
-        for child in reslist:
+        def _get_properties(child):
             if propFindMode == "allprop":
                 propList = child.get_properties("allprop")
             elif propFindMode == "name":
                 propList = child.get_properties("name")
             else:
                 propList = child.get_properties("named", name_list=propNameList)
+            return child.get_href(), propList
+
+        with util.timed_phase(environ, "props"):
+            reslist = res.get_descendants(depth=environ["HTTP_DEPTH"], add_self=True)
+            #        if environ["wsgidav.verbose"] >= 3:
+            #            pprint(reslist, indent=4)
+
+            # Providers may opt-in to evaluate resources concurrently
+            # (`Executor.map()` yields the results in the original order)
+            executor = self._davProvider.get_propfind_executor()
+            if executor and len(reslist) > 1:
+                results = list(executor.map(_get_properties, reslist))
+            else:
+                results = [_get_properties(child) for child in reslist]
 
-            href = child.get_href()
-            util.add_property_response(multistatusEL, href, propList)
+        writer = xml_tools.make_multistatus_writer(self.xml_writer)
+        responsedescription = []
+
+        with util.timed_phase(environ, "xml"):
+            for href, propList in results:
+                writer.add_response(href, propList)
 
         if responsedescription:
-            etree.SubElement(
-                multistatusEL, "{DAV:}responsedescription"
-            ).text = "\n".join(responsedescription)
+            writer.add_response_description("\n".join(responsedescription))
 
-        return util.send_multi_status_response(environ, start_response, multistatusEL)
+        return util.send_multi_status_response(environ, start_response, writer)
 
     def do_PROPPATCH(self, environ, start_response):
         """Handle PROPPATCH request to set or remove a property.
@@ -376,7 +430,7 @@ class RequestServer:
         @see http://www.webdav.org/specs/rfc4918.html#METHOD_PROPPATCH
         """
         path = environ["PATH_INFO"]
-        res = self._davProvider.get_resource_inst(path, environ)
+        res = self._get_resource_inst(path, environ)
 
         # Only accept Depth: 0 (but assume this, if omitted)
         environ.setdefault("HTTP_DEPTH", "0")
@@ -472,18 +526,16 @@ class RequestServer:
                     e = as_DAVError(e)
                     propResponseList.append((name, e))
                     responsedescription.append(e.get_user_info())
+            self._invalidate_resources(environ, res.path)
 
         # Generate response XML
-        multistatusEL = xml_tools.make_multistatus_el()
-        href = res.get_href()
-        util.add_property_response(multistatusEL, href, propResponseList)
+        writer = xml_tools.make_multistatus_writer(self.xml_writer)
+        writer.add_response(res.get_href(), propResponseList)
         if responsedescription:
-            etree.SubElement(
-                multistatusEL, "{DAV:}responsedescription"
-            ).text = "\n".join(responsedescription)
+            writer.add_response_description("\n".join(responsedescription))
 
         # Send response
-        return util.send_multi_status_response(environ, start_response, multistatusEL)
+        return util.send_multi_status_response(environ, start_response, writer)
 
     def do_MKCOL(self, environ, start_response):
         """Handle MKCOL request to create a new collection.
@@ -522,7 +574,7 @@ class RequestServer:
                 else:
                     mtime = int(mtime_header)
 
-        parentRes = provider.get_resource_inst(util.get_uri_parent(path), environ)
+        parentRes = self._get_resource_inst(util.get_uri_parent(path), environ)
         if not parentRes or not parentRes.is_collection:
             self._fail(HTTP_CONFLICT, "Parent must be an existing collection.")
 
@@ -532,8 +584,9 @@ class RequestServer:
         self._check_write_permission(parentRes, "0", environ)
 
         parentRes.create_collection(util.get_uri_name(path))
+        self._invalidate_resources(environ, path)
         if mtime is not None:
-            createdRes = provider.get_resource_inst(path, environ)
+            createdRes = self._get_resource_inst(path, environ)
             createdRes.set_last_modified(createdRes.path, mtime, dry_run=False)
 
         return util.send_status_response(environ, start_response, HTTP_CREATED)
@@ -551,7 +604,7 @@ class RequestServer:
         """
         path = environ["PATH_INFO"]
         provider = self._davProvider
-        res = provider.get_resource_inst(path, environ)
+        res = self._get_resource_inst(path, environ)
 
         # --- Check request preconditions -------------------------------------
 
@@ -584,7 +637,7 @@ class RequestServer:
         self._evaluate_if_headers(res, environ)
         # We need write access on the parent collection. Also we check for
         # locked children
-        parentRes = provider.get_resource_inst(util.get_uri_parent(path), environ)
+        parentRes = self._get_resource_inst(util.get_uri_parent(path), environ)
         if parentRes:
             #            self._check_write_permission(parentRes, environ["HTTP_DEPTH"], environ)
             self._check_write_permission(parentRes, "0", environ)
@@ -607,6 +660,7 @@ class RequestServer:
             error_list = [(res.get_href(), as_DAVError(e))]
             handled = True
         if handled:
+            self._invalidate_resources(environ, path)
             return self._send_response(
                 environ, start_response, res, HTTP_NO_CONTENT, error_list
             )
@@ -634,17 +688,22 @@ class RequestServer:
                     error_list = res.delete()
                 except Exception as e:
                     error_list = [(res.get_href(), as_DAVError(e))]
+                self._invalidate_resources(environ, path)
                 return self._send_response(
                     environ, start_response, res, HTTP_NO_CONTENT, error_list
                 )
 
         # --- Implement file-by-file processing -------------------------------
 
+        # Invalidate the whole subtree once (instead of once per child, which
+        # would scan the request cache for every member)
+        self._invalidate_resources(environ, path)
+
         # Hidden paths (ancestors of failed deletes) {<path>: True, ...}
         ignore_dict = {}
         for child_res in reverse_child_ist:
             if child_res.path in ignore_dict:
-                _logger.debug(f"Skipping {child_res.path} (contains error child)")
+                _logger.debug("Skipping %s (contains error child)", child_res.path)
                 ignore_dict[util.get_uri_parent(child_res.path)] = ""
                 continue
 
@@ -684,9 +743,8 @@ class RequestServer:
         @see: http://www.webdav.org/specs/rfc4918.html#METHOD_PUT
         """
         path = environ["PATH_INFO"]
-        provider = self._davProvider
-        res = provider.get_resource_inst(path, environ)
-        parentRes = provider.get_resource_inst(util.get_uri_parent(path), environ)
+        res = self._get_resource_inst(path, environ)
+        parentRes = self._get_resource_inst(util.get_uri_parent(path), environ)
 
         isnewfile = res is None
         mtime = None
@@ -755,6 +813,7 @@ class RequestServer:
             util.fail(e)
 
         res.end_write(with_errors=hasErrors)
+        self._invalidate_resources(environ, path)
 
         headers = None
         if res.support_etag():
@@ -786,10 +845,8 @@ class RequestServer:
         """
         src_path = environ["PATH_INFO"]
         provider = self._davProvider
-        src_res = provider.get_resource_inst(src_path, environ)
-        src_parent_res = provider.get_resource_inst(
-            util.get_uri_parent(src_path), environ
-        )
+        src_res = self._get_resource_inst(src_path, environ)
+        src_parent_res = self._get_resource_inst(util.get_uri_parent(src_path), environ)
 
         def _debug_exception(e):
             """Log internal exceptions with stacktrace that otherwise would be hidden."""
@@ -908,10 +965,10 @@ class RequestServer:
 
         # dest_path is now relative to current mount/share starting with '/'
 
-        dest_res = provider.get_resource_inst(dest_path, environ)
+        dest_res = self._get_resource_inst(dest_path, environ)
         dest_exists = dest_res is not None
 
-        dest_parent_res = provider.get_resource_inst(
+        dest_parent_res = self._get_resource_inst(
             util.get_uri_parent(dest_path), environ
         )
 
@@ -947,6 +1004,10 @@ class RequestServer:
 
         # --- Let provider handle the request natively ------------------------
 
+        # Both trees are modified from here on, and resources are not looked
+        # up through the request cache again
+        self._invalidate_resources(environ, src_path, dest_path)
+
         # Errors in copy/move; [ (<ref-url>, <DAVError>), ... ]
         error_list = []
         success_code = HTTP_CREATED
@@ -986,7 +1047,7 @@ class RequestServer:
                 # header is "T", then prior to performing the move, the server
                 # MUST perform a DELETE with "Depth: infinity" on the
                 # destination resource.
-                _logger.debug(f"Remove dest before move: {dest_res!r}")
+                _logger.debug("Remove dest before move: %r", dest_res)
                 dest_res.delete()
                 dest_res = None
             else:
@@ -1000,13 +1061,13 @@ class RequestServer:
                     depth_first=True, add_self=False
                 )
                 src_path_list = [s.path for s in src_list]
-                _logger.debug(f"check src_path_list: {src_path_list}")
+                _logger.debug("check src_path_list: %s", src_path_list)
                 for dres in reverse_dest_list:
-                    _logger.debug(f"check unmatched dest before copy: {dres}")
+                    _logger.debug("check unmatched dest before copy: %s", dres)
                     rel_url = dres.path[dest_root_len:]
                     sp = src_path + rel_url
                     if sp not in src_path_list:
-                        _logger.debug(f"Remove unmatched dest before copy: {dres}")
+                        _logger.debug("Remove unmatched dest before copy: %s", dres)
                         dres.delete()
 
         # --- Let provider implement recursive move ---------------------------
@@ -1026,7 +1087,7 @@ class RequestServer:
 
             if not has_conflicts:
                 try:
-                    _logger.debug(f"Recursive move: {src_res} -> {dest_path!r}")
+                    _logger.debug("Recursive move: %s -> %r", src_res, dest_path)
                     error_list = src_res.move_recursive(dest_path)
                 except Exception as e:
                     _debug_exception(e)
@@ -1057,7 +1118,7 @@ class RequestServer:
                     parent_error = True
                     break
             if parent_error:
-                _logger.debug(f"Copy: skipping {sres.path!r}, because of parent error")
+                _logger.debug("Copy: skipping %r, because of parent error", sres.path)
                 continue
 
             try:
@@ -1092,7 +1153,7 @@ class RequestServer:
         if is_move:
             reverse_src_list = src_list[:]
             reverse_src_list.reverse()
-            _logger.debug(f"Delete after move, ignore_dict={ignore_dict}")
+            _logger.debug("Delete after move, ignore_dict=%s", ignore_dict)
             for sres in reverse_src_list:
                 # Non-collections have already been removed in the copy loop.
                 if not sres.is_collection:
@@ -1105,18 +1166,19 @@ class RequestServer:
                         break
                 if child_error:
                     _logger.debug(
-                        f"Delete after move: skipping {sres.path!r}, because of child error"
+                        "Delete after move: skipping %r, because of child error",
+                        sres.path,
                     )
                     continue
 
                 try:
-                    _logger.debug(f"Remove collection after move: {sres}")
+                    _logger.debug("Remove collection after move: %s", sres)
                     sres.delete()
                 except Exception as e:
                     _debug_exception(e)
                     error_list.append((src_res.get_href(), as_DAVError(e)))
 
-            _logger.debug(f"ErrorList: {error_list}")
+            _logger.debug("ErrorList: %s", error_list)
 
         # --- Return response -------------------------------------------------
 
@@ -1130,7 +1192,7 @@ class RequestServer:
         """
         path = environ["PATH_INFO"]
         provider = self._davProvider
-        res = provider.get_resource_inst(path, environ)
+        res = self._get_resource_inst(path, environ)
         lock_man = provider.lock_manager
 
         if lock_man is None:
@@ -1182,7 +1244,7 @@ class RequestServer:
 
             # The lock root may be <path>, or a parent of <path>.
             lock_path = provider.ref_url_to_path(lock["root"])
-            lock_res = provider.get_resource_inst(lock_path, environ)
+            lock_res = self._get_resource_inst(lock_path, environ)
 
             prop_el = xml_tools.make_prop_elem()
             # TODO: handle exceptions in get_property_value
@@ -1246,10 +1308,11 @@ class RequestServer:
         # Locking unmapped URLs: must create an empty resource
         createdNewResource = False
         if res is None:
-            parentRes = provider.get_resource_inst(util.get_uri_parent(path), environ)
+            parentRes = self._get_resource_inst(util.get_uri_parent(path), environ)
             if not parentRes or not parentRes.is_collection:
                 self._fail(HTTP_CONFLICT, "LOCK-0 parent must be a collection")
             res = parentRes.create_empty_resource(util.get_uri_name(path))
+            self._invalidate_resources(environ, path)
             createdNewResource = True
 
         # --- Check, if path is already locked --------------------------------
@@ -1331,7 +1394,7 @@ class RequestServer:
         """
         path = environ["PATH_INFO"]
         provider = self._davProvider
-        res = self._davProvider.get_resource_inst(path, environ)
+        res = self._get_resource_inst(path, environ)
 
         lock_man = provider.lock_manager
         if lock_man is None:
@@ -1379,7 +1442,7 @@ class RequestServer:
         config = environ["wsgidav.config"]
         hotfixes = util.get_dict_value(config, "hotfixes", as_dict=True)
 
-        res = provider.get_resource_inst(path, environ)
+        res = self._get_resource_inst(path, environ)
 
         dav_compliance_level = "1,2"
         if provider is None or provider.is_readonly() or provider.lock_manager is None:
@@ -1473,7 +1536,7 @@ class RequestServer:
         @see: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.27
         """
         path = environ["PATH_INFO"]
-        res = self._davProvider.get_resource_inst(path, environ)
+        res = self._get_resource_inst(path, environ)
 
         if util.get_content_length(environ) != 0:
             self._fail(
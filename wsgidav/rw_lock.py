@@ -1,7 +1,7 @@
 """
 ReadWriteLock
 
-Taken from http://code.activestate.com/recipes/502283/
+Based on http://code.activestate.com/recipes/502283/
 
 locks.py - Read-Write lock thread lock implementation
 
@@ -14,13 +14,40 @@ Released under the BSD-license.
 # Imports
 # -------
 
-from threading import Condition, Lock, current_thread
-from time import time
+from collections import deque
+from threading import Condition, Lock, get_ident
 
 # Read write lock
 # ---------------
 
 
+class _ReadLockContext:
+    """Context manager returned by `ReadWriteLock.read_locked()`."""
+
+    __slots__ = ("_lock", "_timeout")
+
+    def __init__(self, lock, timeout):
+        self._lock = lock
+        self._timeout = timeout
+
+    def __enter__(self):
+        self._lock.acquire_read(timeout=self._timeout)
+        return self._lock
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._lock.release()
+
+
+class _WriteLockContext(_ReadLockContext):
+    """Context manager returned by `ReadWriteLock.write_locked()`."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        self._lock.acquire_write(timeout=self._timeout)
+        return self._lock
+
+
 class ReadWriteLock:
     """Read-Write lock class. A read-write lock differs from a standard
     threading.RLock() by allowing multiple threads to simultaneously hold a
@@ -45,22 +72,79 @@ class ReadWriteLock:
     occur. After the write lock has been granted, the thread will hold a
     full write lock, and not be downgraded after the upgrading call to
     acquire_write() has been match by a corresponding release().
+
+    The uncontended paths only do a few dictionary operations while holding
+    the internal mutex. Timeouts are only evaluated when a thread actually has
+    to wait.
+
+    Use :meth:`read_locked` and :meth:`write_locked` to guard a block::
+
+        with lock.read_locked():
+            ...
     """
 
+    __slots__ = (
+        "_mutex",
+        "_condition",
+        "_writer",
+        "_writer_count",
+        "_upgrade_writer_count",
+        "_pending_writers",
+        "_readers",
+        "_read_context",
+        "_write_context",
+    )
+
     def __init__(self):
         """Initialize this read-write lock."""
 
         # Condition variable, used to signal waiters of a change in object
-        # state.
-        self.__condition = Condition(Lock())
+        # state. We use the (C-level) mutex directly as context manager, which
+        # is faster than `with self._condition`.
+        self._mutex = Lock()
+        self._condition = Condition(self._mutex)
+
+        # Initialize with no writers (threads are identified by `get_ident()`).
+        self._writer = None
+        self._writer_count = 0
+        self._upgrade_writer_count = 0
+        self._pending_writers = deque()
 
-        # Initialize with no writers.
-        self.__writer = None
-        self.__upgradewritercount = 0
-        self.__pendingwriters = []
+        # Initialize with no readers: {thread_id: nesting_count, ...}
+        self._readers = {}
 
-        # Initialize with no readers.
-        self.__readers = {}
+        # Context managers are stateless, so we can re-use them (unless a
+        # timeout is passed)
+        self._read_context = _ReadLockContext(self, None)
+        self._write_context = _WriteLockContext(self, None)
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(writer={self._writer}, "
+            f"readers={len(self._readers)}, "
+            f"pending_writers={len(self._pending_writers)})"
+        )
+
+    def read_locked(self, *, timeout=None):
+        """Return a context manager that holds a read lock for the block."""
+        if timeout is None:
+            return self._read_context
+        return _ReadLockContext(self, timeout)
+
+    def write_locked(self, *, timeout=None):
+        """Return a context manager that holds a write lock for the block."""
+        if timeout is None:
+            return self._write_context
+        return _WriteLockContext(self, timeout)
+
+    def _can_read(self):
+        # A new reader is only admitted if there is no writer and no writer
+        # is waiting for its turn.
+        return (
+            self._writer is None
+            and not self._upgrade_writer_count
+            and not self._pending_writers
+        )
 
     def acquire_read(self, *, timeout=None):
         """Acquire a read lock for the current thread, waiting at most
@@ -72,42 +156,30 @@ class ReadWriteLock:
         In case the timeout expires before the lock could be serviced, a
         RuntimeError is thrown."""
 
-        if timeout is not None:
-            endtime = time() + timeout
-        me = current_thread()
-        self.__condition.acquire()
-        try:
-            if self.__writer is me:
+        me = get_ident()
+        with self._mutex:
+            readers = self._readers
+            if me in readers:
+                # We already hold a read lock, so there can be no writer.
+                # Nested read locks are granted even if writers are waiting
+                # (otherwise we would deadlock), so writers can't easily get
+                # starved (but see class docs, readers can).
+                readers[me] += 1
+                return
+            if self._writer is None:
+                if not self._upgrade_writer_count and not self._pending_writers:
+                    # Grant a new read lock, always, in case there are no
+                    # pending writers (and no writer).
+                    readers[me] = 1
+                    return
+            elif self._writer == me:
                 # If we are the writer, grant a new read lock, always.
-                self.__writercount += 1
+                self._writer_count += 1
                 return
-            while True:
-                if self.__writer is None:
-                    # Only test anything if there is no current writer.
-                    if self.__upgradewritercount or self.__pendingwriters:
-                        if me in self.__readers:
-                            # Only grant a read lock if we already have one
-                            # in case writers are waiting for their turn.
-                            # This means that writers can't easily get starved
-                            # (but see below, readers can).
-                            self.__readers[me] += 1
-                            return
-                        # No, we aren't a reader (yet), wait for our turn.
-                    else:
-                        # Grant a new read lock, always, in case there are
-                        # no pending writers (and no writer).
-                        self.__readers[me] = self.__readers.get(me, 0) + 1
-                        return
-                if timeout is not None:
-                    remaining = endtime - time()
-                    if remaining <= 0:
-                        # Timeout has expired, signal caller of this.
-                        raise RuntimeError("Acquiring read lock timed out")
-                    self.__condition.wait(remaining)
-                else:
-                    self.__condition.wait()
-        finally:
-            self.__condition.release()
+            if not self._condition.wait_for(self._can_read, timeout):
+                # Timeout has expired, signal caller of this.
+                raise RuntimeError("Acquiring read lock timed out")
+            readers[me] = 1
 
     def acquire_write(self, *, timeout=None):
         """Acquire a write lock for the current thread, waiting at most
@@ -122,105 +194,98 @@ class ReadWriteLock:
         In case the timeout expires before the lock could be serviced, a
         RuntimeError is thrown."""
 
-        if timeout is not None:
-            endtime = time() + timeout
-        me, upgradewriter = current_thread(), False
-        self.__condition.acquire()
-        try:
-            if self.__writer is me:
+        me = get_ident()
+        with self._mutex:
+            readers = self._readers
+            if self._writer is None:
+                if not (readers or self._upgrade_writer_count or self._pending_writers):
+                    # Nobody holds or waits for the lock: take it.
+                    self._writer = me
+                    self._writer_count = 1
+                    return
+            elif self._writer == me:
                 # If we are the writer, grant a new write lock, always.
-                self.__writercount += 1
+                self._writer_count += 1
                 return
-            elif me in self.__readers:
-                # If we are a reader, no need to add us to pendingwriters,
-                # we get the upgradewriter slot.
-                if self.__upgradewritercount:
+
+            if me in readers:
+                # If we are a reader, no need to add us to pending writers,
+                # we get the upgrade writer slot.
+                if self._upgrade_writer_count:
                     # If we are a reader and want to upgrade, and someone
                     # else also wants to upgrade, there is no way we can do
                     # this except if one of us releases all his read locks.
                     # Signal this to user.
                     raise ValueError("Inevitable dead lock, denying write lock")
-                upgradewriter = True
-                self.__upgradewritercount = self.__readers.pop(me)
-            else:
-                # We aren't a reader, so add us to the pending writers queue
-                # for synchronization with the readers.
-                self.__pendingwriters.append(me)
-            while True:
-                if not self.__readers and self.__writer is None:
-                    # Only test anything if there are no readers and writers.
-                    if self.__upgradewritercount:
-                        if upgradewriter:
-                            # There is a writer to upgrade, and it's us. Take
-                            # the write lock.
-                            self.__writer = me
-                            self.__writercount = self.__upgradewritercount + 1
-                            self.__upgradewritercount = 0
-                            return
-                        # There is a writer to upgrade, but it's not us.
-                        # Always leave the upgrade writer the advance slot,
-                        # because he presumes he'll get a write lock directly
-                        # from a previously held read lock.
-                    elif self.__pendingwriters[0] is me:
-                        # If there are no readers and writers, it's always
-                        # fine for us to take the writer slot, removing us
-                        # from the pending writers queue.
-                        # This might mean starvation for readers, though.
-                        self.__writer = me
-                        self.__writercount = 1
-                        self.__pendingwriters = self.__pendingwriters[1:]
-                        return
-                if timeout is not None:
-                    remaining = endtime - time()
-                    if remaining <= 0:
-                        # Timeout has expired, signal caller of this.
-                        if upgradewriter:
-                            # Put us back on the reader queue. No need to
-                            # signal anyone of this change, because no other
-                            # writer could've taken our spot before we got
-                            # here (because of remaining readers), as the test
-                            # for proper conditions is at the start of the
-                            # loop, not at the end.
-                            self.__readers[me] = self.__upgradewritercount
-                            self.__upgradewritercount = 0
-                        else:
-                            # We were a simple pending writer, just remove us
-                            # from the FIFO list.
-                            self.__pendingwriters.remove(me)
-                        raise RuntimeError("Acquiring write lock timed out")
-                    self.__condition.wait(remaining)
-                else:
-                    self.__condition.wait()
-        finally:
-            self.__condition.release()
+                self._upgrade_writer_count = readers.pop(me)
+                # While we hold the upgrade slot, neither new readers nor
+                # pending writers are admitted, so we only wait for the
+                # remaining readers to leave.
+                if not self._condition.wait_for(lambda: not readers, timeout):
+                    # Put us back on the reader queue. No other writer
+                    # could've taken our spot in the meantime, but waiting
+                    # threads may proceed now that the upgrade slot is free.
+                    readers[me] = self._upgrade_writer_count
+                    self._upgrade_writer_count = 0
+                    self._condition.notify_all()
+                    raise RuntimeError("Acquiring write lock timed out")
+                self._writer = me
+                self._writer_count = self._upgrade_writer_count + 1
+                self._upgrade_writer_count = 0
+                return
+
+            # We aren't a reader, so add us to the pending writers queue
+            # for synchronization with the readers.
+            pending = self._pending_writers
+            pending.append(me)
+
+            def _can_write():
+                # The upgrade writer always has the advance slot, otherwise
+                # pending writers are served in FIFO order.
+                # This might mean starvation for readers, though.
+                return (
+                    not readers
+                    and self._writer is None
+                    and not self._upgrade_writer_count
+                    and pending[0] == me
+                )
+
+            if not self._condition.wait_for(_can_write, timeout):
+                # We were a simple pending writer, just remove us from the
+                # FIFO list and wake up threads that may have waited for us.
+                pending.remove(me)
+                self._condition.notify_all()
+                raise RuntimeError("Acquiring write lock timed out")
+            pending.popleft()
+            self._writer = me
+            self._writer_count = 1
 
     def release(self):
         """Release the currently held lock.
 
         In case the current thread holds no lock, a ValueError is thrown."""
 
-        me = current_thread()
-        self.__condition.acquire()
-        try:
-            if self.__writer is me:
+        me = get_ident()
+        with self._mutex:
+            if self._writer == me:
                 # We are the writer, take one nesting depth away.
-                self.__writercount -= 1
-                if not self.__writercount:
+                self._writer_count -= 1
+                if not self._writer_count:
                     # No more write locks; take our writer position away and
                     # notify waiters of the new circumstances.
-                    self.__writer = None
-                    self.__condition.notify_all()
-            elif me in self.__readers:
-                # We are a reader currently, take one nesting depth away.
-                self.__readers[me] -= 1
-                if not self.__readers[me]:
-                    # No more read locks, take our reader position away.
-                    del self.__readers[me]
-                    if not self.__readers:
-                        # No more readers, notify waiters of the new
-                        # circumstances.
-                        self.__condition.notify_all()
-            else:
+                    self._writer = None
+                    self._condition.notify_all()
+                return
+            readers = self._readers
+            count = readers.get(me)
+            if count is None:
                 raise ValueError("Trying to release unheld lock")
-        finally:
-            self.__condition.release()
+            if count > 1:
+                # We are a reader currently, take one nesting depth away.
+                readers[me] = count - 1
+                return
+            # No more read locks, take our reader position away.
+            del readers[me]
+            if not readers:
+                # No more readers, notify waiters of the new circumstances.
+                self._condition.notify_all()
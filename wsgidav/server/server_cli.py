@@ -729,6 +729,20 @@ def _run_uvicorn(app, config, server):
     version = f"{util.public_wsgidav_info} {version} {util.public_python_info}"
     _logger.info(f"Running {version} ...")
 
+    interface = server_args["interface"]
+    if interface == "asgi2":
+        _logger.error(
+            "Uvicorn interface 'asgi2' is not supported: use 'asgi3' or 'wsgi'."
+        )
+        return False
+    elif interface in ("asgi3", "auto"):
+        # Opt-in: use our native ASGI app, if `server_args.interface: asgi3` is set
+        from wsgidav.asgi_app import WsgiDAVAsgiApp
+
+        app = WsgiDAVAsgiApp(config, wsgidav_app=app)
+        server_args["interface"] = "asgi3"
+        _logger.info(f"Using {app}")
+
     uvicorn.run(app, **server_args)
 
 
@@ -6,17 +6,21 @@
 Miscellaneous support functions for WsgiDAV.
 """
 
+import atexit
 import base64
 import calendar
 import collections.abc
 import logging
+import logging.handlers
 import mimetypes
 import os
+import queue
 import re
 import stat
 import sys
 import time
 import warnings
+from contextlib import nullcontext
 from copy import deepcopy
 from email.utils import formatdate, parsedate
 from hashlib import md5
@@ -24,7 +28,7 @@ from pprint import pformat
 from typing import Dict, Iterable, Optional, Tuple
 from urllib.parse import quote
 
-from wsgidav import __version__
+from wsgidav import __version__, xml_tools
 from wsgidav.dav_error import (
     HTTP_BAD_REQUEST,
     HTTP_CREATED,
@@ -37,7 +41,7 @@ from wsgidav.dav_error import (
     as_DAVError,
     get_http_status_string,
 )
-from wsgidav.xml_tools import etree, is_etree_element, make_sub_element, xml_to_bytes
+from wsgidav.xml_tools import etree, xml_to_bytes
 
 __docformat__ = "reStructuredText"
 
@@ -404,6 +408,17 @@ def init_logging(config):
 
     If enabled, module loggers will print DEBUG messages, even if verbose == 3.
 
+    Pass arguments instead of pre-formatted strings on hot paths, so the
+    message is only built if the level is enabled::
+
+        _logger.debug("get_property(%s, %s)", norm_url, name)
+
+    Queue mode
+    ~~~~~~~~~~
+    If ``logging.queue`` is true, the base logger gets a ``QueueHandler`` and
+    a ``QueueListener`` thread writes the records to stdout, so request threads
+    are not blocked by a slow console.
+
     Example initialize and use a module logger, that will generate output,
     if enabled (and verbose >= 2)::
 
@@ -490,13 +505,24 @@ def init_logging(config):
     # Remove previous handlers
     for hdlr in logger.handlers[:]:  # Must iterate an array copy
         try:
+            _stop_queue_listener(hdlr)
             hdlr.flush()
             hdlr.close()
         except Exception:
             pass
         logger.removeHandler(hdlr)
 
-    logger.addHandler(consoleHandler)
+    if log_opts.get("queue"):
+        log_queue = queue.SimpleQueue()
+        handler = logging.handlers.QueueHandler(log_queue)
+        handler.wsgidav_listener = logging.handlers.QueueListener(
+            log_queue, consoleHandler
+        )
+        handler.wsgidav_listener.start()
+        atexit.register(_stop_queue_listener, handler)
+        logger.addHandler(handler)
+    else:
+        logger.addHandler(consoleHandler)
 
     if verbose >= 3:
         for e in enable_loggers:
@@ -507,6 +533,16 @@ def init_logging(config):
     return
 
 
+def _stop_queue_listener(handler):
+    """Flush pending records and stop the listener thread of a queue handler."""
+    listener = getattr(handler, "wsgidav_listener", None)
+    if listener is not None:
+        handler.wsgidav_listener = None
+        listener.stop()
+        for hdlr in listener.handlers:
+            hdlr.flush()
+
+
 def get_module_logger(moduleName, *, default_to_verbose=False):
     """Create a module logger, that can be en/disabled by configuration.
 
@@ -966,7 +1002,8 @@ def fail(
             err_condition=err_condition,
             add_headers=add_headers,
         )
-    _logger.debug(f"Raising DAVError {e.get_user_info()}")
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug("Raising DAVError %s", e.get_user_info())
     raise e
 
 
@@ -999,6 +1036,55 @@ class SubAppStartResponse:
         self.__exc_info = exc_info
 
 
+# ========================================================================
+# Request phase timings
+# ========================================================================
+class _PhaseTimer:
+    __slots__ = ("timings", "phase", "start")
+
+    def __init__(self, timings, phase):
+        self.timings = timings
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        self.timings[self.phase] = self.timings.get(self.phase, 0.0) + elapsed
+
+
+_NO_PHASE_TIMER = nullcontext()
+
+
+def timed_phase(environ, phase):
+    """Return a context manager that adds its run time to a request phase.
+
+    Durations are summed up in ``environ["wsgidav.timings"]`` (phase -> seconds),
+    which is only present if the ``timings`` option is enabled. Otherwise this
+    is a no-op::
+
+        with util.timed_phase(environ, "props"):
+            prop_list = res.get_properties("allprop")
+    """
+    timings = environ.get("wsgidav.timings")
+    if timings is None:
+        return _NO_PHASE_TIMER
+    return _PhaseTimer(timings, phase)
+
+
+def format_timings(timings, *, server_timing=False):
+    """Return a string representation of a timings dict (durations in ms).
+
+    Example: ``"auth=0.8ms, resource=1.2ms"``, or, if `server_timing` is true,
+    ``"auth;dur=0.8, resource;dur=1.2"`` (the `Server-Timing` header syntax).
+    """
+    if server_timing:
+        return ", ".join(f"{k};dur={v * 1000:.1f}" for k, v in timings.items())
+    return ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in timings.items())
+
+
 # ========================================================================
 # URLs
 # ========================================================================
@@ -1105,10 +1191,10 @@ def update_headers_in_place(target, new_items) -> None:
 # ========================================================================
 
 
-def parse_xml_body(environ, *, allow_empty=False):
-    """Read request body XML into an etree.Element.
+def read_request_body(environ, *, allow_empty=False):
+    """Read the request body and return it as bytes.
 
-    Return None, if no request body was sent.
+    Return None, if no request body was sent (and `allow_empty` is true).
     Raise HTTP_BAD_REQUEST, if something else went wrong.
 
     TODO: this is a very relaxed interpretation: should we raise HTTP_BAD_REQUEST
@@ -1171,14 +1257,24 @@ def parse_xml_body(environ, *, allow_empty=False):
             return None
         else:
             raise DAVError(HTTP_BAD_REQUEST, "Body must not be empty.")
+    return requestbody
+
 
+def parse_xml_bytes(requestbody):
+    """Parse an XML request body (bytes) into an etree.Element.
+
+    Raise HTTP_BAD_REQUEST, if the XML is not well-formed.
+    """
     try:
-        rootEL = etree.fromstring(requestbody)
+        return etree.fromstring(requestbody)
     except Exception as e:
         raise DAVError(
             HTTP_BAD_REQUEST, "Invalid XML format.", src_exception=e
         ) from None
 
+
+def dump_request_body(environ, rootEL):
+    """Log the XML request body, if `wsgidav.dump_request_body` is set."""
     # If dumps of the body are desired, then this is the place to do it pretty:
     if environ.get("wsgidav.dump_request_body"):
         _logger.info(
@@ -1189,6 +1285,20 @@ def parse_xml_body(environ, *, allow_empty=False):
         )
         environ["wsgidav.dump_request_body"] = False
 
+
+def parse_xml_body(environ, *, allow_empty=False):
+    """Read request body XML into an etree.Element.
+
+    Return None, if no request body was sent.
+    Raise HTTP_BAD_REQUEST, if something else went wrong.
+
+    See :func:`read_request_body` for the handling of CONTENT_LENGTH.
+    """
+    requestbody = read_request_body(environ, allow_empty=allow_empty)
+    if requestbody is None:
+        return None
+    rootEL = parse_xml_bytes(requestbody)
+    dump_request_body(environ, rootEL)
     return rootEL
 
 
@@ -1261,19 +1371,32 @@ def send_status_response(
 
 
 def send_multi_status_response(environ, start_response, multistatus_elem):
+    """Send a '207 Multi-Status' response.
+
+    @param multistatus_elem: etree.Element or a
+        :class:`~wsgidav.xml_tools.MultistatusWriter`
+    """
+    if isinstance(multistatus_elem, xml_tools.MultistatusWriter):
+        to_bytes = multistatus_elem.to_bytes
+    else:
+
+        def to_bytes(*, pretty):
+            return xml_to_bytes(multistatus_elem, pretty=pretty)
+
     # If logging of the body is desired, then this is the place to do it
     # pretty:
     if environ.get("wsgidav.dump_response_body"):
         xml = "{} XML response body:\n{}".format(
             environ["REQUEST_METHOD"],
-            to_str(xml_to_bytes(multistatus_elem, pretty=True)),
+            to_str(to_bytes(pretty=True)),
         )
         environ["wsgidav.dump_response_body"] = xml
 
     # Hotfix for Windows XP
     # PROPFIND XML response is not recognized, when pretty_print = True!
     # (Vista and others would accept this).
-    xml_data = xml_to_bytes(multistatus_elem, pretty=False)
+    with timed_phase(environ, "xml"):
+        xml_data = to_bytes(pretty=False)
     # If not, Content-Length is wrong!
     assert is_bytes(xml_data), xml_data
 
@@ -1305,55 +1428,7 @@ def add_property_response(multistatus_elem, href, prop_list):
     @param href: global URL of the resource, e.g. 'http://server:port/path'.
     @param prop_list: list of 2-tuples (name, value)
     """
-    # Split prop_list by status code and build a unique list of namespaces
-    nsCount = 1
-    nsDict = {}
-    nsMap = {}
-    propDict = {}
-
-    for name, value in prop_list:
-        status = "200 OK"
-        if isinstance(value, DAVError):
-            status = get_http_status_string(value)
-            # Always generate *empty* elements for props with error status
-            value = None
-
-        # Collect namespaces, so we can declare them in the <response> for
-        # compacter output
-        ns, _ = split_namespace(name)
-        if ns != "DAV:" and ns not in nsDict and ns != "":
-            nsDict[ns] = True
-            nsMap[f"NS{nsCount}"] = ns
-            nsCount += 1
-
-        propDict.setdefault(status, []).append((name, value))
-
-    # <response>
-    responseEL = make_sub_element(multistatus_elem, "{DAV:}response", nsmap=nsMap)
-
-    #    log("href value:{}".format(string_repr(href)))
-    #    etree.SubElement(responseEL, "{DAV:}href").text = toUnicode(href)
-    etree.SubElement(responseEL, "{DAV:}href").text = href
-    #    etree.SubElement(responseEL, "{DAV:}href").text = quote(href, safe="/" + "!*'(),"
-    #       + "$-_|.")
-
-    # One <propstat> per status code
-    for status in propDict:
-        propstatEL = etree.SubElement(responseEL, "{DAV:}propstat")
-        # List of <prop>
-        propEL = etree.SubElement(propstatEL, "{DAV:}prop")
-        for name, value in propDict[status]:
-            if value is None:
-                etree.SubElement(propEL, name)
-            elif is_etree_element(value):
-                propEL.append(value)
-            else:
-                # value must be string or unicode
-                #                log("{} value:{}".format(name, string_repr(value)))
-                #                etree.SubElement(propEL, name).text = value
-                etree.SubElement(propEL, name).text = to_unicode_safe(value)
-        # <status>
-        etree.SubElement(propstatEL, "{DAV:}status").text = f"HTTP/1.1 {status}"
+    xml_tools.add_property_response_el(multistatus_elem, href, prop_list)
 
 
 # ========================================================================
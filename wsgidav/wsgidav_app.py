@@ -52,9 +52,12 @@ import inspect
 import platform
 import sys
 import time
+from collections import OrderedDict
+from threading import Lock
 from urllib.parse import unquote
 
-from wsgidav import __version__, util
+from wsgidav import __version__, util, xml_tools
+from wsgidav.async_dav_provider import AsyncDAVProvider, AsyncToSyncProvider
 from wsgidav.dav_provider import DAVProvider
 from wsgidav.default_conf import DEFAULT_CONFIG
 from wsgidav.fs_dav_provider import FilesystemProvider
@@ -126,6 +129,13 @@ def _check_config(config):
         if d and v in d:
             errors.append(f"Deprecated option {old!r}: use {new!r} instead.")
 
+    xml_writer = config.get("xml_writer")
+    if xml_writer and xml_writer not in xml_tools.MULTISTATUS_WRITERS:
+        errors.append(
+            f"Invalid option 'xml_writer': {xml_writer!r} "
+            f"(expected {', '.join(xml_tools.MULTISTATUS_WRITERS)})."
+        )
+
     if errors:
         raise ValueError("Invalid configuration:\n  - " + "\n  - ".join(errors))
 
@@ -138,6 +148,167 @@ MIN_PYTHON_VERSION_INFO = (3, 9)
 check_python_version(MIN_PYTHON_VERSION_INFO)
 
 
+# ========================================================================
+# DynamicShare
+# ========================================================================
+class DynamicShare:
+    """A share template, e.g. '/home/{user}', that creates providers on demand.
+
+    Every ``{name}`` segment of the template matches one path segment.
+    On first access of a matching share (e.g. '/home/alice'), the placeholders
+    are replaced in the provider definition (i.e. the root path, or the
+    `args` and `kwargs` of a custom class) and a new provider is created.
+
+    Like static shares, share paths are case insensitive: they are converted
+    to lower case, so the placeholder values are lower case as well.
+
+    Providers are kept in a LRU cache, that holds at most `max_count` entries.
+    Providers that have not been accessed for `idle_timeout` seconds are
+    discarded.
+    Shares that could not be created are remembered for `negative_ttl` seconds,
+    so repeated requests don't retry the creation every time.
+    """
+
+    def __init__(
+        self, app, template, provider_spec, *, max_count, idle_timeout, negative_ttl=10
+    ):
+        self.app = app
+        self.template = "/" + template.strip("/")
+        self.provider_spec = provider_spec
+        self.max_count = max(1, int(max_count))
+        self.idle_timeout = idle_timeout
+        self.negative_ttl = negative_ttl
+        #: List of (name, literal) tuples, one of them is None
+        self._segments = []
+        for seg in self.template.split("/")[1:]:
+            if seg.startswith("{") and seg.endswith("}"):
+                name = seg[1:-1]
+                if not name.isidentifier():
+                    raise ValueError(f"Invalid placeholder {seg!r} in {template!r}")
+                self._segments.append((name, None))
+            elif "{" in seg or "}" in seg:
+                raise ValueError(
+                    f"Placeholders must span a whole path segment: {template!r}"
+                )
+            else:
+                self._segments.append((None, seg.lower()))
+        #: {share: [provider, last_access], ...}, least recently used first
+        self._providers = OrderedDict()
+        #: {share: expiration, ...} of shares that could not be created
+        self._failures = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({self.template!r}, "
+            f"{len(self._providers)}/{self.max_count} providers)"
+        )
+
+    def __len__(self):
+        return len(self._providers)
+
+    def match(self, path):
+        """Return the (lower case) share path, if `path` matches this template."""
+        depth = len(self._segments)
+        parts = path.split("/", depth + 1)
+        if len(parts) <= depth or parts[0]:
+            return None
+        for (name, literal), part in zip(self._segments, parts[1:]):
+            if name is None:
+                if part.lower() != literal:
+                    return None
+            elif part in ("", ".", "..") or "\\" in part or "\x00" in part:
+                return None
+        return "/".join(parts[: depth + 1]).lower()
+
+    def _expand(self, spec, values):
+        if isinstance(spec, str):
+            for name, value in values.items():
+                spec = spec.replace(f"{{{name}}}", value)
+            return spec
+        elif isinstance(spec, dict):
+            return {k: self._expand(v, values) for k, v in spec.items()}
+        elif isinstance(spec, (list, tuple)):
+            return [self._expand(v, values) for v in spec]
+        return spec
+
+    def _purge_idle(self, now):
+        # Entries are ordered by access time, so we only have to look at the
+        # head of the list
+        providers = self._providers
+        max_access = now - self.idle_timeout
+        while providers:
+            entry = next(iter(providers.values()))
+            if entry[1] >= max_access:
+                break
+            providers.popitem(last=False)
+
+    def get_provider(self, share):
+        """Return the provider for a share path (as returned by `match()`).
+
+        The provider is created on first access. Returns None, if the provider
+        could not be created (e.g. the root folder does not exist).
+        """
+        now = time.monotonic()
+        providers = self._providers
+        with self._lock:
+            if self.idle_timeout:
+                self._purge_idle(now)
+            entry = providers.get(share)
+            if entry is not None:
+                providers.move_to_end(share)
+                entry[1] = now
+                self.hits += 1
+                return entry[0]
+            expiration = self._failures.get(share)
+            if expiration is not None:
+                if expiration > now:
+                    self.hits += 1
+                    return None
+                del self._failures[share]
+            self.misses += 1
+
+        values = {
+            name: part
+            for (name, _literal), part in zip(self._segments, share.split("/")[1:])
+            if name is not None
+        }
+        try:
+            provider = self.app._create_provider(
+                self._expand(self.provider_spec, values)
+            )
+        except ValueError as e:
+            _logger.debug(f"{self}: could not create provider for {share!r}: {e}")
+            if self.negative_ttl:
+                with self._lock:
+                    failures = self._failures
+                    failures[share] = now + self.negative_ttl
+                    failures.move_to_end(share)
+                    while len(failures) > self.max_count:
+                        failures.popitem(last=False)
+            return None
+        self.app._init_provider(share, provider)
+
+        with self._lock:
+            # Another thread may have been faster
+            entry = providers.get(share)
+            if entry is not None:
+                return entry[0]
+            providers[share] = [provider, now]
+            while len(providers) > self.max_count:
+                providers.popitem(last=False)
+        _logger.debug(f"{self}: created {provider} for {share!r}")
+        return provider
+
+    def clear(self):
+        """Discard all cached providers (and remembered failures)."""
+        with self._lock:
+            self._providers.clear()
+            self._failures.clear()
+
+
 # ========================================================================
 # WsgiDAVApp
 # ========================================================================
@@ -164,6 +335,10 @@ class WsgiDAVApp:
             raise ValueError("re_encode_path_info must be bool (or omitted)")
         self.unquote_path_info = hotfixes.get("unquote_path_info", False)
 
+        timings_opts = util.get_dict_value(config, "timings", as_dict=True)
+        self.timings = bool(timings_opts.get("enable"))
+        self.server_timing_header = bool(timings_opts.get("server_timing_header"))
+
         lock_storage = config.get("lock_storage")
 
         if lock_storage is True:
@@ -221,6 +396,10 @@ class WsgiDAVApp:
 
         self.provider_map = {}
         self.sorted_share_list = None
+        #: Used by resolve_provider(): {<lower-case share>: (share, provider), ...}
+        self._share_lookup = {}
+        #: Share templates, e.g. '/home/{user}' (see `add_dynamic_share()`)
+        self.dynamic_shares = []
         for share, provider in provider_mapping.items():
             self.add_provider(share, provider)
 
@@ -298,7 +477,7 @@ class WsgiDAVApp:
 
         if self.verbose >= 3:
             _logger.info("Registered DAV providers by route:")
-            for share in self.sorted_share_list:
+            for share in sorted(self.provider_map, key=len, reverse=True):
                 provider = self.provider_map[share]
                 if domain_controller:
                     if domain_controller.is_share_anonymous(share):
@@ -308,6 +487,10 @@ class WsgiDAVApp:
                 else:
                     hint = " (custom auth)"
                 _logger.info(f"  - {share!r}: {provider}{hint}")
+            for dyn_share in self.dynamic_shares:
+                _logger.info(
+                    f"  - {dyn_share.template!r}: {dyn_share.provider_spec} (dynamic)"
+                )
 
         if auth_conf.get("accept_basic") and not config.get("ssl_certificate"):
             _logger.warning(
@@ -328,13 +511,10 @@ class WsgiDAVApp:
 
         return
 
-    def add_provider(self, share, provider, *, readonly=False):
-        """Add a provider to the provider_map routing table."""
-        # Make sure share starts with, or is '/'
-        share = "/" + share.strip("/")
-        assert share not in self.provider_map
-
+    def _create_provider(self, provider, *, readonly=False):
+        """Return a DAVProvider instance for a `provider_mapping` value."""
         fs_opts = self.config.get("fs_dav_provider") or {}
+        propfind_workers = None
 
         if type(provider) is str:
             # Syntax:
@@ -345,6 +525,8 @@ class WsgiDAVApp:
             provider = FilesystemProvider(provider, readonly=readonly, fs_opts=fs_opts)
 
         elif type(provider) is dict:
+            provider = provider.copy()
+            propfind_workers = provider.pop("propfind_workers", None)
             if "class" in provider:
                 # Syntax:
                 #   <share_path>: {"class": <class_path>, "args": <pos_args>, "kwargs": <named_args>}
@@ -368,11 +550,19 @@ class WsgiDAVApp:
                 f"Provider {provider}: tuple/list syntax is no longer supported"
             )
 
+        if isinstance(provider, AsyncDAVProvider):
+            provider = AsyncToSyncProvider(provider)
+
         if not isinstance(provider, DAVProvider):
             raise ValueError(
                 f"Invalid provider {provider} (not instance of DAVProvider)"
             )
+        if propfind_workers is not None:
+            provider.set_propfind_workers(propfind_workers)
+        return provider
 
+    def _init_provider(self, share, provider):
+        """Bind a provider instance to a share path and our managers."""
         provider.set_share_path(share)
         if self.mount_path:
             provider.set_mount_path(self.mount_path)
@@ -382,38 +572,93 @@ class WsgiDAVApp:
         provider.set_lock_manager(self.lock_manager)
         provider.set_prop_manager(self.prop_manager)
 
+    def add_provider(self, share, provider, *, readonly=False):
+        """Add a provider to the provider_map routing table.
+
+        If `share` contains placeholders (e.g. '/home/{user}'), a
+        :class:`DynamicShare` is registered instead, that creates providers
+        on first access.
+        """
+        # Make sure share starts with, or is '/'
+        share = "/" + share.strip("/")
+        if "{" in share:
+            return self.add_dynamic_share(share, provider)
+
+        assert share not in self.provider_map
+
+        provider = self._create_provider(provider, readonly=readonly)
+        self._init_provider(share, provider)
+
         self.provider_map[share] = provider
         # self.provider_map[share] = {"provider": provider, "allow_anonymous": False}
 
-        # Store the list of share paths, ordered by length, so route lookups
-        # will return the most specific match
+        self._share_lookup[share.lower()] = (share.lower(), provider)
+
+        # Store the list of share paths, ordered by length (informational,
+        # route lookups use `self._share_lookup`)
         self.sorted_share_list = [s.lower() for s in self.provider_map.keys()]
         self.sorted_share_list = sorted(self.sorted_share_list, key=len, reverse=True)
 
         return provider
 
+    def add_dynamic_share(self, template, provider_spec):
+        """Register a share template, e.g. '/home/{user}'.
+
+        Providers are created from `provider_spec` on first access (with the
+        placeholders replaced) and cached in a bounded LRU.
+        """
+        if isinstance(provider_spec, DAVProvider):
+            raise ValueError(
+                f"Dynamic share {template!r} expects a provider definition, "
+                "not an instance"
+            )
+        opts = util.get_dict_value(self.config, "dynamic_shares", as_dict=True)
+        dyn_share = DynamicShare(
+            self,
+            template,
+            provider_spec,
+            max_count=opts.get("max_count", 1000),
+            idle_timeout=opts.get("idle_timeout", 600),
+            negative_ttl=opts.get("negative_ttl", 10),
+        )
+        assert all(ds.template != dyn_share.template for ds in self.dynamic_shares)
+        self.dynamic_shares.append(dyn_share)
+        return dyn_share
+
     def resolve_provider(self, path):
         """Get the registered DAVProvider for a given path.
 
+        The longest matching share is found by looking up the path and its
+        parent paths in a dictionary, i.e. the cost depends on the depth of
+        `path`, not on the number of shares.
+        Dynamic shares (see :class:`DynamicShare`) are checked afterwards and
+        win, if they are more specific than the static match.
+
         Returns:
             tuple: (share, provider)
         """
-        # Find DAV provider that matches the share
-        share = None
-        lower_path = path.lower()
-        for r in self.sorted_share_list:
-            # @@: Case sensitivity should be an option of some sort here;
-            # os.path.normpath might give the preferred case for a filename.
-            if r == "/":
-                share = r
+        # @@: Case sensitivity should be an option of some sort here;
+        # os.path.normpath might give the preferred case for a filename.
+        share_lookup = self._share_lookup
+        prefix = path.lower()
+        while True:
+            res = share_lookup.get(prefix)
+            if res is not None:
                 break
-            elif lower_path == r or lower_path.startswith(r + "/"):
-                share = r
+            idx = prefix.rfind("/")
+            if idx <= 0:
+                res = share_lookup.get("/", (None, None))
                 break
+            prefix = prefix[:idx]
 
-        if share is None:
-            return None, None
-        return share, self.provider_map.get(share)
+        # A dynamic share wins, if it is more specific than the static match
+        for dyn_share in self.dynamic_shares:
+            share = dyn_share.match(path)
+            if share and (res[0] is None or len(share) > len(res[0])):
+                provider = dyn_share.get_provider(share)
+                if provider:
+                    res = (share, provider)
+        return res
 
     def __call__(self, environ, start_response):
         # util.log("SCRIPT_NAME={!r}, PATH_INFO={!r}".format(
@@ -447,8 +692,14 @@ class WsgiDAVApp:
         environ["wsgidav.provider"] = None
         environ["wsgidav.verbose"] = self.verbose
 
+        # Optionally collect durations of request phases (see util.timed_phase())
+        timings = None
+        if self.timings:
+            timings = environ["wsgidav.timings"] = {}
+
         # Find DAV provider that matches the share
-        share, provider = self.resolve_provider(path)
+        with util.timed_phase(environ, "resolve"):
+            share, provider = self.resolve_provider(path)
 
         # Note: we call the next app, even if provider is None, because OPTIONS
         #       must still be handled.
@@ -480,8 +731,62 @@ class WsgiDAVApp:
         assert environ["PATH_INFO"] == "" or environ["PATH_INFO"].startswith("/")
 
         start_time = time.time()
+        # Only used if timings are enabled
+        response_status = stream_start = None
+
+        def _log_request(status):
+            # Log request
+            userInfo = environ.get("wsgidav.auth.user_name")
+            if not userInfo:
+                userInfo = "(anonymous)"
+            extra = []
+            if "HTTP_DESTINATION" in environ:
+                extra.append('dest="{}"'.format(environ.get("HTTP_DESTINATION")))
+            if environ.get("CONTENT_LENGTH", "") != "":
+                extra.append("length={}".format(environ.get("CONTENT_LENGTH")))
+            if "HTTP_DEPTH" in environ:
+                extra.append("depth={}".format(environ.get("HTTP_DEPTH")))
+            if "HTTP_RANGE" in environ:
+                extra.append("range={}".format(environ.get("HTTP_RANGE")))
+            if "HTTP_OVERWRITE" in environ:
+                extra.append("overwrite={}".format(environ.get("HTTP_OVERWRITE")))
+            if self.verbose >= 3 and "HTTP_EXPECT" in environ:
+                extra.append('expect="{}"'.format(environ.get("HTTP_EXPECT")))
+            if self.verbose >= 4 and "HTTP_CONNECTION" in environ:
+                extra.append('connection="{}"'.format(environ.get("HTTP_CONNECTION")))
+            if self.verbose >= 4 and "HTTP_USER_AGENT" in environ:
+                extra.append('agent="{}"'.format(environ.get("HTTP_USER_AGENT")))
+            if self.verbose >= 4 and "HTTP_TRANSFER_ENCODING" in environ:
+                extra.append(
+                    "transfer-enc={}".format(environ.get("HTTP_TRANSFER_ENCODING"))
+                )
+            if self.verbose >= 3:
+                extra.append(f"elap={time.time() - start_time:.3f}sec")
+            if timings:
+                extra.append(f"timings=[{util.format_timings(timings)}]")
+            extra = ", ".join(extra)
+
+            # This is the CherryPy format:
+            #   127.0.0.1 - - [08/Jul/2009:17:25:23] "GET /loginPrompt?redirect=/renderActionList%3Frelation%3Dpersonal%26key%3D%26filter%3DprivateSchedule&reason=0 HTTP/1.1" 200 1944 "http://127.0.0.1:8002/command?id=CMD_Schedule" "Mozilla/5.0 (Windows; U; Windows NT 6.0; de; rv:1.9.1) Gecko/20090624 Firefox/3.5"  # noqa
+            _logger.info(
+                '{addr} - {user} - [{time}] "{method} {path}" {extra} -> {status}'.format(
+                    addr=environ.get("REMOTE_ADDR", ""),
+                    user=userInfo,
+                    time=util.get_log_time(),
+                    method=environ.get("REQUEST_METHOD"),
+                    path=safe_re_encode(
+                        environ.get("PATH_INFO", ""),
+                        sys.stdout.encoding if sys.stdout.encoding else "utf-8",
+                    ),
+                    extra=extra,
+                    status=status,
+                    # response_headers.get(""), # response Content-Length
+                    # referer
+                )
+            )
 
         def _start_response_wrapper(status, response_headers, exc_info=None):
+            nonlocal response_status, stream_start
             # Postprocess response headers
             headerDict = {}
             for header, value in response_headers:
@@ -538,56 +843,22 @@ class WsgiDAVApp:
                 _logger.warning("Adding 'Connection: close' header.")
                 response_headers.append(("Connection", "close"))
 
-            # Log request
-            if self.verbose >= 3:
-                userInfo = environ.get("wsgidav.auth.user_name")
-                if not userInfo:
-                    userInfo = "(anonymous)"
-                extra = []
-                if "HTTP_DESTINATION" in environ:
-                    extra.append('dest="{}"'.format(environ.get("HTTP_DESTINATION")))
-                if environ.get("CONTENT_LENGTH", "") != "":
-                    extra.append("length={}".format(environ.get("CONTENT_LENGTH")))
-                if "HTTP_DEPTH" in environ:
-                    extra.append("depth={}".format(environ.get("HTTP_DEPTH")))
-                if "HTTP_RANGE" in environ:
-                    extra.append("range={}".format(environ.get("HTTP_RANGE")))
-                if "HTTP_OVERWRITE" in environ:
-                    extra.append("overwrite={}".format(environ.get("HTTP_OVERWRITE")))
-                if self.verbose >= 3 and "HTTP_EXPECT" in environ:
-                    extra.append('expect="{}"'.format(environ.get("HTTP_EXPECT")))
-                if self.verbose >= 4 and "HTTP_CONNECTION" in environ:
-                    extra.append(
-                        'connection="{}"'.format(environ.get("HTTP_CONNECTION"))
-                    )
-                if self.verbose >= 4 and "HTTP_USER_AGENT" in environ:
-                    extra.append('agent="{}"'.format(environ.get("HTTP_USER_AGENT")))
-                if self.verbose >= 4 and "HTTP_TRANSFER_ENCODING" in environ:
-                    extra.append(
-                        "transfer-enc={}".format(environ.get("HTTP_TRANSFER_ENCODING"))
-                    )
-                if self.verbose >= 3:
-                    extra.append(f"elap={time.time() - start_time:.3f}sec")
-                extra = ", ".join(extra)
-
-                # This is the CherryPy format:
-                #   127.0.0.1 - - [08/Jul/2009:17:25:23] "GET /loginPrompt?redirect=/renderActionList%3Frelation%3Dpersonal%26key%3D%26filter%3DprivateSchedule&reason=0 HTTP/1.1" 200 1944 "http://127.0.0.1:8002/command?id=CMD_Schedule" "Mozilla/5.0 (Windows; U; Windows NT 6.0; de; rv:1.9.1) Gecko/20090624 Firefox/3.5"  # noqa
-                _logger.info(
-                    '{addr} - {user} - [{time}] "{method} {path}" {extra} -> {status}'.format(
-                        addr=environ.get("REMOTE_ADDR", ""),
-                        user=userInfo,
-                        time=util.get_log_time(),
-                        method=environ.get("REQUEST_METHOD"),
-                        path=safe_re_encode(
-                            environ.get("PATH_INFO", ""),
-                            sys.stdout.encoding if sys.stdout.encoding else "utf-8",
-                        ),
-                        extra=extra,
-                        status=status,
-                        # response_headers.get(""), # response Content-Length
-                        # referer
+            # Log request (deferred until the body was sent, if timings are on)
+            if self.verbose >= 3 and timings is None:
+                _log_request(status)
+            elif timings is not None:
+                response_status = status
+                if self.server_timing_header:
+                    # Phases until now, 'app' is the time until the headers
+                    # were sent
+                    app_timings = {**timings, "app": time.time() - start_time}
+                    response_headers.append(
+                        (
+                            "Server-Timing",
+                            util.format_timings(app_timings, server_timing=True),
+                        )
                     )
-                )
+                stream_start = time.perf_counter()
             return start_response(status, response_headers, exc_info)
 
         # Call first middleware
@@ -597,5 +868,9 @@ class WsgiDAVApp:
         finally:
             if hasattr(app_iter, "close"):
                 app_iter.close()
+            if timings is not None and response_status is not None:
+                timings["stream"] = time.perf_counter() - stream_start
+                if self.verbose >= 3:
+                    _log_request(response_status)
 
         return
@@ -7,6 +7,8 @@ Small wrapper for different etree packages.
 """
 
 import logging
+import re
+from functools import lru_cache
 from io import StringIO
 
 __docformat__ = "reStructuredText"
@@ -120,3 +122,316 @@ def element_content_as_string(element):
     s = stream.getvalue()
     stream.close()
     return s
+
+
+# ========================================================================
+# Multistatus writers
+# ========================================================================
+
+#: Characters that are not allowed in XML 1.0 documents
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+#: Characters that need escaping in text (or are invalid)
+_TEXT_SPECIAL_CHARS = re.compile(
+    "[&<>\r\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]"
+)
+
+_XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+
+
+def _escape_text(s):
+    """Escape character data like lxml does.
+
+    Raise ValueError for characters that cannot be represented in XML (like
+    etree does when the text is assigned).
+    """
+    if not _TEXT_SPECIAL_CHARS.search(s):
+        return s
+    if _INVALID_XML_CHARS.search(s):
+        raise ValueError(
+            "All strings must be XML compatible: "
+            "Unicode or ASCII, no NULL bytes or control characters"
+        )
+    return (
+        s.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace("\r", "&#13;")
+    )
+
+
+def _escape_attr(s):
+    """Escape an attribute value like lxml does."""
+    return (
+        _escape_text(s)
+        .replace('"', "&quot;")
+        .replace("\n", "&#10;")
+        .replace("\t", "&#9;")
+    )
+
+
+@lru_cache(maxsize=1024)
+def _split_clark_name(name):
+    """Return (namespace, localname) for a name in Clark notation ('{ns}name')."""
+    if name.startswith("{") and "}" in name:
+        ns, local_name = name[1:].split("}", 1)
+        return ns, local_name
+    return "", name
+
+
+def _group_prop_list(prop_list):
+    """Split a property list by status and collect the non-DAV namespaces.
+
+    Return a tuple (propstat dict, nsmap), where propstat dict maps a status
+    string (e.g. '200 OK') to a list of (name, value) tuples.
+    Values with a DAVError status are replaced by None, because we always
+    generate *empty* elements for them.
+    """
+    # Imported here, because dav_error depends on this module
+    from wsgidav.dav_error import DAVError, get_http_status_string
+
+    ns_map = {}
+    ns_seen = {"", "DAV:"}
+    prop_dict = {}
+    for name, value in prop_list:
+        status = "200 OK"
+        if isinstance(value, DAVError):
+            status = get_http_status_string(value)
+            value = None
+
+        # Collect namespaces, so we can declare them in the <response> for
+        # compacter output
+        ns = _split_clark_name(name)[0]
+        if ns not in ns_seen:
+            ns_seen.add(ns)
+            ns_map[f"NS{len(ns_map) + 1}"] = ns
+
+        prop_dict.setdefault(status, []).append((name, value))
+    return prop_dict, ns_map
+
+
+def _to_text(value):
+    """Convert a property value to str (assuming UTF-8 for bytes)."""
+    if type(value) is str:
+        return value
+    # Imported here, because util depends on this module
+    from wsgidav.util import to_unicode_safe
+
+    return to_unicode_safe(value)
+
+
+def add_property_response_el(multistatus_el, href, prop_list):
+    """Append a <response> element to a <multistatus> element.
+
+    See :meth:`MultistatusWriter.add_response`.
+    """
+    prop_dict, ns_map = _group_prop_list(prop_list)
+
+    response_el = make_sub_element(multistatus_el, "{DAV:}response", nsmap=ns_map)
+    etree.SubElement(response_el, "{DAV:}href").text = href
+
+    # One <propstat> per status code
+    for status, props in prop_dict.items():
+        propstat_el = etree.SubElement(response_el, "{DAV:}propstat")
+        prop_el = etree.SubElement(propstat_el, "{DAV:}prop")
+        for name, value in props:
+            if value is None:
+                etree.SubElement(prop_el, name)
+            elif is_etree_element(value):
+                prop_el.append(value)
+            else:
+                etree.SubElement(prop_el, name).text = _to_text(value)
+        etree.SubElement(propstat_el, "{DAV:}status").text = f"HTTP/1.1 {status}"
+
+
+class MultistatusWriter:
+    """Build a <multistatus> response body using etree elements.
+
+    This is the reference implementation. Writers are created per response::
+
+        writer = xml_tools.make_multistatus_writer("fast")
+        writer.add_response(href, prop_list)
+        xml = writer.to_bytes()
+    """
+
+    #: Name of this backend in `MULTISTATUS_WRITERS`
+    name = "etree"
+
+    def __init__(self):
+        self.element = make_multistatus_el()
+
+    def add_response(self, href, prop_list):
+        """Append a <response> with one <propstat> per status code.
+
+        The <prop> content depends on the value type:
+
+        - str: add element with this content
+        - None: add an empty element
+        - etree.Element: add XML element as child
+        - DAVError: add an empty element to an own <propstat> for this status
+
+        @param href: URL of the resource, e.g. '/path/file.txt'.
+        @param prop_list: list of 2-tuples (name, value)
+        """
+        add_property_response_el(self.element, href, prop_list)
+
+    def add_status_response(self, href, status):
+        """Append a <response> with a <status> only, e.g. '423 Locked'."""
+        response_el = etree.SubElement(self.element, "{DAV:}response")
+        etree.SubElement(response_el, "{DAV:}href").text = href
+        etree.SubElement(response_el, "{DAV:}status").text = f"HTTP/1.1 {status}"
+
+    def add_response_description(self, text):
+        """Append a <responsedescription> (after the last response)."""
+        etree.SubElement(self.element, "{DAV:}responsedescription").text = text
+
+    def to_bytes(self, *, pretty=False):
+        """Return the serialized XML document (including a declaration)."""
+        return xml_to_bytes(self.element, pretty=pretty)
+
+
+class FastMultistatusWriter(MultistatusWriter):
+    """Build a <multistatus> response body as a list of strings.
+
+    No elements are created for <response>, <propstat>, and <prop>.
+    etree.Element values are written directly, if they only contain (and
+    declare) namespaces that are declared by the response and no attributes;
+    otherwise they are serialized by etree.
+
+    With lxml, the result is identical to :class:`MultistatusWriter`.
+    With ElementTree, 'DAV:' uses the 'D:' prefix like lxml (instead of 'ns0:').
+    """
+
+    name = "fast"
+
+    def __init__(self):
+        self._parts = []
+
+    @staticmethod
+    def _get_tag(name, prefixes):
+        """Return the qualified tag for a name in Clark notation (or None)."""
+        ns, local_name = _split_clark_name(name)
+        if not ns:
+            return local_name
+        prefix = prefixes.get(ns)
+        if prefix is None:
+            return None
+        return f"{prefix}:{local_name}"
+
+    def _write_element(self, parts, el, prefixes):
+        """Append the serialized element to `parts`.
+
+        Return False (and leave `parts` partially written) if the element needs
+        etree serialization.
+        """
+        tag = el.tag
+        if type(tag) is not str or el.attrib:
+            return False  # Comment, processing instruction, or attributes
+        nsmap = getattr(el, "nsmap", None)  # lxml only
+        if nsmap and any(prefixes.get(uri) != prefix for prefix, uri in nsmap.items()):
+            return False  # Declares other namespaces or prefixes
+        tag = self._get_tag(tag, prefixes)
+        if tag is None:
+            return False
+        text = el.text
+        if text is None and not len(el):
+            parts.append(f"<{tag}/>")
+        else:
+            parts.append(f"<{tag}>")
+            if text:
+                parts.append(_escape_text(text))
+            for child in el:
+                if not self._write_element(parts, child, prefixes):
+                    return False
+            parts.append(f"</{tag}>")
+        if el.tail:
+            parts.append(_escape_text(el.tail))
+        return True
+
+    def _element_to_str(self, value, ns_map, prefixes):
+        """Serialize an etree.Element value in the scope of a <prop> element."""
+        parts = []
+        if self._write_element(parts, value, prefixes):
+            return "".join(parts)
+        if not use_lxml:
+            return etree.tostring(value, encoding="unicode")
+        # Let lxml use the prefixes that are declared by our ancestors
+        wrapper = etree.Element("{DAV:}prop", nsmap={"D": "DAV:", **ns_map})
+        wrapper.append(value)
+        xml = etree.tostring(wrapper, encoding="unicode")
+        return xml[xml.index(">") + 1 : -len("</D:prop>")]
+
+    def add_response(self, href, prop_list):
+        prop_dict, ns_map = _group_prop_list(prop_list)
+        prefixes = {"DAV:": "D"}
+        parts = self._parts
+
+        if ns_map:
+            ns_decl = []
+            for prefix, uri in ns_map.items():
+                prefixes[uri] = prefix
+                ns_decl.append(f' xmlns:{prefix}="{_escape_attr(uri)}"')
+            parts.append(f"<D:response{''.join(ns_decl)}>")
+        else:
+            parts.append("<D:response>")
+        parts.append(f"<D:href>{_escape_text(href)}</D:href>")
+
+        get_tag = self._get_tag
+        for status, props in prop_dict.items():
+            parts.append("<D:propstat><D:prop>")
+            for name, value in props:
+                if value is None:
+                    parts.append(f"<{get_tag(name, prefixes)}/>")
+                elif is_etree_element(value):
+                    parts.append(self._element_to_str(value, ns_map, prefixes))
+                else:
+                    tag = get_tag(name, prefixes)
+                    parts.append(f"<{tag}>{_escape_text(_to_text(value))}</{tag}>")
+            parts.append(
+                f"</D:prop><D:status>HTTP/1.1 {status}</D:status></D:propstat>"
+            )
+        parts.append("</D:response>")
+
+    def add_status_response(self, href, status):
+        self._parts.append(
+            f"<D:response><D:href>{_escape_text(href)}</D:href>"
+            f"<D:status>HTTP/1.1 {status}</D:status></D:response>"
+        )
+
+    def add_response_description(self, text):
+        self._parts.append(
+            f"<D:responsedescription>{_escape_text(text)}</D:responsedescription>"
+        )
+
+    def to_bytes(self, *, pretty=False):
+        if self._parts:
+            body = "".join(
+                ('<D:multistatus xmlns:D="DAV:">', *self._parts, "</D:multistatus>")
+            )
+        else:
+            body = '<D:multistatus xmlns:D="DAV:"/>'
+        xml = (_XML_DECLARATION + body).encode("utf-8")
+        if pretty:
+            # Only used for debug output
+            return xml_to_bytes(etree.XML(xml), pretty=True)
+        return xml
+
+
+#: Available multistatus writers (the 'xml_writer' option selects one)
+MULTISTATUS_WRITERS = {
+    MultistatusWriter.name: MultistatusWriter,
+    FastMultistatusWriter.name: FastMultistatusWriter,
+}
+
+
+def make_multistatus_writer(name=None):
+    """Return a new multistatus writer instance (default: 'fast').
+
+    `name` is a key of `MULTISTATUS_WRITERS` (third-party writers can be
+    registered there).
+    """
+    try:
+        return MULTISTATUS_WRITERS[name or FastMultistatusWriter.name]()
+    except KeyError:
+        raise ValueError(
+            f"Invalid xml_writer {name!r} (expected {', '.join(MULTISTATUS_WRITERS)})"
+        ) from None